@@ -4,19 +4,38 @@ Discord bot implementation
 import os
 import asyncio
 import discord
+from discord import app_commands
 from discord.ext import tasks
 from dotenv import load_dotenv
 from pathlib import Path
 import sys
+from datetime import timedelta
 
+import commands
 from database import init_database
+from database.jobs import JobQueue
+from database.state import StateStore
 from updater import Updater
-from utils.discord_utils import create_approval_embed, capitalise
-from utils.config_loader import ConfigLoader
+from updater.rollback import RollbackButton
+from utils.config_service import ConfigService
+from utils.scheduler import DownloadScheduler
+from utils.status import StatusPoller
+from utils.artifacts import ArtifactServer
+from utils.artifact_store import ArtifactStore
+from utils.digest import Digest
+from utils.outbox import Outbox
+from utils.discord_utils import create_approval_embed
 
 # Load environment variables
 load_dotenv()
 
+# How often each stage runs, a restart skips stages that ran more recently
+STAGE_INTERVALS = {
+    'check': timedelta(hours=24),
+    'download': timedelta(hours=1),
+    'upload': timedelta(hours=12)
+}
+
 class SpigotUpdaterBot(discord.Client):
     """Main Discord bot class"""
     
@@ -30,12 +49,11 @@ class SpigotUpdaterBot(discord.Client):
         super().__init__(intents=intents)
         
         self.log = log
-        self.messages = {}
         
         # Load config
+        self.configs = ConfigService(log)
         try:
-            loader = ConfigLoader()
-            self.config = loader.load_all()
+            self.configs.load()
         except FileNotFoundError as e:
             self.log.error(f'Failed to load config: {e}')
             raise
@@ -46,19 +64,111 @@ class SpigotUpdaterBot(discord.Client):
         
         # Initialize database
         self.db = init_database(log)
+        self.jobs = JobQueue(self.db)
+        self.state = StateStore(self.db)
+        self.artifact_store = ArtifactStore(self.db)
+        
+        # Limits for concurrent downloads
+        self.scheduler = DownloadScheduler(
+            self.config.get('download_concurrency', 4),
+            self.config.get('download_host_concurrency', 2)
+        )
+        
+        # Cached server status
+        self.status = StatusPoller(self)
+        
+        # Messages are queued and sent in priority order
+        self.outbox = Outbox(log)
+        
+        # Updates found in a run are posted together
+        self.digest = Digest(self)
+        
+        # Lets Wings nodes pull artifacts directly
+        self.artifacts = ArtifactServer(self)
         
         # Channel will be set on ready
         self.channel = None
         
         # Updater
         self.updater = None
+        
+        # Slash commands, synced to the guild of the updates channel
+        self.tree = app_commands.CommandTree(self)
+        commands.setup(self)
+        
+        # Tasks started by commands
+        self.background = set()
+        
+        # A stage never runs twice at once, later runs wait for the current one
+        self.stage_locks = {stage: asyncio.Lock() for stage in STAGE_INTERVALS}
+    
+    @property
+    def config(self):
+        """The current config snapshot"""
+        return self.configs.config
+    
+    @property
+    def indexes(self):
+        """Indexes for the current config snapshot"""
+        return self.configs.indexes
     
     async def setup_hook(self):
         """Setup tasks"""
         # Start background tasks
+        self.config_task.start()
         self.check_task.start()
         self.download_task.start()
         self.upload_task.start()
+        self.jobs_task.start()
+        self.maintenance_task.start()
+        
+        self.outbox.start()
+        
+        # Keep the menus of earlier digests and rollback buttons working
+        self.digest.restore()
+        self.add_dynamic_items(RollbackButton)
+        
+        await self.artifacts.start()
+    
+    async def announce(self, embed, data: dict):
+        """Add an update announcement to the next digest"""
+        self.digest.add(embed, data)
+    
+    async def run_stage(self, stage: str):
+        """
+        Run a stage, or queue it when workers are used for checks and downloads
+
+        A stage that is already running (for example the hourly download
+        while `/approve` starts another) is waited for, so two runs never
+        write the same files at once.
+        """
+        if stage != 'upload' and self.config.get('external_workers', False):
+            if self.jobs.enqueue(stage, unique=True):
+                self.log.info(f'Queued {stage} job for workers')
+            return
+        async with self.stage_locks[stage]:
+            await getattr(self.updater, 'run' if stage == 'upload' else stage)()
+            self.state.finished(stage)
+        await self.digest.flush()
+    
+    async def run_due(self, stage: str):
+        """Run a stage unless it finished within its interval, such as just before a restart"""
+        if self.state.is_due(stage, STAGE_INTERVALS[stage]):
+            await self.run_stage(stage)
+        else:
+            self.log.info(f'Skipping {stage} stage, it ran recently')
+    
+    async def expire_prompts(self):
+        """Close server update prompts that were left open by a restart"""
+        for message_id, server_name in self.state.take_prompts():
+            message = self.channel.get_partial_message(message_id)
+            await self.outbox.edit(message, embed=create_approval_embed(
+                title=f'{server_name} update prompt expired',
+                description='The bot restarted before this was answered. It will ask again during the next upload task.',
+                color=0x808080,  # Gray
+                success=False
+            ))
+            await self.outbox.clear_reactions(message)
     
     async def on_ready(self):
         """Called when bot is ready"""
@@ -76,22 +186,34 @@ class SpigotUpdaterBot(discord.Client):
             self.log.warning(f'Could not get channel with ID {channel_id}')
             return
         
-        await self.channel.send('❗ The bot will not respond to reactions on any messages before this.')
-        
-        # Create updater
-        self.updater = Updater(self)
+        # on_ready also fires after reconnecting
+        if not self.updater:
+            # Prompts can't be answered after a restart, digests are restored in setup_hook
+            await self.expire_prompts()
+            self.updater = Updater(self)
+            
+            self.tree.copy_global_to(guild=self.channel.guild)
+            await self.tree.sync(guild=self.channel.guild)
         
-        # Run initial checks
-        await self.updater.check()
-        await self.updater.download()
-        await self.updater.run()
+        # Catch up on stages that were missed while the bot was down
+        for stage in STAGE_INTERVALS:
+            await self.run_due(stage)
+    
+    @tasks.loop(seconds=30)
+    async def config_task(self):
+        """Reload the config when the files change"""
+        try:
+            self.configs.reload_if_changed()
+        except Exception as e:
+            self.log.error(f'Error in config task: {e}')
     
     @tasks.loop(hours=24)
     async def check_task(self):
         """Daily update check"""
         try:
-            if self.updater:
-                await self.updater.check()
+            # The first iteration is covered by on_ready
+            if self.updater and self.check_task.current_loop > 0:
+                await self.run_stage('check')
         except Exception as e:
             self.log.error(f'Error in check task: {e}')
     
@@ -99,8 +221,9 @@ class SpigotUpdaterBot(discord.Client):
     async def download_task(self):
         """Hourly download task"""
         try:
-            if self.updater:
-                await self.updater.download()
+            # The first iteration is covered by on_ready
+            if self.updater and self.download_task.current_loop > 0:
+                await self.run_stage('download')
         except Exception as e:
             self.log.error(f'Error in download task: {e}')
     
@@ -108,87 +231,49 @@ class SpigotUpdaterBot(discord.Client):
     async def upload_task(self):
         """Bi-daily upload task"""
         try:
-            if self.updater:
-                await self.updater.run()
+            # The first iteration is covered by on_ready
+            if self.updater and self.upload_task.current_loop > 0:
+                await self.run_stage('upload')
         except Exception as e:
             self.log.error(f'Error in upload task: {e}')
     
+    @tasks.loop(minutes=1)
+    async def maintenance_task(self):
+        """Deploy pending updates once servers are quiet"""
+        try:
+            if self.updater and self.channel:
+                await self.updater.maintain()
+        except Exception as e:
+            self.log.error(f'Error in maintenance task: {e}')
+    
+    @tasks.loop(seconds=10)
+    async def jobs_task(self):
+        """Post announcements queued by workers"""
+        try:
+            if not self.channel or not self.config.get('external_workers', False):
+                return
+            while job := self.jobs.claim(['announce'], 'bot'):
+                job_id, kind, payload = job
+                try:
+                    await self.announce(discord.Embed.from_dict(payload['embed']), payload['data'])
+                except Exception as e:
+                    self.log.error(f'Error posting queued announcement: {e}')
+                    self.jobs.finish(job_id, str(e))
+                else:
+                    self.jobs.finish(job_id)
+            await self.digest.flush()
+        except Exception as e:
+            self.log.error(f'Error in jobs task: {e}')
+    
     @check_task.before_loop
     @download_task.before_loop
     @upload_task.before_loop
+    @jobs_task.before_loop
+    @maintenance_task.before_loop
     async def before_tasks(self):
         """Wait until bot is ready"""
         await self.wait_until_ready()
     
-    async def on_reaction_add(self, reaction, user):
-        """Handle reaction additions"""
-        if user == self.user:
-            return
-        
-        message = reaction.message
-        if reaction.emoji != '✅' or message.channel.id != int(self.config.get('channel_id', 0)):
-            return
-        
-        data = self.messages.get(message.id)
-        if not data:
-            return
-        
-        session_db = self.db['Session']()
-        try:
-            if 'server_jar' in data:
-                # Server jar approval
-                jar_data = data['server_jar']
-                jar = session_db.query(self.db['ServerJars']).filter_by(
-                    type=jar_data['type'],
-                    version=jar_data['version']
-                ).first()
-                
-                if jar:
-                    jar.approved_version = jar_data['actual_version']
-                    jar.approved_build = jar_data['build']
-                    jar.approved_file = jar_data['file']
-                    jar.approved_checksum = jar_data['checksum']
-                    session_db.commit()
-                    
-                    self.log.info(f"{user.name} approved an update for {capitalise(jar_data['type'])} {jar_data['version']}")
-                    
-                    embed = create_approval_embed(
-                        title=f"Update approved for {capitalise(jar_data['type'])} {jar_data['version']}",
-                        description='This will be updated during the next upload task.',
-                        approved_by=user.mention,
-                        success=True
-                    )
-                    await message.edit(embed=embed)
-                    await message.clear_reactions()
-            
-            elif 'plugin' in data:
-                # Plugin approval
-                plugin_data = data['plugin']
-                plugin = session_db.query(self.db['Plugins']).filter_by(
-                    name=plugin_data['name']
-                ).first()
-                
-                if plugin:
-                    plugin.approved = plugin_data['version']
-                    session_db.commit()
-                    
-                    self.log.info(f"{user.name} approved an update for {plugin_data['name']}")
-                    
-                    embed = create_approval_embed(
-                        title=f"Update approved for {plugin_data['name']}",
-                        description='This will be updated during the next upload task.',
-                        approved_by=user.mention,
-                        success=True
-                    )
-                    await message.edit(embed=embed)
-                    await message.clear_reactions()
-            
-            # Remove from messages map
-            del self.messages[message.id]
-        
-        finally:
-            session_db.close()
-    
     async def run(self):
         """Run the bot"""
         token = os.getenv('DISCORD_TOKEN')
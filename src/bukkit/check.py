@@ -2,6 +2,6 @@
 Bukkit update checker
 """
 
-async def check(bot):
+async def check(bot, items):
     """Check for Bukkit updates"""
     bot.log.info('Bukkit checking not implemented')
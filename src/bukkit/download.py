@@ -2,6 +2,6 @@
 Bukkit download module
 """
 
-async def download(bot):
+async def download(bot, items):
     """Download Bukkit"""
     bot.log.info('Bukkit download not implemented')
@@ -0,0 +1,18 @@
+"""
+Bukkit provider
+"""
+from updater.providers import Provider
+from .check import check
+from .download import download
+
+class BukkitProvider(Provider):
+    """Plugins from BukkitDev"""
+
+    source = 'bukkit'
+    hosts = ('dev.bukkit.org',)
+
+    async def check_many(self, items: dict):
+        await check(self.bot, items)
+
+    async def download_many(self, items: dict):
+        await download(self.bot, items)
@@ -0,0 +1,173 @@
+"""
+Command line entry point
+
+Runs one stage of the updater and exits, without connecting to Discord:
+
+    python -m src.cli check
+    python -m src.cli download
+    python -m src.cli deploy --server Hub --yes
+    python -m src.cli status
+    python -m src.cli plan
+
+Announcements and results are printed as text, or as JSON lines with
+`--notify json`. `--notify queue` queues announcements for the bot to post.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from headless import HeadlessContext
+from updater import Updater
+from updater.upload_files import get_panel, get_pending, collect_files, deploy, rollout_servers
+from updater.planner import build_plan
+from utils.logger import setup_logger
+from utils.fs import ensure_directories
+from utils.notifier import NOTIFIERS
+
+def describe_pending(context, session_db, server_name: str, pending: dict) -> dict:
+    """Summarise what an update would change on a server"""
+    files, _ = collect_files(context, session_db, server_name, pending)
+    return {
+        'server': server_name,
+        'jar': pending['sjar'].downloaded if pending['jar'] else None,
+        'plugins': pending['plugins'],
+        'files': [remote for _, remote in files],
+        'bytes': sum(os.path.getsize(local) for local, _ in files if os.path.exists(local))
+    }
+
+async def run_stage(context, stage: str) -> int:
+    """Run the check or download stage"""
+    await getattr(context.updater, stage)()
+    context.state.finished(stage)
+    context.notifier.report(stage, {'finished': True}, f'Finished {stage}')
+    return 0
+
+async def status(context) -> int:
+    """Report the player count, versions and pending updates of every server"""
+    counts = await context.status.poll([
+        name for name, cfg in context.config['servers'].items() if cfg.get('address') or cfg.get('left4status')
+    ])
+
+    session_db = context.db['Session']()
+    try:
+        for server_name, server_config in context.config['servers'].items():
+            server = session_db.query(context.db['Servers']).filter_by(name=server_name).first()
+            pending = get_pending(context, session_db, server_name, server_config)
+            data = {
+                'server': server_name,
+                'players': counts.get(server_name),
+                'jar': server.current if server else None,
+                'plugins': json.loads(server.plugins or '{}') if server else {},
+                'pending': describe_pending(context, session_db, server_name, pending) if pending else None
+            }
+            players = 'offline' if data['players'] is None else f"{data['players']} players"
+            waiting = f", {len(data['pending']['files'])} files pending" if pending else ', up to date'
+            context.notifier.report('status', data, f'{server_name}: {players}, jar {data["jar"]}{waiting}')
+    finally:
+        session_db.close()
+    return 0
+
+async def plan(context) -> int:
+    """Report what the next rollout would do and what it is expected to cost"""
+    rollout = build_plan(context, rollout_servers(context))
+    context.notifier.report('plan', rollout.to_dict(), '\n'.join(rollout.describe()))
+    return 0
+
+async def deploy_servers(context, server_names: list, confirmed: bool) -> int:
+    """Deploy the pending updates of some servers, one after another"""
+    panel = get_panel(context)
+    if not panel:
+        return 1
+
+    failed = False
+    session_db = context.db['Session']()
+    try:
+        for server_name in server_names:
+            server_config = context.config['servers'].get(server_name)
+            if not server_config or not server_config.get('pterodactyl_id'):
+                context.notifier.report('deploy', {'server': server_name, 'result': 'unknown'},
+                                        f'{server_name} is not a Pterodactyl server in servers.yaml')
+                failed = True
+                continue
+
+            pending = get_pending(context, session_db, server_name, server_config)
+            if not pending:
+                context.notifier.report('deploy', {'server': server_name, 'result': 'up to date'},
+                                        f'{server_name} has no updates pending')
+                continue
+
+            summary = describe_pending(context, session_db, server_name, pending)
+            if not confirmed:
+                context.notifier.report('deploy', {**summary, 'result': 'not confirmed'},
+                                        f"{server_name} would get {', '.join(summary['files'])}, "
+                                        f"pass --yes to deploy")
+                continue
+
+            try:
+                await deploy(context, panel, session_db, server_name, pending)
+            except Exception as e:
+                context.log.error(f'Error updating {server_name}: {e}')
+                context.notifier.report('deploy', {**summary, 'result': 'failed', 'error': str(e),
+                                                   'deployment_id': pending.get('deployment_id')},
+                                        f'{server_name} update failed: {e}')
+                failed = True
+                continue
+
+            context.notifier.report('deploy', {**summary, 'result': 'deployed',
+                                               'deployment_id': pending['deployment_id']},
+                                    f'{server_name} has been updated')
+    finally:
+        session_db.close()
+    return 1 if failed else 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description='Run the updater without Discord')
+    parser.add_argument('--notify', choices=[*NOTIFIERS, 'queue'], default='text',
+                        help='print results as text or JSON lines, or queue announcements for the bot')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('check', help='check for updates')
+    commands.add_parser('download', help='download approved updates')
+    deploy_parser = commands.add_parser('deploy', help='deploy pending updates to servers')
+    deploy_parser.add_argument('--server', action='append', required=True, help='server to deploy, may be repeated')
+    deploy_parser.add_argument('--yes', action='store_true', help='deploy instead of only showing what would change')
+    commands.add_parser('status', help='show player counts, versions and pending updates')
+    commands.add_parser('plan', help='show what the next rollout would deploy and how long it would take')
+
+    return parser.parse_args(argv)
+
+async def run(context, args) -> int:
+    if args.command in ('check', 'download'):
+        return await run_stage(context, args.command)
+    if args.command == 'deploy':
+        return await deploy_servers(context, args.server, args.yes)
+    if args.command == 'status':
+        return await status(context)
+    return await plan(context)
+
+def main(argv=None):
+    """CLI entry point"""
+    args = parse_args(argv)
+
+    # Results go to stdout, so logs go to stderr
+    log = setup_logger('Server updater CLI', stream=sys.stderr)
+    ensure_directories(log)
+
+    notifier = None if args.notify == 'queue' else NOTIFIERS[args.notify]()
+    context = HeadlessContext(log, notifier)
+    context.updater = Updater(context)
+
+    try:
+        sys.exit(asyncio.run(run(context, args)))
+    except KeyboardInterrupt:
+        log.info('Shutting down...')
+        sys.exit(130)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Application (slash) commands
+"""
+import asyncio
+from typing import List, Optional
+
+import discord
+from discord import app_commands
+
+from updater.planner import build_plan
+from updater.rollback import latest_deployment, run_rollback
+from updater.upload_files import rollout_servers
+from utils.discord_utils import create_plan_embed
+
+def setup(bot):
+    """Register the bot's commands on its command tree"""
+    approve = app_commands.Group(
+        name='approve',
+        description='Approve pending updates',
+        default_permissions=discord.Permissions(manage_guild=True),
+        guild_only=True
+    )
+
+    async def run(interaction: discord.Interaction, source: Optional[str] = None, server: Optional[str] = None):
+        if interaction.channel_id != int(bot.config.get('channel_id', 0)):
+            await interaction.response.send_message('Use this in the updates channel.', ephemeral=True)
+            return
+
+        names = await bot.digest.approve_matching(interaction.user, source, server)
+        if not names:
+            await interaction.response.send_message('There are no matching updates to approve.', ephemeral=True)
+            return
+
+        # One download for everything that was approved
+        task = asyncio.create_task(bot.run_stage('download'))
+        bot.background.add(task)
+        task.add_done_callback(bot.background.discard)
+
+        await interaction.response.send_message(
+            f"Approved {len(names)} updates: {', '.join(f'`{n}`' for n in names)}"[:2000]
+        )
+
+    async def complete_source(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        sources = set(bot.indexes.source_plugins) | {bot.config.get('server_jars_api', 'papermc')}
+        return [app_commands.Choice(name=s, value=s) for s in sorted(sources) if current.lower() in s][:25]
+
+    async def complete_server(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        return [app_commands.Choice(name=s, value=s)
+                for s in bot.config['servers'] if current.lower() in s.lower()][:25]
+
+    @approve.command(name='all', description='Approve every pending update')
+    async def approve_all(interaction: discord.Interaction):
+        await run(interaction)
+
+    @approve.command(name='source', description='Approve every pending update from a source')
+    @app_commands.describe(source='Update source, such as github or spigot')
+    @app_commands.autocomplete(source=complete_source)
+    async def approve_source(interaction: discord.Interaction, source: str):
+        await run(interaction, source=source)
+
+    @approve.command(name='server', description='Approve every pending update for a server')
+    @app_commands.describe(server='Server name from servers.yaml')
+    @app_commands.autocomplete(server=complete_server)
+    async def approve_server(interaction: discord.Interaction, server: str):
+        await run(interaction, server=server)
+
+    bot.tree.add_command(approve)
+
+    @bot.tree.command(name='storage', description='Show the disk space used by stored artifacts')
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.guild_only()
+    async def storage(interaction: discord.Interaction):
+        usage = bot.artifact_store.usage()
+        lines = [f'`{source}` {size / 1024 / 1024:.1f} MiB' for source, size in sorted(usage.items())]
+        lines.append(f'**Total** {sum(usage.values()) / 1024 / 1024:.1f} MiB')
+        await interaction.response.send_message('\n'.join(lines), ephemeral=True)
+
+    @bot.tree.command(name='plan', description='Show what the next upload task would deploy')
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.guild_only()
+    async def plan(interaction: discord.Interaction):
+        rollout = build_plan(bot, rollout_servers(bot))
+        await interaction.response.send_message(embed=create_plan_embed(rollout), ephemeral=True)
+
+    @bot.tree.command(name='rollback', description='Roll a server back to what it had before its last update')
+    @app_commands.describe(server='Server name from servers.yaml')
+    @app_commands.autocomplete(server=complete_server)
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.guild_only()
+    async def rollback(interaction: discord.Interaction, server: str):
+        if interaction.channel_id != int(bot.config.get('channel_id', 0)):
+            await interaction.response.send_message('Use this in the updates channel.', ephemeral=True)
+            return
+
+        session_db = bot.db['Session']()
+        try:
+            deployment = latest_deployment(bot, session_db, server)
+            deployment_id = deployment.id if deployment else None
+        finally:
+            session_db.close()
+
+        if deployment_id is None:
+            await interaction.response.send_message(f'`{server}` has no updates to roll back.', ephemeral=True)
+            return
+
+        await interaction.response.send_message(f'Rolling back `{server}`')
+        await run_rollback(bot, deployment_id, interaction.user)
@@ -1,7 +1,7 @@
 """
 Database models and initialization
 """
-from sqlalchemy import create_engine, Column, Integer, String, Text
+from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, UniqueConstraint, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from pathlib import Path
@@ -44,13 +44,120 @@ class Server(Base):
     current = Column(String(50))
     plugins = Column(Text, default='{}')
 
-def init_database(log):
-    """Initialize database and return models"""
+class Download(Base):
+    """Download statistics model"""
+    __tablename__ = 'downloads'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100))
+    version = Column(String(50))
+    url = Column(Text)
+    size = Column(Integer)
+    sha256 = Column(String(64))
+    seconds = Column(Float)
+    retries = Column(Integer)
+    resumed = Column(Integer)
+    finished_at = Column(DateTime, server_default=func.now())
+
+class Job(Base):
+    """Job queue model"""
+    __tablename__ = 'jobs'
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), index=True)
+    payload = Column(Text, default='{}')
+    status = Column(String(20), default='queued', index=True)
+    worker = Column(String(100))
+    attempts = Column(Integer, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class Restart(Base):
+    """Deploy restart timings model"""
+    __tablename__ = 'restarts'
+    
+    id = Column(Integer, primary_key=True)
+    server = Column(String(100), index=True)
+    stop_seconds = Column(Float)
+    upload_seconds = Column(Float)
+    start_seconds = Column(Float)
+    downtime = Column(Float)
+    killed = Column(Integer, default=0)
+    success = Column(Integer, default=1)
+    finished_at = Column(DateTime, server_default=func.now())
+
+class Announcement(Base):
+    """Update announcement model"""
+    __tablename__ = 'announcements'
+    
+    id = Column(Integer, primary_key=True)
+    item = Column(String(150), index=True)
+    version = Column(String(100))
+    title = Column(String(150))
+    summary = Column(Text)
+    data = Column(Text, default='{}')
+    message_id = Column(Integer, index=True)
+    status = Column(String(20), default='pending', index=True)
+    approved_by = Column(String(100))
+    created_at = Column(DateTime, server_default=func.now())
+
+class StageRun(Base):
+    """Last completed run of each stage model"""
+    __tablename__ = 'stage_runs'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50), unique=True)
+    finished_at = Column(DateTime)
+
+class Prompt(Base):
+    """Open server update prompt model"""
+    __tablename__ = 'prompts'
+    
+    id = Column(Integer, primary_key=True)
+    message_id = Column(Integer, unique=True)
+    server = Column(String(100))
+    created_at = Column(DateTime, server_default=func.now())
+
+class Artifact(Base):
+    """Stored artifact model"""
+    __tablename__ = 'artifacts'
+    __table_args__ = (UniqueConstraint('item', 'version'),)
+    
+    id = Column(Integer, primary_key=True)
+    item = Column(String(150), index=True)
+    version = Column(String(100))
+    source = Column(String(50))
+    path = Column(Text)
+    size = Column(Integer)
+    sha256 = Column(String(64))
+    state = Column(String(20), index=True)
+    created_at = Column(DateTime, server_default=func.now())
+    last_used = Column(DateTime, server_default=func.now())
+
+class Deployment(Base):
+    """Deploy history model"""
+    __tablename__ = 'deployments'
+    
+    id = Column(Integer, primary_key=True)
+    server = Column(String(100), index=True)
+    previous_jar = Column(String(50))
+    previous_plugins = Column(Text, default='{}')
+    jar = Column(String(50))
+    plugins = Column(Text, default='{}')
+    rolled_back = Column(Integer, default=0)
+    # Deployment this one rolled back, if it is a rollback
+    rollback_of = Column(Integer)
+    created_at = Column(DateTime, server_default=func.now())
+
+def init_database(log, db_path: Path = None):
+    """Initialize database and return models, stored in data/database.sqlite unless `db_path` is given"""
     log.info('Connecting to database')
     
     # Create engine
-    db_path = Path(__file__).parent.parent.parent / 'data' / 'database.sqlite'
-    engine = create_engine(f'sqlite:///{db_path}', echo=False)
+    db_path = db_path or Path(__file__).parent.parent.parent / 'data' / 'database.sqlite'
+    # Wait on locks held by other processes (workers) sharing the database
+    engine = create_engine(f'sqlite:///{db_path}', echo=False, connect_args={'timeout': 30})
     
     # Create tables
     Base.metadata.create_all(engine)
@@ -63,5 +170,13 @@ def init_database(log):
         'Session': Session,
         'ServerJars': ServerJar,
         'Plugins': Plugin,
-        'Servers': Server
+        'Servers': Server,
+        'Downloads': Download,
+        'Jobs': Job,
+        'Restarts': Restart,
+        'Announcements': Announcement,
+        'StageRuns': StageRun,
+        'Prompts': Prompt,
+        'Artifacts': Artifact,
+        'Deployments': Deployment
     }
@@ -0,0 +1,134 @@
+"""
+Job queue persisted in the database
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import update
+
+class JobQueue:
+    """A simple job queue that several processes sharing `data/` can consume"""
+
+    def __init__(self, db):
+        self.db = db
+        self.Job = db['Jobs']
+
+    def enqueue(self, kind: str, payload: dict = None, unique: bool = False) -> Optional[int]:
+        """
+        Add a job to the queue
+
+        Args:
+            kind: Job type, such as `check`, `download` or `announce`
+            payload: JSON-serialisable job data
+            unique: Skip if a job of this kind is already queued or running
+
+        Returns:
+            The job ID, or None if skipped
+        """
+        session_db = self.db['Session']()
+        try:
+            if unique and session_db.query(self.Job).filter(
+                self.Job.kind == kind,
+                self.Job.status.in_(['queued', 'running'])
+            ).first():
+                return None
+
+            job = self.Job(kind=kind, payload=json.dumps(payload or {}), status='queued')
+            session_db.add(job)
+            session_db.commit()
+            return job.id
+        finally:
+            session_db.close()
+
+    def claim(self, kinds: list, worker: str) -> Optional[tuple]:
+        """
+        Claim the oldest queued job of the given kinds
+
+        Returns:
+            `(id, kind, payload)`, or None if there is nothing to do
+        """
+        session_db = self.db['Session']()
+        try:
+            for job in session_db.query(self.Job).filter(
+                self.Job.kind.in_(kinds),
+                self.Job.status == 'queued'
+            ).order_by(self.Job.id).limit(10):
+                # Only one process can move a job out of 'queued'
+                result = session_db.execute(
+                    update(self.Job)
+                    .where(self.Job.id == job.id, self.Job.status == 'queued')
+                    .values(status='running', worker=worker, attempts=self.Job.attempts + 1,
+                            updated_at=datetime.utcnow())
+                )
+                session_db.commit()
+                if result.rowcount == 1:
+                    return job.id, job.kind, json.loads(job.payload or '{}')
+            return None
+        finally:
+            session_db.close()
+
+    def heartbeat(self, job_id: int):
+        """Show a running job's worker is still alive, so it isn't requeued as stale"""
+        session_db = self.db['Session']()
+        try:
+            session_db.execute(
+                update(self.Job)
+                .where(self.Job.id == job_id, self.Job.status == 'running')
+                .values(updated_at=datetime.utcnow())
+            )
+            session_db.commit()
+        finally:
+            session_db.close()
+
+    def finish(self, job_id: int, error: str = None):
+        """Mark a job as done, or failed if there was an error"""
+        session_db = self.db['Session']()
+        try:
+            job = session_db.get(self.Job, job_id)
+            job.status = 'failed' if error else 'done'
+            job.error = error
+            session_db.commit()
+        finally:
+            session_db.close()
+
+    def requeue_stale(self, max_age: timedelta, max_attempts: int = 3) -> int:
+        """
+        Requeue running jobs whose worker has gone quiet for longer than `max_age`
+
+        Stale jobs that have been claimed `max_attempts` times are failed
+        instead, so they no longer block new jobs of their kind.
+
+        Returns:
+            The number of jobs requeued
+        """
+        session_db = self.db['Session']()
+        try:
+            cutoff = datetime.utcnow() - max_age
+            stale = (self.Job.status == 'running', self.Job.updated_at < cutoff)
+            result = session_db.execute(
+                update(self.Job)
+                .where(*stale, self.Job.attempts < max_attempts)
+                .values(status='queued', worker=None)
+            )
+            session_db.execute(
+                update(self.Job)
+                .where(*stale, self.Job.attempts >= max_attempts)
+                .values(status='failed', error=f'Worker went quiet on all {max_attempts} attempts')
+            )
+            session_db.commit()
+            return result.rowcount
+        finally:
+            session_db.close()
+
+    def prune(self, max_age: timedelta):
+        """Delete finished jobs older than `max_age`"""
+        session_db = self.db['Session']()
+        try:
+            session_db.query(self.Job).filter(
+                self.Job.status.in_(['done', 'failed']),
+                self.Job.updated_at < datetime.utcnow() - max_age
+            ).delete(synchronize_session=False)
+            session_db.commit()
+        finally:
+            session_db.close()
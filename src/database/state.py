@@ -0,0 +1,66 @@
+"""
+Bot state that has to survive restarts
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+class StateStore:
+    """Stage run times and open prompts, shared by the bot and workers"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def last_run(self, stage: str) -> Optional[datetime]:
+        """Get when a stage last finished, in UTC"""
+        session_db = self.db['Session']()
+        try:
+            run = session_db.query(self.db['StageRuns']).filter_by(name=stage).first()
+            return run.finished_at if run else None
+        finally:
+            session_db.close()
+
+    def is_due(self, stage: str, interval: timedelta) -> bool:
+        """Whether a stage hasn't finished within the last `interval`"""
+        last = self.last_run(stage)
+        return last is None or datetime.utcnow() - last >= interval
+
+    def finished(self, stage: str):
+        """Record that a stage has just finished"""
+        session_db = self.db['Session']()
+        try:
+            run = session_db.query(self.db['StageRuns']).filter_by(name=stage).first()
+            if not run:
+                run = self.db['StageRuns'](name=stage)
+                session_db.add(run)
+            run.finished_at = datetime.utcnow()
+            session_db.commit()
+        finally:
+            session_db.close()
+
+    def add_prompt(self, message_id: int, server: str):
+        """Remember a server update prompt that is waiting for a reaction"""
+        session_db = self.db['Session']()
+        try:
+            session_db.add(self.db['Prompts'](message_id=message_id, server=server))
+            session_db.commit()
+        finally:
+            session_db.close()
+
+    def remove_prompt(self, message_id: int):
+        session_db = self.db['Session']()
+        try:
+            session_db.query(self.db['Prompts']).filter_by(message_id=message_id).delete()
+            session_db.commit()
+        finally:
+            session_db.close()
+
+    def take_prompts(self) -> List[tuple]:
+        """Remove and return every open prompt as `(message_id, server)`"""
+        session_db = self.db['Session']()
+        try:
+            prompts = [(p.message_id, p.server) for p in session_db.query(self.db['Prompts'])]
+            session_db.query(self.db['Prompts']).delete()
+            session_db.commit()
+            return prompts
+        finally:
+            session_db.close()
@@ -2,75 +2,71 @@
 GitHub Releases update checker
 """
 import aiohttp
-import sys
-from pathlib import Path
-
-# Add src directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from utils.discord_utils import create_update_embed
 
-async def check(bot):
+async def check(bot, plugins):
     """Check for GitHub release updates"""
-    plugins = {k: v for k, v in bot.config['plugins'].items()
-               if v.get('source', '').lower() == 'github'}
-    
     if not plugins:
         return bot.log.info('No GitHub plugins need to be checked')
     
     bot.log.info('Checking for updates for plugins on GitHub')
     
+    # Plugins built from the same repository share one lookup
+    repos = {}
+    for plugin_name, plugin_config in plugins.items():
+        repo = plugin_config.get('repo')
+        if repo:
+            repos.setdefault(repo, []).append(plugin_name)
+    
     async with aiohttp.ClientSession() as session:
-        for plugin_name, plugin_config in plugins.items():
+        for repo, plugin_names in repos.items():
             try:
-                repo = plugin_config.get('repo')
-                if not repo:
-                    continue
-                
                 url = f'https://api.github.com/repos/{repo}/releases/latest'
                 async with session.get(url) as response:
                     data = await response.json()
                     latest = data['tag_name']
-                
-                # Check database
-                session_db = bot.db['Session']()
+            except Exception as e:
+                bot.log.error(f'Error checking GitHub repository {repo}: {e}')
+                continue
+            
+            for plugin_name in plugin_names:
                 try:
-                    plugin = session_db.query(bot.db['Plugins']).filter_by(name=plugin_name).first()
-                    
-                    if not plugin:
-                        plugin = bot.db['Plugins'](name=plugin_name)
-                        session_db.add(plugin)
+                    # Check database
+                    session_db = bot.db['Session']()
+                    try:
+                        plugin = session_db.query(bot.db['Plugins']).filter_by(name=plugin_name).first()
                     
-                    if plugin.approved == latest:
-                        continue
+                        if not plugin:
+                            plugin = bot.db['Plugins'](name=plugin_name)
+                            session_db.add(plugin)
                     
-                    plugin.latest = latest
-                    session_db.commit()
+                        if plugin.approved == latest:
+                            continue
                     
-                    bot.log.info(f'Found an update for {plugin_name}')
+                        plugin.latest = latest
+                        session_db.commit()
                     
-                    affected = ', '.join([f'`{s}`' for s, cfg in bot.config['servers'].items() 
-                                        if plugin_name in cfg.get('plugins', [])])
+                        bot.log.info(f'Found an update for {plugin_name}')
                     
-                    embed = create_update_embed(
-                        update_type='github',
-                        name=plugin_name,
-                        version=latest,
-                        changelog_url=f'https://github.com/{repo}/releases/tag/{latest}',
-                        affected_servers=affected or 'None'
-                    )
+                        affected = bot.indexes.affected(plugin_name)
                     
-                    msg = await bot.channel.send(embed=embed)
-                    await msg.add_reaction('✅')
+                        embed = create_update_embed(
+                            update_type='github',
+                            name=plugin_name,
+                            version=latest,
+                            changelog_url=f'https://github.com/{repo}/releases/tag/{latest}',
+                            affected_servers=affected or 'None'
+                        )
                     
-                    bot.messages[msg.id] = {
-                        'plugin': {
-                            'name': plugin_name,
-                            'version': latest
-                        }
-                    }
-                finally:
-                    session_db.close()
+                        await bot.announce(embed, {
+                            'plugin': {
+                                'name': plugin_name,
+                                'version': latest
+                            }
+                        })
+                    finally:
+                        session_db.close()
                     
-            except Exception as e:
-                bot.log.error(f'Error checking GitHub plugin {plugin_name}: {e}')
+                except Exception as e:
+                    bot.log.error(f'Error checking GitHub plugin {plugin_name}: {e}')
@@ -1,74 +1,141 @@
 """
 GitHub Releases download module
 """
+import asyncio
 import aiohttp
-import aiofiles
 from pathlib import Path
-import sys
-
-# Add src directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from utils.fs import path
+from utils.download import fetch, record
+from utils.artifact_store import plugin_item
+
+async def fetch_release(bot, session, plugin_name: str, plugin_config: dict, version: str, dest: Path):
+    """
+    Download the configured asset of a GitHub release to `dest`
+
+    Returns:
+        The download result, or None if the release has no matching asset
+    """
+    repo = plugin_config.get('repo')
+
+    # Get release assets
+    url = f'https://api.github.com/repos/{repo}/releases/tags/{version}'
+    async with bot.scheduler.slot(url, 'github'):
+        async with session.get(url) as response:
+            data = await response.json()
+
+    # Find the configured asset, or the first JAR
+    pattern = bot.indexes.asset_pattern(plugin_name, tag=version)
+    asset = None
+    for a in data.get('assets', []):
+        if pattern.fullmatch(a['name']) if pattern else a['name'].endswith('.jar'):
+            asset = a
+            break
+
+    if not asset:
+        bot.log.warning(f'No JAR found for {plugin_name}')
+        return None
+
+    # Download the JAR
+    digest = asset.get('digest') or ''
+    async with bot.scheduler.slot(asset['browser_download_url'], 'github'):
+        result = await fetch(
+            session,
+            asset['browser_download_url'],
+            dest,
+            checksum=digest[len('sha256:'):] if digest.startswith('sha256:') else None,
+            size=asset.get('size')
+        )
+
+    record(bot, plugin_name, version, result)
+    return result
+
+async def download_one(bot, session, plugin_name: str, plugin_config: dict, version: str):
+    """Download one approved GitHub release asset, or use the stored copy"""
+    jar_path = Path(path(f"data/plugins/{plugin_config.get('jar')}"))
+    item = plugin_item(plugin_name)
+
+    try:
+        if bot.artifact_store.promote(item, version, jar_path):
+            bot.log.info(f'Using stored {plugin_name} {version}')
+        else:
+            bot.log.info(f'Downloading {plugin_name} {version}')
+            result = await fetch_release(bot, session, plugin_name, plugin_config, version, jar_path)
+            if not result:
+                return
+            bot.artifact_store.add(item, version, jar_path, 'approved', 'github', result.sha256)
+
+        session_db = bot.db['Session']()
+        try:
+            plugin = session_db.query(bot.db['Plugins']).filter_by(name=plugin_name).first()
+            plugin.downloaded = version
+            session_db.commit()
+        finally:
+            session_db.close()
+
+        bot.log.success(f'Downloaded {plugin_name} {version}')
+
+    except Exception as e:
+        bot.log.error(f'Error downloading {plugin_name}: {e}')
 
-async def download(bot):
+async def download(bot, plugins):
     """Download approved GitHub releases"""
+    if not plugins:
+        return
+
+    session_db = bot.db['Session']()
+    try:
+        pending = {
+            plugin.name: plugin.approved
+            for plugin in session_db.query(bot.db['Plugins']).filter(
+                bot.db['Plugins'].name.in_(list(plugins))
+            )
+            if plugin.approved and plugin.downloaded != plugin.approved
+        }
+    finally:
+        session_db.close()
+
+    if not pending:
+        return
+
     bot.log.info('Downloading approved GitHub releases')
-    
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(
+            download_one(bot, session, name, plugins[name], version)
+            for name, version in pending.items()
+        ))
+
+async def prefetch(bot, plugins):
+    """Download the latest GitHub releases before they are approved"""
+    if not plugins:
+        return
+
     session_db = bot.db['Session']()
     try:
-        plugins = session_db.query(bot.db['Plugins']).all()
-        
-        for plugin in plugins:
-            if not plugin.approved or plugin.downloaded == plugin.approved:
-                continue
-            
-            # Check if this is a GitHub plugin
-            plugin_config = bot.config['plugins'].get(plugin.name)
-            if not plugin_config or plugin_config.get('source', '').lower() != 'github':
-                continue
-            
-            bot.log.info(f'Downloading {plugin.name} {plugin.approved}')
-            
-            repo = plugin_config.get('repo')
-            jar_name = plugin_config.get('jar')
-            
-            try:
-                # Get release assets
-                url = f'https://api.github.com/repos/{repo}/releases/tags/{plugin.approved}'
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url) as response:
-                        data = await response.json()
-                        
-                        # Find the JAR asset
-                        asset = None
-                        for a in data.get('assets', []):
-                            if a['name'].endswith('.jar'):
-                                asset = a
-                                break
-                        
-                        if not asset:
-                            bot.log.warning(f'No JAR found for {plugin.name}')
-                            continue
-                        
-                        # Download the JAR
-                        download_url = asset['browser_download_url']
-                        async with session.get(download_url) as dl_response:
-                            if dl_response.status == 200:
-                                jar_path = Path(path(f'data/plugins/{jar_name}'))
-                                jar_path.parent.mkdir(parents=True, exist_ok=True)
-                                
-                                async with aiofiles.open(jar_path, 'wb') as f:
-                                    await f.write(await dl_response.read())
-                                
-                                plugin.downloaded = plugin.approved
-                                session_db.commit()
-                                bot.log.success(f'Downloaded {plugin.name} {plugin.approved}')
-                            else:
-                                bot.log.error(f'Failed to download {plugin.name}: HTTP {dl_response.status}')
-            
-            except Exception as e:
-                bot.log.error(f'Error downloading {plugin.name}: {e}')
-    
+        latest = {
+            plugin.name: plugin.latest
+            for plugin in session_db.query(bot.db['Plugins']).filter(
+                bot.db['Plugins'].name.in_(list(plugins))
+            )
+            if plugin.latest and plugin.latest not in (plugin.approved, plugin.downloaded)
+        }
     finally:
         session_db.close()
+
+    latest = {n: v for n, v in latest.items() if not bot.artifact_store.find(plugin_item(n), v)}
+    if not latest:
+        return
+
+    async def prefetch_one(session, plugin_name, version):
+        item = plugin_item(plugin_name)
+        dest = bot.artifact_store.location(item, version, plugins[plugin_name]['jar'])
+        try:
+            result = await fetch_release(bot, session, plugin_name, plugins[plugin_name], version, dest)
+        except Exception as e:
+            return bot.log.warning(f'Failed to prefetch {plugin_name} {version}: {e}')
+        if result:
+            bot.artifact_store.add(item, version, dest, 'prefetched', 'github', result.sha256)
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(prefetch_one(session, n, v) for n, v in latest.items()))
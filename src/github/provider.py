@@ -0,0 +1,23 @@
+"""
+GitHub Releases provider
+"""
+from updater.providers import Provider
+from .check import check
+from .download import download, prefetch
+
+class GitHubProvider(Provider):
+    """Plugins published as GitHub release assets"""
+
+    source = 'github'
+    batch = True
+    concurrency = 4
+    hosts = ('api.github.com', 'github.com', 'objects.githubusercontent.com')
+
+    async def check_many(self, items: dict):
+        await check(self.bot, items)
+
+    async def download_many(self, items: dict):
+        await download(self.bot, items)
+
+    async def prefetch_many(self, items: dict):
+        await prefetch(self.bot, items)
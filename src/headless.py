@@ -0,0 +1,62 @@
+"""
+Context for running the updater without a Discord connection
+"""
+from dotenv import load_dotenv
+
+from database import init_database
+from database.jobs import JobQueue
+from database.state import StateStore
+from utils.config_service import ConfigService
+from utils.scheduler import DownloadScheduler
+from utils.status import StatusPoller
+from utils.artifacts import ArtifactServer
+from utils.artifact_store import ArtifactStore
+from utils.notifier import QueueNotifier
+
+# Load environment variables
+load_dotenv()
+
+class HeadlessContext:
+    """
+    Provides the parts of `SpigotUpdaterBot` the updater stages use
+
+    Announcements go to `notifier`, which by default queues them for the bot
+    to post instead of sending them to Discord directly.
+    """
+
+    def __init__(self, log, notifier=None):
+        self.log = log
+        self.channel = None
+
+        self.configs = ConfigService(log)
+        self.configs.load()
+
+        self.db = init_database(log)
+        self.jobs = JobQueue(self.db)
+        self.state = StateStore(self.db)
+        self.artifact_store = ArtifactStore(self.db)
+        self.notifier = notifier or QueueNotifier(self.jobs, log)
+
+        self.scheduler = DownloadScheduler(
+            self.config.get('download_concurrency', 4),
+            self.config.get('download_host_concurrency', 2)
+        )
+
+        self.status = StatusPoller(self)
+
+        # Never started, files are uploaded through the panel
+        self.artifacts = ArtifactServer(self)
+
+    @property
+    def config(self):
+        """The current config snapshot"""
+        return self.configs.config
+
+    @property
+    def indexes(self):
+        """Indexes for the current config snapshot"""
+        return self.configs.indexes
+
+    async def announce(self, embed, data: dict):
+        """Pass an update announcement to the notifier"""
+        self.notifier.announce(embed, data)
@@ -2,6 +2,6 @@
 Jenkins build server checker
 """
 
-async def check(bot):
+async def check(bot, items):
     """Check for Jenkins plugin updates"""
     bot.log.info('Jenkins checking not implemented')
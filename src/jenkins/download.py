@@ -2,6 +2,6 @@
 Jenkins download module
 """
 
-async def download(bot):
+async def download(bot, items):
     """Download Jenkins artifacts"""
     bot.log.info('Jenkins download not implemented')
@@ -0,0 +1,18 @@
+"""
+Jenkins provider
+"""
+from updater.providers import Provider
+from .check import check
+from .download import download
+
+class JenkinsProvider(Provider):
+    """Plugins built by a Jenkins job"""
+
+    source = 'jenkins'
+    concurrency = 2
+
+    async def check_many(self, items: dict):
+        await check(self.bot, items)
+
+    async def download_many(self, items: dict):
+        await download(self.bot, items)
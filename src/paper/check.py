@@ -2,28 +2,25 @@
 PaperMC update checker
 """
 import aiohttp
-import sys
-from pathlib import Path
-
-# Add src directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from utils.discord_utils import capitalise, create_update_embed
 
-async def check(bot):
+async def check(bot, servers):
     """Check for PaperMC updates"""
-    servers = {k: v for k, v in bot.config['servers'].items() 
-               if v['jar']['type'].lower() == 'paper'}
-    
     if not servers:
         return bot.log.info('No Paper servers need to be checked')
     
     bot.log.info('Checking for updates for Paper servers')
     
+    # Servers on the same version share one lookup
+    versions = {
+        version: [s for s in server_names if s in servers]
+        for version, server_names in bot.indexes.servers_for_jar('paper').items()
+    }
+    versions = {version: server_names for version, server_names in versions.items() if server_names}
+    
     async with aiohttp.ClientSession() as session:
-        for server_name, server_config in servers.items():
-            version = server_config['jar']['version']
-            
+        for version, server_names in versions.items():
             try:
                 # Get latest build
                 url = f'https://api.papermc.io/v2/projects/paper/versions/{version}'
@@ -64,7 +61,7 @@ async def check(bot):
                     # Notify about update
                     bot.log.info(f'Found an update for Paper {version}')
                     
-                    affected = ', '.join([f'`{s}`' for s in servers.keys()])
+                    affected = ', '.join([f'`{s}`' for s in server_names])
                     
                     embed = create_update_embed(
                         update_type='paper',
@@ -75,10 +72,7 @@ async def check(bot):
                         affected_servers=affected
                     )
                     
-                    msg = await bot.channel.send(embed=embed)
-                    await msg.add_reaction('✅')
-                    
-                    bot.messages[msg.id] = {
+                    await bot.announce(embed, {
                         'server_jar': {
                             'type': 'paper',
                             'version': version,
@@ -87,7 +81,7 @@ async def check(bot):
                             'file': filename,
                             'checksum': checksum
                         }
-                    }
+                    })
                     
                 finally:
                     session_db.close()
@@ -1,59 +1,104 @@
 """
 PaperMC download module
 """
+import asyncio
 import aiohttp
-import aiofiles
-import hashlib
 from pathlib import Path
-import sys
-
-# Add src directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from utils.fs import path
+from utils.download import fetch, record, DownloadError
+from utils.artifact_store import jar_item
+
+def build_url(version: str, build: str, file: str) -> str:
+    return f'https://api.papermc.io/v2/projects/paper/versions/{version}/builds/{build}/downloads/{file}'
+
+async def download_one(bot, session, jar_id: int, version: str, build: str, file: str, checksum: str):
+    """Download one approved Paper build, or use the stored copy"""
+    jar_path = Path(path(f'data/servers/{jar_id}/server.jar'))
+    item = jar_item('paper', version)
+
+    if bot.artifact_store.promote(item, build, jar_path):
+        bot.log.info(f'Using stored Paper {version} build {build}')
+    else:
+        bot.log.info(f'Downloading Paper {version} build {build}')
+        url = build_url(version, build, file)
+        try:
+            async with bot.scheduler.slot(url, 'papermc'):
+                result = await fetch(session, url, jar_path, checksum=checksum)
+        except DownloadError as e:
+            return bot.log.error(f'Failed to download Paper {version} build {build}: {e}')
 
-async def download(bot):
+        record(bot, f'Paper {version}', build, result)
+        bot.artifact_store.add(item, build, jar_path, 'approved', 'papermc', result.sha256)
+
+    session_db = bot.db['Session']()
+    try:
+        jar = session_db.get(bot.db['ServerJars'], jar_id)
+        jar.downloaded = build
+        session_db.commit()
+    finally:
+        session_db.close()
+
+    bot.log.success(f'Downloaded Paper {version} build {build}')
+
+async def download(bot, servers):
     """Download approved Paper versions"""
+    versions = {str(v['jar']['version']) for v in servers.values()}
+    if not versions:
+        return
+
+    session_db = bot.db['Session']()
+    try:
+        jars = [
+            (jar.id, jar.version, jar.approved_build, jar.approved_file, jar.approved_checksum)
+            for jar in session_db.query(bot.db['ServerJars']).filter_by(type='paper').filter(
+                bot.db['ServerJars'].version.in_(versions)
+            )
+            if jar.approved_build and jar.downloaded != jar.approved_build
+        ]
+    finally:
+        session_db.close()
+
+    if not jars:
+        return
+
     bot.log.info('Downloading approved Paper versions')
-    
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(download_one(bot, session, *jar) for jar in jars))
+
+async def prefetch(bot, servers):
+    """Download the latest Paper builds before they are approved"""
+    versions = {str(v['jar']['version']) for v in servers.values()}
+
     session_db = bot.db['Session']()
     try:
-        jars = session_db.query(bot.db['ServerJars']).filter_by(type='paper').all()
-        
-        for jar in jars:
-            if not jar.approved_build or jar.downloaded == jar.approved_build:
-                continue
-            
-            bot.log.info(f'Downloading Paper {jar.version} build {jar.approved_build}')
-            
-            # Create directory
-            jar_dir = Path(path(f'data/servers/{jar.id}'))
-            jar_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Download file
-            url = f'https://api.papermc.io/v2/projects/paper/versions/{jar.version}/builds/{jar.approved_build}/downloads/{jar.approved_file}'
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        content = await response.read()
-                        
-                        # Verify checksum if available
-                        if jar.approved_checksum:
-                            checksum = hashlib.sha256(content).hexdigest()
-                            if checksum != jar.approved_checksum:
-                                bot.log.error(f'Checksum mismatch for Paper {jar.version} build {jar.approved_build}')
-                                bot.log.error(f'Expected: {jar.approved_checksum}, Got: {checksum}')
-                                continue
-                        
-                        async with aiofiles.open(jar_dir / 'server.jar', 'wb') as f:
-                            await f.write(content)
-                        
-                        jar.downloaded = jar.approved_build
-                        session_db.commit()
-                        bot.log.success(f'Downloaded Paper {jar.version} build {jar.approved_build}')
-                    else:
-                        bot.log.error(f'Failed to download Paper {jar.version}: HTTP {response.status}')
-    
+        builds = [
+            (jar.version, jar.latest_build, jar.latest_file, jar.latest_checksum)
+            for jar in session_db.query(bot.db['ServerJars']).filter_by(type='paper').filter(
+                bot.db['ServerJars'].version.in_(versions)
+            )
+            if jar.latest_build and jar.latest_build not in (jar.approved_build, jar.downloaded)
+        ]
     finally:
         session_db.close()
+
+    builds = [b for b in builds if not bot.artifact_store.find(jar_item('paper', b[0]), b[1])]
+    if not builds:
+        return
+
+    async def prefetch_one(session, version, build, file, checksum):
+        item = jar_item('paper', version)
+        url = build_url(version, build, file)
+        try:
+            async with bot.scheduler.slot(url, 'papermc'):
+                result = await fetch(session, url, bot.artifact_store.location(item, build, 'server.jar'),
+                                     checksum=checksum)
+        except DownloadError as e:
+            return bot.log.warning(f'Failed to prefetch Paper {version} build {build}: {e}')
+
+        record(bot, f'Paper {version}', build, result)
+        bot.artifact_store.add(item, build, result.path, 'prefetched', 'papermc', result.sha256)
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(prefetch_one(session, *b) for b in builds))
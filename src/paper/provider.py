@@ -0,0 +1,28 @@
+"""
+PaperMC provider
+"""
+from updater.providers import Provider
+from .check import check
+from .download import download, prefetch
+
+class PaperProvider(Provider):
+    """Paper server jars from the PaperMC API"""
+
+    source = 'papermc'
+    kind = 'server'
+    batch = True
+    concurrency = 2
+    hosts = ('api.papermc.io',)
+
+    def select(self, config: dict) -> dict:
+        versions = self.bot.indexes.servers_for_jar('paper')
+        return {name: config['servers'][name] for names in versions.values() for name in names}
+
+    async def check_many(self, items: dict):
+        await check(self.bot, items)
+
+    async def download_many(self, items: dict):
+        await download(self.bot, items)
+
+    async def prefetch_many(self, items: dict):
+        await prefetch(self.bot, items)
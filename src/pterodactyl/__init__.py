@@ -1,9 +1,10 @@
 """
 Pterodactyl API client
 """
-from typing import List
+from typing import List, Tuple
 from urllib.parse import urlparse, parse_qs, urlencode
 from .http import PterodactylHTTP
+from .websocket import PowerWatcher
 
 class Pterodactyl:
     """Pterodactyl API class"""
@@ -40,6 +41,16 @@ class Pterodactyl:
         """Start a server"""
         return await self.change_power_state(server, 'start')
     
+    async def websocket(self, server: str) -> dict:
+        """Get the websocket URL and a token for a server"""
+        endpoint = f'{self.client}/servers/{server}/websocket'
+        response = await self.http.get_json(endpoint)
+        return response['data']
+    
+    def watch(self, server: str, log=None) -> PowerWatcher:
+        """Watch the power state and console of a server"""
+        return PowerWatcher(self, server, log=log)
+    
     async def upload(self, server: str, path: str, files: List[str]):
         """Upload files to a server"""
         endpoint = f'{self.client}/servers/{server}/files/upload'
@@ -54,3 +65,31 @@ class Pterodactyl:
         upload_url = f'{parsed.scheme}://{parsed.netloc}{parsed.path}?{new_query}'
         
         return await self.http.upload_files(upload_url, files)
+    
+    async def list_files(self, server: str, directory: str) -> List[dict]:
+        """List the files in a directory of a server"""
+        endpoint = f'{self.client}/servers/{server}/files/list?{urlencode({"directory": directory})}'
+        response = await self.http.get_json(endpoint)
+        return [f['attributes'] for f in response['data']]
+    
+    async def rename_files(self, server: str, root: str, files: List[Tuple[str, str]]):
+        """Rename or move files on a server, relative to `root`"""
+        endpoint = f'{self.client}/servers/{server}/files/rename'
+        data = {'root': root, 'files': [{'from': src, 'to': dest} for src, dest in files]}
+        return await self.http.put_json(endpoint, data)
+    
+    async def delete_files(self, server: str, root: str, files: List[str]):
+        """Delete files or directories on a server, relative to `root`"""
+        endpoint = f'{self.client}/servers/{server}/files/delete'
+        return await self.http.post_json(endpoint, {'root': root, 'files': files})
+    
+    async def decompress(self, server: str, root: str, file: str):
+        """Extract an archive on a server into `root`"""
+        endpoint = f'{self.client}/servers/{server}/files/decompress'
+        return await self.http.post_json(endpoint, {'root': root, 'file': file})
+    
+    async def pull(self, server: str, url: str, directory: str, filename: str):
+        """Have the node download a file into a directory of a server, waiting until it's done"""
+        endpoint = f'{self.client}/servers/{server}/files/pull'
+        data = {'url': url, 'directory': directory, 'filename': filename, 'foreground': True}
+        return await self.http.post_json(endpoint, data)
@@ -30,6 +30,13 @@ class PterodactylHTTP:
                 response.raise_for_status()
                 return response
     
+    async def put_json(self, url: str, data: dict):
+        """Make PUT request"""
+        async with aiohttp.ClientSession() as session:
+            async with session.put(url, headers=self.headers, json=data) as response:
+                response.raise_for_status()
+                return response
+    
     async def upload_files(self, url: str, files: List[str]):
         """Upload files to Pterodactyl"""
         async with aiohttp.ClientSession() as session:
@@ -0,0 +1,138 @@
+"""
+Pterodactyl server websocket client
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Callable, Iterable
+
+import aiohttp
+
+class PowerWatcher:
+    """
+    Track a server's power state and console through the Wings websocket
+
+    Falls back to polling the REST API if the websocket can't be used, so
+    `wait_for` works either way.
+    """
+
+    def __init__(self, panel, server: str, poll_interval: float = 2, log=None):
+        self.panel = panel
+        self.server = server
+        self.poll_interval = poll_interval
+        self.log = log
+        self.state = None
+        self.console = deque(maxlen=1000)
+        self.listeners = []
+        self.session = None
+        self.ws = None
+        self.reader = None
+        self.changed = asyncio.Event()
+
+    @property
+    def live(self) -> bool:
+        """Whether state changes are arriving over the websocket"""
+        return self.reader is not None and not self.reader.done()
+
+    async def __aenter__(self):
+        self.set_state(await self.panel.get_power_state(self.server))
+        try:
+            await self.connect()
+        except Exception as e:
+            if self.log:
+                self.log.warning(f'Websocket for {self.server} unavailable, polling its state instead: {e}')
+            await self.close()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def connect(self):
+        """Open and authenticate the websocket"""
+        credentials = await self.panel.websocket(self.server)
+        self.session = aiohttp.ClientSession()
+        self.ws = await self.session.ws_connect(
+            credentials['socket'],
+            headers={'Origin': self.panel.host.rstrip('/')},
+            heartbeat=30
+        )
+        await self.ws.send_json({'event': 'auth', 'args': [credentials['token']]})
+        self.reader = asyncio.create_task(self.read())
+
+    async def close(self):
+        if self.reader:
+            self.reader.cancel()
+        if self.ws:
+            await self.ws.close()
+        if self.session:
+            await self.session.close()
+        self.reader = self.ws = self.session = None
+
+    async def read(self):
+        """Handle websocket events until the socket closes"""
+        async for message in self.ws:
+            if message.type != aiohttp.WSMsgType.TEXT:
+                continue
+
+            data = json.loads(message.data)
+            event = data.get('event')
+            args = data.get('args') or []
+
+            if event == 'auth success':
+                await self.ws.send_json({'event': 'send stats', 'args': [None]})
+            elif event == 'status' and args:
+                self.set_state(args[0])
+            elif event == 'stats' and args:
+                self.set_state(json.loads(args[0]).get('state'))
+            elif event == 'console output' and args:
+                self.console.append(args[0])
+                for listener in self.listeners:
+                    listener(args[0])
+            elif event == 'token expiring':
+                credentials = await self.panel.websocket(self.server)
+                await self.ws.send_json({'event': 'auth', 'args': [credentials['token']]})
+            elif event in ('token expired', 'jwt error'):
+                break
+
+    def set_state(self, state: str):
+        if state and state != self.state:
+            self.state = state
+            self.changed.set()
+
+    def on_console(self, listener: Callable[[str], None]):
+        """Call `listener` with every console line"""
+        self.listeners.append(listener)
+
+    async def wait_for(self, states: Iterable[str], timeout: float) -> bool:
+        """
+        Wait until the server reaches one of `states`
+
+        Returns:
+            Whether the state was reached before the timeout
+        """
+        states = {states} if isinstance(states, str) else set(states)
+        deadline = time.monotonic() + timeout
+
+        while self.state not in states:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+
+            if self.live:
+                self.changed.clear()
+                try:
+                    await asyncio.wait_for(self.changed.wait(), min(remaining, 10))
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(remaining, self.poll_interval))
+
+            # Poll as well, in case the websocket is gone or missed an event
+            try:
+                self.set_state(await self.panel.get_power_state(self.server))
+            except aiohttp.ClientError:
+                pass
+
+        return True
@@ -2,6 +2,6 @@
 ServerJars API checker
 """
 
-async def check(bot):
+async def check(bot, items):
     """Check for ServerJars updates"""
     bot.log.info('ServerJars checking not implemented')
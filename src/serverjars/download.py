@@ -2,6 +2,6 @@
 ServerJars download module
 """
 
-async def download(bot):
+async def download(bot, items):
     """Download from ServerJars"""
     bot.log.info('ServerJars download not implemented')
@@ -0,0 +1,19 @@
+"""
+ServerJars provider
+"""
+from updater.providers import Provider
+from .check import check
+from .download import download
+
+class ServerJarsProvider(Provider):
+    """Server jars from the ServerJars API"""
+
+    source = 'serverjars'
+    kind = 'server'
+    hosts = ('serverjars.com',)
+
+    async def check_many(self, items: dict):
+        await check(self.bot, items)
+
+    async def download_many(self, items: dict):
+        await download(self.bot, items)
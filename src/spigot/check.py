@@ -2,22 +2,14 @@
 SpigotMC update checker (requires web scraping)
 """
 import os
-import sys
-from pathlib import Path
 from urllib.parse import urlparse, parse_qs
 from playwright.async_api import async_playwright
 from playwright_stealth import Stealth
 
-# Add src directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from utils.discord_utils import create_update_embed
 
-async def check(bot):
+async def check(bot, plugins):
     """Check for SpigotMC plugin updates"""
-    plugins = {k: v for k, v in bot.config['plugins'].items()
-               if v.get('source', '').lower() == 'spigot'}
-    
     if not plugins:
         return bot.log.info('No SpigotMC plugins need to be checked, skipping spigot browser')
     
@@ -100,13 +92,19 @@ async def check(bot):
             else:
                 bot.log.info('Already logged in!')
             
-            # Check each plugin
-            for plugin_name, plugin_config in plugins.items():
-                bot.log.info(f"Checking '{plugin_config['jar']}'")
+            # Plugins from the same resource share one page visit
+            resources = {}
+            for resource_id, plugin_names in bot.indexes.resource_plugins.items():
+                plugin_names = [name for name in plugin_names if name in plugins]
+                if plugin_names:
+                    resources[resource_id] = plugin_names
+            
+            # Check each resource
+            for resource_id, plugin_names in resources.items():
+                bot.log.info(f"Checking resource {resource_id} ({', '.join(plugin_names)})")
                 
                 try:
                     await page.wait_for_timeout(bot.config.get('navigation_delay', 10000))
-                    resource_id = plugin_config.get('resource')
                     await page.goto(f'https://www.spigotmc.org/resources/{resource_id}/updates')
                     await page.wait_for_selector('.downloadButton > a')
                     
@@ -117,8 +115,15 @@ async def check(bot):
                     latest = query_params.get('version', [None])[0]
                     
                     if not latest:
-                        bot.log.warning(f"Couldn't find a version number for {plugin_name}")
+                        bot.log.warning(f"Couldn't find a version number for resource {resource_id}")
                         continue
+                except Exception as e:
+                    bot.log.warning('Could not check plugin!')
+                    bot.log.error(f'Error: {e}')
+                    continue
+                
+                for plugin_name in plugin_names:
+                    plugin_config = plugins[plugin_name]
                     
                     # Check database
                     session_db = bot.db['Session']()
@@ -139,8 +144,7 @@ async def check(bot):
                         bot.log.info(f"Found an update for '{plugin_config['jar']}'")
                         
                         # Find affected servers
-                        affected = ', '.join([f'`{s}`' for s, cfg in bot.config['servers'].items()
-                                            if plugin_name in cfg.get('plugins', [])])
+                        affected = bot.indexes.affected(plugin_name)
                         
                         # Send Discord notification
                         embed = create_update_embed(
@@ -151,21 +155,17 @@ async def check(bot):
                             affected_servers=affected or 'None'
                         )
                         
-                        msg = await bot.channel.send(embed=embed)
-                        await msg.add_reaction('✅')
-                        
-                        bot.messages[msg.id] = {
+                        await bot.announce(embed, {
                             'plugin': {
                                 'name': plugin_name,
                                 'version': latest
                             }
-                        }
+                        })
+                    except Exception as e:
+                        bot.log.warning('Could not check plugin!')
+                        bot.log.error(f'Error: {e}')
                     finally:
                         session_db.close()
-                
-                except Exception as e:
-                    bot.log.warning('Could not check plugin!')
-                    bot.log.error(f'Error: {e}')
         
         except Exception as e:
             bot.log.info('Screenshotting as error.png')
@@ -2,44 +2,41 @@
 SpigotMC download module
 """
 import os
-import sys
 import asyncio
-import zipfile
-import re
+import shutil
 from pathlib import Path
 from playwright.async_api import async_playwright
 from playwright_stealth import Stealth
 
-# Add src directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from utils.fs import path
+from utils.artifact_store import plugin_item
+from utils.archive import extract
+
+def _copy(src: Path, dest: Path):
+    """Copy a file into place without leaving a partial file behind"""
+    part = dest.with_name(dest.name + '.part')
+    shutil.copyfile(src, part)
+    os.replace(part, dest)
 
-async def download(bot):
+async def download(bot, plugins):
     """Download approved SpigotMC plugins"""
-    bot.log.info('Clearing temp directory')
-    temp_dir = Path(path('data/temp/'))
-    for file in temp_dir.iterdir():
-        if file.is_file():
-            file.unlink()
+    if not plugins:
+        return bot.log.info('No SpigotMC plugins need to be downloaded, skipping spigot browser')
     
     # Get plugins that need to be downloaded
     session_db = bot.db['Session']()
     try:
-        plugin_names = [k for k, v in bot.config['plugins'].items()
-                       if v.get('source', '').lower() == 'spigot']
-        
         # Filter to only plugins that need downloading
-        plugins_to_download = []
-        for plugin_name in plugin_names:
+        versions = {}
+        for plugin_name in plugins:
             plugin = session_db.query(bot.db['Plugins']).filter_by(name=plugin_name).first()
             if plugin and plugin.approved and plugin.downloaded != plugin.approved:
-                plugins_to_download.append(plugin_name)
+                versions[plugin_name] = plugin.approved
         
-        if not plugins_to_download:
+        if not versions:
             return bot.log.info('No SpigotMC plugins need to be downloaded, skipping spigot browser')
         
-        plugins = {name: bot.config['plugins'][name] for name in plugins_to_download}
+        plugins = {name: plugins[name] for name in versions}
     finally:
         session_db.close()
     
@@ -123,91 +120,87 @@ async def download(bot):
             else:
                 bot.log.info('Already logged in!')
             
-            # Download each plugin
+            # Plugins sharing a resource and version share one download
+            downloads = {}
             for plugin_name, plugin_config in plugins.items():
-                bot.log.info(f"Updating download for '{plugin_config['jar']}'")
+                key = (plugin_config.get('resource'), versions[plugin_name])
+                downloads.setdefault(key, []).append(plugin_name)
+            
+            for (resource_id, version), plugin_names in downloads.items():
+                bot.log.info(f"Updating download for {', '.join(plugin_names)}")
                 
                 try:
-                    session_db = bot.db['Session']()
-                    try:
-                        plugin = session_db.query(bot.db['Plugins']).filter_by(name=plugin_name).first()
-                        
-                        if not plugin:
-                            continue
-                        if plugin.downloaded == plugin.approved:
-                            continue
-                        
-                        # Remove old jar if exists
-                        jar_path = Path(path(f"data/plugins/{plugin_config['jar']}"))
-                        if jar_path.exists():
-                            jar_path.unlink()
-                        
-                        version = plugin.approved
-                        resource_id = plugin_config.get('resource')
+                    # Each download gets its own temp directory
+                    with bot.scheduler.temp_dir('spigot-') as temp_dir:
                         download_url = f'https://www.spigotmc.org/resources/{resource_id}/download?version={version}'
-                        
+                    
                         await page.wait_for_timeout(bot.config.get('navigation_delay', 10000))
-                        bot.log.info(f'Downloading {plugin_name} ({version}): plugins/{plugin_config["jar"]}')
-                        
+                        bot.log.info(f'Downloading resource {resource_id} ({version})')
+                    
                         # Start download
+                        downloaded_file = None
                         try:
                             async with page.expect_download() as download_info:
                                 await page.goto(download_url)
                                 download = await download_info.value
-                                
+                            
                                 # Save to temp directory
-                                temp_file = temp_dir / download.suggested_filename
-                                await download.save_as(temp_file)
+                                downloaded_file = temp_dir / download.suggested_filename
+                                await download.save_as(downloaded_file)
                         except Exception as e:
                             # Sometimes the download doesn't trigger the expect_download event
                             # Just wait and check if file appeared
                             await page.wait_for_timeout(bot.config.get('download_time', 10000))
-                        
-                        # Check if file was downloaded
-                        temp_files = list(temp_dir.iterdir())
-                        if not temp_files:
-                            bot.log.warning(f'Failed to download {plugin_name}')
+                            temp_files = list(temp_dir.iterdir())
+                            if temp_files:
+                                downloaded_file = temp_files[0]
+                    
+                        if not downloaded_file:
+                            bot.log.warning(f"Failed to download {', '.join(plugin_names)}")
                             continue
-                        
-                        downloaded_file = temp_files[0]
-                        
-                        # Handle zip extraction if needed
-                        if plugin_config.get('zip_path') and downloaded_file.suffix.lower() == '.zip':
-                            bot.log.info('Extracting...')
-                            zip_path_pattern = plugin_config['zip_path']
-                            
-                            with zipfile.ZipFile(downloaded_file, 'r') as zip_ref:
-                                # List all files in zip
-                                for file_info in zip_ref.filelist:
-                                    # Check if file matches pattern
-                                    if isinstance(zip_path_pattern, str) and zip_path_pattern.startswith('r'):
-                                        # It's a regex pattern (stored as string starting with 'r')
-                                        pattern = re.compile(zip_path_pattern.strip('r').strip("'").strip('"'))
-                                        if pattern.match(file_info.filename):
-                                            zip_ref.extract(file_info, temp_dir)
-                                            extracted_file = temp_dir / file_info.filename
-                                            extracted_file.rename(jar_path)
-                                            break
-                                    else:
-                                        # Exact match
-                                        if file_info.filename == zip_path_pattern:
-                                            zip_ref.extract(file_info, temp_dir)
-                                            extracted_file = temp_dir / file_info.filename
-                                            extracted_file.rename(jar_path)
-                                            break
-                            
-                            downloaded_file.unlink()
-                        else:
-                            # Just rename the file
-                            downloaded_file.rename(jar_path)
-                        
+                    
+                        # Extract the matching members of zips, copy anything else as is
+                        is_zip = downloaded_file.suffix.lower() == '.zip'
+                        targets = {}
+                        copies = []
+                        for plugin_name in plugin_names:
+                            jar_path = Path(path(f"data/plugins/{plugins[plugin_name]['jar']}"))
+                            pattern = bot.indexes.zip_paths.get(plugin_name)
+                            if pattern and is_zip:
+                                targets[jar_path] = pattern
+                            else:
+                                copies.append(jar_path)
+                    
+                        hashes = {}
+                        try:
+                            if targets:
+                                bot.log.info('Extracting...')
+                                hashes = await asyncio.to_thread(extract, downloaded_file, targets)
+                            # The download is moved onto the last plugin using it, the others get copies
+                            for jar_path in copies[:-1]:
+                                await asyncio.to_thread(_copy, downloaded_file, jar_path)
+                            if copies:
+                                os.replace(downloaded_file, copies[-1])
+                        finally:
+                            downloaded_file.unlink(missing_ok=True)
+                    
+                        for plugin_name in plugin_names:
+                            jar_path = Path(path(f"data/plugins/{plugins[plugin_name]['jar']}"))
+                            bot.artifact_store.add(plugin_item(plugin_name), version, jar_path, 'approved', 'spigot',
+                                                   hashes.get(jar_path))
+                    
                         # Update database
-                        plugin.downloaded = version
-                        session_db.commit()
-                        bot.log.success(f'Downloaded {plugin_name} ({version})')
+                        session_db = bot.db['Session']()
+                        try:
+                            for plugin in session_db.query(bot.db['Plugins']).filter(
+                                bot.db['Plugins'].name.in_(plugin_names)
+                            ):
+                                plugin.downloaded = version
+                            session_db.commit()
+                        finally:
+                            session_db.close()
                     
-                    finally:
-                        session_db.close()
+                        bot.log.success(f"Downloaded {', '.join(plugin_names)} ({version})")
                 
                 except Exception as e:
                     bot.log.warning('Could not download plugin!')
@@ -0,0 +1,19 @@
+"""
+SpigotMC provider
+"""
+from updater.providers import Provider
+from .check import check
+from .download import download
+
+class SpigotProvider(Provider):
+    """Plugins scraped from SpigotMC with a browser"""
+
+    source = 'spigot'
+    batch = True
+    hosts = ('www.spigotmc.org',)
+
+    async def check_many(self, items: dict):
+        await check(self.bot, items)
+
+    async def download_many(self, items: dict):
+        await download(self.bot, items)
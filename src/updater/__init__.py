@@ -1,16 +1,26 @@
 """
 Updater orchestration class
 """
+import asyncio
+
 from .check_for_updates import check_for_updates
 from .download_servers import download_servers
 from .download_plugins import download_plugins
 from .upload_files import upload_files
+from .prefetch import prefetch
+from .retention import collect_garbage
+from .maintenance import MaintenanceScheduler
+from .rollout import Rollout
 
 class Updater:
     """Main updater class that coordinates all update operations"""
     
     def __init__(self, bot):
         self.bot = bot
+        # Servers with a rollout in progress
+        self.deploying = set()
+        self.maintenance = MaintenanceScheduler(bot)
+        self.rollout = Rollout(bot)
     
     async def check(self):
         """Run daily update check task"""
@@ -22,11 +32,16 @@ class Updater:
         """Run hourly download task"""
         message = 'Running hourly download task'
         self.bot.log.info(message)
-        await download_servers(self.bot)
-        await download_plugins(self.bot)
+        await asyncio.gather(download_servers(self.bot), download_plugins(self.bot))
+        await prefetch(self.bot)
+        collect_garbage(self.bot)
     
     async def run(self):
         """Run bi-daily upload task"""
         message = 'Running bi-daily upload task'
         self.bot.log.info(message)
         await upload_files(self.bot)
+    
+    async def maintain(self):
+        """Deploy servers whose update window has opened"""
+        await self.maintenance.tick()
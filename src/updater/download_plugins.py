@@ -1,20 +1,17 @@
 """
 Download plugins
 """
-import sys
-from pathlib import Path
+import asyncio
 
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-from github.download import download as github_download
-from jenkins.download import download as jenkins_download
-from spigot.download import download as spigot_download
-from bukkit.download import download as bukkit_download
+from . import providers
 
 async def download_plugins(bot):
-    """Download approved plugin JARs"""
-    await github_download(bot)
-    await jenkins_download(bot)
-    await spigot_download(bot)
-    await bukkit_download(bot)
+    """Download approved plugin JARs from all sources concurrently"""
+    active = providers.active(bot, kind='plugin')
+    results = await asyncio.gather(
+        *(provider.download_many(provider.select(bot.config)) for provider in active),
+        return_exceptions=True
+    )
+    for provider, result in zip(active, results):
+        if isinstance(result, Exception):
+            bot.log.error(f'Error downloading {provider.source} plugins: {result}')
@@ -1,16 +1,17 @@
 """
 Download servers
 """
-import sys
-from pathlib import Path
+import asyncio
 
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-from paper.download import download as paper_download
-from serverjars.download import download as serverjars_download
+from . import providers
 
 async def download_servers(bot):
-    """Download approved server JARs"""
-    await paper_download(bot)
-    await serverjars_download(bot)
+    """Download approved server JARs from all sources concurrently"""
+    active = providers.active(bot, kind='server')
+    results = await asyncio.gather(
+        *(provider.download_many(provider.select(bot.config)) for provider in active),
+        return_exceptions=True
+    )
+    for provider, result in zip(active, results):
+        if isinstance(result, Exception):
+            bot.log.error(f'Error downloading {provider.source} server jars: {result}')
@@ -0,0 +1,146 @@
+"""
+Maintenance windows
+
+Servers with an `update_window` are watched by the maintenance task instead of
+the upload task. Pending updates are deployed (or offered for approval) as
+soon as the server has stayed at or below `max_players` for long enough,
+inside the allowed hours.
+"""
+import asyncio
+import time
+from datetime import datetime
+
+from utils.discord_utils import create_approval_embed, create_rollback_view
+from utils.outbox import STATUS
+from .upload_files import get_panel, get_pending, deploy, request_update
+
+# Seconds before a server that was offered for approval is offered again
+REPROMPT_AFTER = 3600
+
+DEFAULT_WINDOW = {
+    'quiet_for': 600000,
+    'hours': None,
+    'approval': 'auto'
+}
+
+def in_hours(hours: str, now: datetime) -> bool:
+    """Check whether the hour of `now` is inside an `'HH-HH'` range, which may wrap past midnight"""
+    if not hours:
+        return True
+    start, end = (int(h) for h in str(hours).split('-'))
+    if start <= end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+class MaintenanceScheduler:
+    """Deploy pending updates at the first quiet moment"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        # server name -> monotonic time it was first seen quiet
+        self.quiet_since = {}
+        # server name -> monotonic time it was last offered for approval
+        self.prompted = {}
+        self.tasks = set()
+
+    def window(self, server_name: str) -> dict:
+        """Get the update window for a server, or None if it doesn't have one"""
+        server_window = (self.bot.config['servers'].get(server_name) or {}).get('update_window')
+        global_window = self.bot.config.get('update_window')
+        if not server_window and not global_window:
+            return None
+        if server_window is False:
+            return None
+        return {**DEFAULT_WINDOW, **(global_window or {}), **(server_window or {})}
+
+    async def tick(self):
+        """Check the servers with update windows and deploy the ones that are quiet"""
+        candidates = [name for name, cfg in self.bot.config['servers'].items()
+                      if cfg.get('pterodactyl_id') and self.window(name)
+                      and name not in self.bot.updater.deploying]
+
+        session_db = self.bot.db['Session']()
+        try:
+            pending = [name for name in candidates
+                       if get_pending(self.bot, session_db, name, self.bot.config['servers'][name])]
+        finally:
+            session_db.close()
+
+        for name in list(self.quiet_since):
+            if name not in pending:
+                del self.quiet_since[name]
+
+        if not pending:
+            return
+
+        counts = await self.bot.status.poll(pending)
+        now = time.monotonic()
+
+        for server_name in pending:
+            window = self.window(server_name)
+            max_players = self.bot.config['servers'][server_name].get('max_players', 0)
+            count = counts.get(server_name)
+
+            # Unreachable servers don't count as quiet
+            if count is None or count > max_players:
+                self.quiet_since.pop(server_name, None)
+                continue
+
+            quiet_since = self.quiet_since.setdefault(server_name, now)
+            if (now - quiet_since) * 1000 < window['quiet_for']:
+                continue
+            if not in_hours(window['hours'], datetime.now()):
+                continue
+
+            del self.quiet_since[server_name]
+            if window['approval'] == 'prompt':
+                if now - self.prompted.get(server_name, -REPROMPT_AFTER) < REPROMPT_AFTER:
+                    continue
+                self.prompted[server_name] = now
+                task = asyncio.create_task(self.prompt(server_name))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+            else:
+                await self.deploy(server_name, count)
+
+    async def prompt(self, server_name: str):
+        """Ask for approval now that the server is quiet"""
+        panel = get_panel(self.bot)
+        if panel:
+            await request_update(self.bot, panel, server_name)
+
+    async def deploy(self, server_name: str, players: int):
+        """Deploy a quiet server without asking"""
+        panel = get_panel(self.bot)
+        if not panel:
+            return
+
+        self.bot.updater.deploying.add(server_name)
+        session_db = self.bot.db['Session']()
+        pending = None
+        try:
+            pending = get_pending(self.bot, session_db, server_name, self.bot.config['servers'][server_name])
+            if not pending:
+                return
+
+            self.bot.log.info(f'{server_name} is quiet, deploying pending updates')
+            await deploy(self.bot, panel, session_db, server_name, pending)
+
+            await self.bot.outbox.send(self.bot.channel, STATUS, embed=create_approval_embed(
+                title=f'{server_name} has been updated automatically',
+                description=f'Server was restarted with the latest updates during its update window '
+                            f'with **{players} players online**.',
+                color=0x00FF00,
+                success=True
+            ), view=create_rollback_view(pending['deployment_id']))
+        except Exception as e:
+            self.bot.log.error(f'Error updating {server_name}: {e}')
+            await self.bot.outbox.send(self.bot.channel, STATUS, embed=create_approval_embed(
+                title=f'{server_name} update failed',
+                description=f'Error: {str(e)}',
+                color=0xFF0000,
+                success=False
+            ), view=create_rollback_view((pending or {}).get('deployment_id')))
+        finally:
+            self.bot.updater.deploying.discard(server_name)
+            session_db.close()
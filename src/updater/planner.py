@@ -0,0 +1,250 @@
+"""
+Rollout planning
+
+Works out what the next rollout will do before anything is touched: which
+files change on each server, how many bytes move, and how long the restarts
+are expected to take, from the timings of earlier restarts. The rollout
+executes the plan wave by wave, and the same plan is shown as a dry run by
+`/plan` and `python -m src.cli plan`.
+"""
+import json
+import math
+import os
+from statistics import median
+from typing import List
+
+from utils.fs import path
+from utils.discord_utils import capitalise
+from .upload_files import get_pending
+
+DEFAULT_HEALTH = {
+    'period': 120000,
+    'reconnect': 0.5,
+    'console_errors': 10
+}
+
+# Seconds assumed for a server with no restart history, if no other server has any either
+DEFAULT_TIMINGS = {
+    'stop': 10.0,
+    'upload': 5.0,
+    'start': 60.0
+}
+
+# Bytes per second assumed for uploads when there are no timings to go by
+DEFAULT_THROUGHPUT = 5 * 1024 * 1024
+
+# Recent successful restarts of a server that its estimate is based on
+HISTORY = 10
+
+def group_waves(bot, server_names: List[str]) -> List[List[str]]:
+    """Group servers into waves, canary servers first and servers without a wave last"""
+    groups = {}
+    for server_name in server_names:
+        wave = bot.config['servers'][server_name].get('rollout')
+        if wave == 'canary':
+            key = -1
+        elif wave is None:
+            key = math.inf
+        else:
+            key = int(wave)
+        groups.setdefault(key, []).append(server_name)
+    return [groups[key] for key in sorted(groups)]
+
+def schedule(durations: List[float], concurrency: int) -> float:
+    """Get how long jobs take when started in order on `concurrency` slots (0 for unlimited)"""
+    if not durations:
+        return 0.0
+    slots = [0.0] * (concurrency or len(durations))
+    for duration in durations:
+        slots[slots.index(min(slots))] += duration
+    return max(slots)
+
+def restart_timings(bot, session_db) -> dict:
+    """
+    Get the median stop, upload and start seconds of each server's recent restarts
+
+    Returns:
+        dict of server name -> timings, with the fleet-wide medians under None
+    """
+    model = bot.db['Restarts']
+    restarts = session_db.query(model).filter_by(success=1).order_by(model.id.desc()).all()
+
+    history = {}
+    for restart in restarts:
+        runs = history.setdefault(restart.server, [])
+        if len(runs) < HISTORY:
+            runs.append(restart)
+
+    def medians(runs) -> dict:
+        timings = {}
+        for key in DEFAULT_TIMINGS:
+            values = [getattr(run, f'{key}_seconds') for run in runs]
+            values = [v for v in values if v is not None]
+            if values:
+                timings[key] = median(values)
+        return timings
+
+    timings = {server_name: medians(runs) for server_name, runs in history.items()}
+    timings[None] = medians([run for runs in history.values() for run in runs])
+    return timings
+
+class ServerPlan:
+    """What a rollout does to one server"""
+
+    def __init__(self, server_name: str, wave: int, changes: List[dict], estimate: dict):
+        self.server = server_name
+        self.wave = wave
+        # dicts of name, file, old and new version and size in bytes
+        self.changes = changes
+        # Expected stop, upload and start seconds
+        self.estimate = estimate
+
+    @property
+    def bytes(self) -> int:
+        return sum(change['size'] for change in self.changes)
+
+    @property
+    def downtime(self) -> float:
+        return sum(self.estimate.values())
+
+    def to_dict(self) -> dict:
+        return {
+            'server': self.server,
+            'wave': self.wave,
+            'changes': self.changes,
+            'bytes': self.bytes,
+            'estimate': self.estimate,
+            'downtime': self.downtime
+        }
+
+class RolloutPlan:
+    """The servers a rollout updates, wave by wave, with its expected cost"""
+
+    def __init__(self, waves: List[List[ServerPlan]], concurrency: int, health_period: float):
+        self.waves = waves
+        self.concurrency = concurrency
+        self.health_period = health_period
+
+    @property
+    def servers(self) -> List[ServerPlan]:
+        return [server for wave in self.waves for server in wave]
+
+    @property
+    def bytes(self) -> int:
+        return sum(server.bytes for server in self.servers)
+
+    @property
+    def downtime(self) -> float:
+        """Seconds of downtime added up over every server"""
+        return sum(server.downtime for server in self.servers)
+
+    def wave_duration(self, index: int) -> float:
+        """Expected seconds from the first restart of a wave to its last server being back"""
+        return schedule([server.downtime for server in self.waves[index]], self.concurrency)
+
+    @property
+    def duration(self) -> float:
+        """Expected seconds for the whole rollout, including the health checks between waves"""
+        return sum(self.wave_duration(i) for i in range(len(self.waves))) + \
+            self.health_period * max(0, len(self.waves) - 1)
+
+    def to_dict(self) -> dict:
+        return {
+            'servers': len(self.servers),
+            'bytes': self.bytes,
+            'downtime': self.downtime,
+            'duration': self.duration,
+            'concurrency': self.concurrency,
+            'waves': [[server.to_dict() for server in wave] for wave in self.waves]
+        }
+
+    def describe(self) -> List[str]:
+        """Describe the plan for people, one line per wave, server and change"""
+        if not self.waves:
+            return ['Every server is up to date']
+
+        lines = [f'{len(self.servers)} servers, {self.bytes / 1024 / 1024:.1f} MiB, '
+                 f'~{self.duration / 60:.0f} min, {self.downtime:.0f}s downtime in total']
+        for index, wave in enumerate(self.waves):
+            lines.append(f'Wave {index + 1} (~{self.wave_duration(index):.0f}s)')
+            for server in wave:
+                lines.append(f'  {server.server}: {server.bytes / 1024 / 1024:.1f} MiB, ~{server.downtime:.0f}s down')
+                for change in server.changes:
+                    lines.append(f"    {change['name']} {change['old'] or 'none'} -> {change['new']}")
+        return lines
+
+def plan_server(bot, session_db, server_name: str, pending: dict) -> List[dict]:
+    """Get the file changes an update makes to a server"""
+    server_config = bot.config['servers'][server_name]
+    current = json.loads(pending['server'].plugins or '{}')
+
+    changes = []
+    if pending['jar']:
+        changes.append({
+            'name': f"{capitalise(server_config['jar']['type'])} {server_config['jar']['version']}",
+            'file': 'server.jar',
+            'local': path(f"data/servers/{pending['sjar'].id}/server.jar"),
+            'old': pending['server'].current,
+            'new': pending['sjar'].downloaded
+        })
+    for plugin_name in pending['plugins']:
+        plugin_config = bot.config['plugins'].get(plugin_name)
+        plugin = session_db.query(bot.db['Plugins']).filter_by(name=plugin_name).first()
+        if not plugin_config or not plugin:
+            continue
+        changes.append({
+            'name': plugin_name,
+            'file': f"plugins/{plugin_config['jar']}",
+            'local': path(f"data/plugins/{plugin_config['jar']}"),
+            'old': current.get(plugin_name),
+            'new': plugin.downloaded
+        })
+
+    for change in changes:
+        local = change.pop('local')
+        change['size'] = os.path.getsize(local) if os.path.exists(local) else 0
+    return changes
+
+def estimate(bot, timings: dict, server_name: str, size: int) -> dict:
+    """Expect a server's restart to take as long as its recent ones, or the fleet's"""
+    server_timings = timings.get(server_name) or {}
+    fleet_timings = timings.get(None) or {}
+
+    result = {key: server_timings.get(key, fleet_timings.get(key, default))
+              for key, default in DEFAULT_TIMINGS.items()}
+
+    # Without timings, an upload takes as long as the transfer, unless it was staged before the stop
+    if 'upload' not in fleet_timings and not bot.config.get('staged_uploads', False):
+        result['upload'] = max(DEFAULT_TIMINGS['upload'], size / DEFAULT_THROUGHPUT)
+    return result
+
+def build_plan(bot, server_names: List[str]) -> RolloutPlan:
+    """
+    Plan a rollout of the pending updates of `server_names`
+
+    Servers are grouped into their waves, and in each wave the servers
+    expected to restart fastest go first so the most servers are back soonest
+    when only `rollout_concurrency` restart at a time.
+    """
+    concurrency = bot.config.get('rollout_concurrency', 0)
+    health_period = {**DEFAULT_HEALTH, **(bot.config.get('rollout_health') or {})}['period'] / 1000
+
+    session_db = bot.db['Session']()
+    try:
+        timings = restart_timings(bot, session_db)
+        servers = {}
+        for server_name in server_names:
+            pending = get_pending(bot, session_db, server_name, bot.config['servers'][server_name])
+            if not pending:
+                bot.log.info(f'{server_name} has no updates pending')
+                continue
+            changes = plan_server(bot, session_db, server_name, pending)
+            servers[server_name] = (changes, estimate(bot, timings, server_name, sum(c['size'] for c in changes)))
+    finally:
+        session_db.close()
+
+    waves = []
+    for index, wave in enumerate(group_waves(bot, list(servers))):
+        plans = [ServerPlan(server_name, index, *servers[server_name]) for server_name in wave]
+        waves.append(sorted(plans, key=lambda plan: plan.downtime))
+    return RolloutPlan(waves, concurrency, health_period)
@@ -0,0 +1,29 @@
+"""
+Prefetch updates before they are approved
+"""
+import asyncio
+from datetime import datetime
+
+from . import providers
+from .maintenance import in_hours
+
+async def prefetch(bot):
+    """Download unapproved updates during the prefetch hours, within the prefetch quota"""
+    options = bot.config.get('prefetch')
+    if not options or not in_hours(options.get('hours'), datetime.now()):
+        return
+
+    bot.log.info('Prefetching unapproved updates')
+    active = providers.active(bot)
+    results = await asyncio.gather(
+        *(provider.prefetch_many(provider.select(bot.config)) for provider in active),
+        return_exceptions=True
+    )
+    for provider, result in zip(active, results):
+        if isinstance(result, Exception):
+            bot.log.error(f'Error prefetching {provider.source} updates: {result}')
+
+    # Oldest prefetched artifacts go first
+    evicted = bot.artifact_store.evict('prefetched', options.get('quota', 1024) * 1024 * 1024)
+    if evicted:
+        bot.log.info(f'Evicted {evicted} prefetched artifacts over the quota')
@@ -0,0 +1,103 @@
+"""
+Provider interface and registry
+
+Provider packages are only imported once the config references them, so a
+deployment without SpigotMC plugins never imports Playwright. Third-party
+sources can register a `Provider` subclass under the
+`spigot_updater.providers` entry point group, named after its source key.
+"""
+import importlib
+from abc import ABC, abstractmethod
+from importlib.metadata import entry_points
+
+ENTRY_POINT_GROUP = 'spigot_updater.providers'
+
+# Source key -> provider class, in the order they are run.
+# Server jar providers are keyed by `server_jars_api`, plugin providers by `source`.
+PROVIDERS = {
+    'papermc': 'paper.provider:PaperProvider',
+    'serverjars': 'serverjars.provider:ServerJarsProvider',
+    'github': 'github.provider:GitHubProvider',
+    'jenkins': 'jenkins.provider:JenkinsProvider',
+    'spigot': 'spigot.provider:SpigotProvider',
+    'bukkit': 'bukkit.provider:BukkitProvider'
+}
+
+class Provider(ABC):
+    """Base class for update sources"""
+
+    # Config key this provider handles
+    source = None
+    # 'server' for server jars, 'plugin' for plugins
+    kind = 'plugin'
+    # Whether check_many/download_many collapse items sharing an upstream lookup
+    batch = False
+    # Maximum number of concurrent requests this provider should make
+    concurrency = 1
+    # Hosts this provider talks to
+    hosts = ()
+
+    def __init__(self, bot):
+        self.bot = bot
+        bot.scheduler.register(self.source, self.concurrency)
+
+    def select(self, config: dict) -> dict:
+        """Get the config items this provider is responsible for"""
+        if self.kind == 'server':
+            return dict(config['servers'])
+        names = self.bot.indexes.source_plugins.get(self.source, [])
+        return {name: config['plugins'][name] for name in names}
+
+    @abstractmethod
+    async def check_many(self, items: dict):
+        """Check a batch of items for updates"""
+
+    @abstractmethod
+    async def download_many(self, items: dict):
+        """Download the approved versions of a batch of items"""
+
+    async def prefetch_many(self, items: dict):
+        """Download the latest versions of a batch of items before they are approved, if supported"""
+
+def _third_party() -> dict:
+    """Get provider entry points installed by other packages"""
+    return {ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP)}
+
+def resolve(source: str, third_party: dict = None):
+    """Import and return the provider class for a source key"""
+    if source in PROVIDERS:
+        module_name, class_name = PROVIDERS[source].split(':')
+        return getattr(importlib.import_module(module_name), class_name)
+
+    third_party = _third_party() if third_party is None else third_party
+    if source in third_party:
+        return third_party[source].load()
+
+    return None
+
+def active(bot, kind: str = None) -> list:
+    """Get instances of the providers used by the config, in run order"""
+    keys = []
+
+    if bot.config.get('servers'):
+        keys.append(str(bot.config.get('server_jars_api', 'papermc')).lower())
+
+    used = set(bot.indexes.source_plugins)
+    keys += [k for k in PROVIDERS if k in used]
+    keys += sorted(used - set(PROVIDERS))
+
+    third_party = None
+    if any(k not in PROVIDERS for k in keys):
+        third_party = _third_party()
+
+    providers = []
+    for key in keys:
+        cls = resolve(key, third_party)
+        if cls is None:
+            bot.log.warning(f"Unknown source '{key}'")
+            continue
+        if kind and cls.kind != kind:
+            continue
+        providers.append(cls(bot))
+
+    return providers
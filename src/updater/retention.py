@@ -0,0 +1,96 @@
+"""
+Retention of downloaded files
+"""
+import json
+import shutil
+import time
+from pathlib import Path
+
+from utils.artifact_store import plugin_item, jar_item
+from utils.fs import path
+from .rollback import latest_deployment
+
+# Seconds before leftovers in data/temp are deleted
+TEMP_MAX_AGE = 86400
+
+def protected(bot, session_db) -> set:
+    """Get the `(item, version)` pairs that are approved, downloaded, deployed or needed for a rollback"""
+    pairs = set()
+
+    for plugin in session_db.query(bot.db['Plugins']):
+        pairs.update((plugin_item(plugin.name), v) for v in (plugin.approved, plugin.downloaded) if v)
+
+    for jar in session_db.query(bot.db['ServerJars']):
+        pairs.update((jar_item(jar.type, jar.version), b) for b in (jar.approved_build, jar.downloaded) if b)
+
+    for server in session_db.query(bot.db['Servers']):
+        server_config = bot.config['servers'].get(server.name)
+        if not server_config:
+            continue
+        if server.current:
+            pairs.add((jar_item(server_config['jar']['type'], server_config['jar']['version']), server.current))
+        pairs.update((plugin_item(n), v) for n, v in json.loads(server.plugins or '{}').items())
+
+        # Keep what the latest deployment replaced, so it can be rolled back
+        deployment = latest_deployment(bot, session_db, server.name)
+        if deployment and not deployment.rolled_back:
+            if deployment.previous_jar:
+                pairs.add((jar_item(server_config['jar']['type'], server_config['jar']['version']),
+                           deployment.previous_jar))
+            pairs.update((plugin_item(n), v) for n, v in json.loads(deployment.previous_plugins or '{}').items())
+
+    return pairs
+
+def clean_live(bot, session_db):
+    """Delete live files the config no longer uses, and old temp files"""
+    jars = {plugin_config['jar'] for plugin_config in bot.config['plugins'].values()}
+    for file in Path(path('data/plugins')).glob('*.jar'):
+        if file.name not in jars:
+            bot.log.info(f'Deleting unused plugin {file.name}')
+            file.unlink()
+
+    for plugin in session_db.query(bot.db['Plugins']):
+        if plugin.name not in bot.config['plugins']:
+            plugin.downloaded = None
+
+    for jar in session_db.query(bot.db['ServerJars']):
+        jar_dir = Path(path(f'data/servers/{jar.id}'))
+        if (jar.type.lower(), str(jar.version)) not in bot.indexes.jar_servers and jar_dir.exists():
+            bot.log.info(f'Deleting unused server jar {jar.type} {jar.version}')
+            shutil.rmtree(jar_dir, ignore_errors=True)
+            jar.downloaded = None
+
+    session_db.commit()
+
+    cutoff = time.time() - TEMP_MAX_AGE
+    for entry in Path(path('data/temp')).glob('*'):
+        if entry.stat().st_mtime < cutoff:
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entry.unlink()
+
+def collect_garbage(bot):
+    """Apply the retention policy to the artifact store and live files"""
+    options = bot.config.get('retention') or {}
+
+    session_db = bot.db['Session']()
+    try:
+        clean_live(bot, session_db)
+        keep = protected(bot, session_db)
+    finally:
+        session_db.close()
+
+    evicted = bot.artifact_store.retain(
+        keep,
+        options.get('keep', 3),
+        options.get('quota', 2048) * 1024 * 1024
+    )
+    if evicted:
+        bot.log.info(f'Deleted {evicted} old artifacts')
+
+    usage = bot.artifact_store.usage()
+    if usage:
+        bot.log.info('Artifact store usage: ' + ', '.join(
+            f'{source} {size / 1024 / 1024:.1f} MiB' for source, size in sorted(usage.items())
+        ))
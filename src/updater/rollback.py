@@ -0,0 +1,187 @@
+"""
+Roll servers back to the files they had before a deploy
+
+Every deploy records the server jar and plugin versions a server had before
+it. Rolling back deploys those versions to that server from the artifact
+store, without downloading anything. Other servers and the approved versions
+are left alone, and the server skips the versions it was rolled back from
+until newer ones are downloaded.
+"""
+import json
+
+import discord
+
+from utils.artifact_store import plugin_item, jar_item
+from utils.discord_utils import capitalise, create_approval_embed, create_rollback_button
+from utils.outbox import STATUS
+from .upload_files import get_panel, deploy
+
+def latest_deployment(bot, session_db, server_name: str):
+    """Get the most recent update of a server, not counting rollbacks, or None"""
+    model = bot.db['Deployments']
+    return session_db.query(model).filter(
+        model.server == server_name,
+        model.rollback_of.is_(None)
+    ).order_by(model.id.desc()).first()
+
+def rolled_back_files(bot, deployment) -> tuple:
+    """
+    Work out what a rollback puts back
+
+    Returns:
+        The previous jar build (or None if the jar is unchanged) and a dict of
+        plugin name -> previous version for the plugins that changed
+    """
+    previous = json.loads(deployment.previous_plugins or '{}')
+    deployed = json.loads(deployment.plugins or '{}')
+    plugins = {
+        name: version for name, version in previous.items()
+        if deployed.get(name) != version and name in bot.config['plugins']
+    }
+
+    jar = deployment.previous_jar if deployment.previous_jar and deployment.previous_jar != deployment.jar else None
+    return jar, plugins
+
+def check_stored(bot, server_name: str, jar: str, plugins: dict):
+    """
+    Make sure the versions a rollback puts back are still in the artifact store
+
+    Raises:
+        RuntimeError: If an earlier version is no longer stored
+    """
+    jar_config = bot.config['servers'][server_name]['jar']
+    wanted = [(jar_item(jar_config['type'], jar_config['version']), jar)] if jar else []
+    wanted.extend((plugin_item(name), version) for name, version in plugins.items())
+
+    missing = [f'{item} {version}' for item, version in wanted if not bot.artifact_store.find(item, version)]
+    if missing:
+        raise RuntimeError(f"No stored copy of {', '.join(missing)}")
+
+async def rollback(bot, deployment_id: int, user) -> list:
+    """
+    Roll a server back to what it had before a deployment
+
+    Only the latest update of a server can be rolled back, and only on that
+    server. The server isn't updated to the versions it was rolled back from
+    again, but gets the next newer ones.
+
+    Returns:
+        The names of the items that were rolled back
+
+    Raises:
+        RuntimeError: If the deployment can't be rolled back
+    """
+    session_db = bot.db['Session']()
+    server_name = None
+    deploying = False
+    try:
+        deployment = session_db.get(bot.db['Deployments'], deployment_id)
+        if not deployment or deployment.server not in bot.config['servers']:
+            raise RuntimeError('This deployment no longer exists')
+        server_name = deployment.server
+
+        if deployment.rollback_of:
+            raise RuntimeError(f'This was a rollback of {server_name}, roll back its update instead')
+        if deployment.rolled_back:
+            raise RuntimeError(f'{server_name} has already been rolled back')
+        if latest_deployment(bot, session_db, server_name).id != deployment.id:
+            raise RuntimeError(f'{server_name} has been updated since, only its latest update can be rolled back')
+        if server_name in bot.updater.deploying:
+            raise RuntimeError(f'{server_name} is being updated right now')
+
+        jar, plugins = rolled_back_files(bot, deployment)
+        if not jar and not plugins:
+            raise RuntimeError(f'{server_name} has nothing to roll back to')
+
+        panel = get_panel(bot)
+        if not panel:
+            raise RuntimeError('Pterodactyl credentials not configured')
+
+        bot.updater.deploying.add(server_name)
+        deploying = True
+        bot.log.info(f'{user.name} is rolling back {server_name}')
+
+        check_stored(bot, server_name, jar, plugins)
+        jar_config = bot.config['servers'][server_name]['jar']
+
+        # Only the rolled back files, at their earlier versions, not anything else that is waiting
+        pending = {
+            'server': session_db.query(bot.db['Servers']).filter_by(name=server_name).first(),
+            'sjar': session_db.query(bot.db['ServerJars']).filter_by(
+                type=jar_config['type'],
+                version=jar_config['version']
+            ).first(),
+            'plugins': list(plugins),
+            'jar': bool(jar),
+            'jar_build': jar,
+            'plugin_versions': plugins,
+            'rollback_of': deployment.id
+        }
+        deployment.rolled_back = 1
+        session_db.commit()
+
+        await deploy(bot, panel, session_db, server_name, pending)
+
+        names = [f"{capitalise(jar_config['type'])} {jar_config['version']} build {jar}"] if jar else []
+        names.extend(f'{name} {version}' for name, version in plugins.items())
+        bot.log.success(f"Rolled {server_name} back to {', '.join(names)}")
+        return names
+    finally:
+        if deploying:
+            bot.updater.deploying.discard(server_name)
+        session_db.close()
+
+class RollbackButton(discord.ui.DynamicItem[discord.ui.Button], template=r'rollback:(?P<id>[0-9]+)'):
+    """Button on an update result that rolls the deployment back, kept working across restarts"""
+
+    def __init__(self, deployment_id: int):
+        super().__init__(create_rollback_button(deployment_id))
+        self.deployment_id = deployment_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match['id']))
+
+    async def callback(self, interaction: discord.Interaction):
+        bot = interaction.client
+        if interaction.channel_id != int(bot.config.get('channel_id', 0)) or \
+                not interaction.permissions.manage_guild:
+            await interaction.response.send_message('You can\'t roll back updates.', ephemeral=True)
+            return
+
+        await interaction.response.defer()
+        await run_rollback(bot, self.deployment_id, interaction.user, interaction.message)
+
+async def run_rollback(bot, deployment_id: int, user, message=None):
+    """Roll a deployment back and post the result, removing the button from `message` if it worked"""
+    try:
+        names = await rollback(bot, deployment_id, user)
+    except Exception as e:
+        bot.log.error(f'Rollback failed: {e}')
+        await bot.outbox.send(bot.channel, STATUS, embed=create_approval_embed(
+            title='Rollback failed',
+            description=f'Error: {str(e)}',
+            approved_by=user.mention,
+            color=0xFF0000,
+            success=False
+        ))
+        return
+
+    if message:
+        await bot.outbox.edit(message, view=None)
+
+    session_db = bot.db['Session']()
+    try:
+        server_name = session_db.get(bot.db['Deployments'], deployment_id).server
+    finally:
+        session_db.close()
+
+    await bot.outbox.send(bot.channel, STATUS, embed=create_approval_embed(
+        title=f'{server_name} has been rolled back',
+        description='Server was restarted with ' + ', '.join(f'**{n}**' for n in names) + '.\n\n'
+                    'Other servers keep their versions. This server skips the versions it was rolled back from '
+                    'and is updated again once newer ones are downloaded.',
+        approved_by=user.mention,
+        color=0xFFA500,
+        success=True
+    ))
@@ -0,0 +1,150 @@
+"""
+Wave rollouts
+
+Servers can be given a `rollout` of `canary` or a wave number. The upload task
+plans the rollout, then updates the canary servers first and each wave in
+turn, with the servers in a wave updated at the same time. Before the next
+wave starts, every server in the current one has to have been updated and
+pass a health check. A failed, dismissed or unapproved update or a failed
+health check stops the rollout.
+"""
+import asyncio
+import math
+import re
+from typing import List, Optional
+
+import discord
+
+from utils.discord_utils import create_approval_embed, create_rollback_button
+from utils.outbox import STATUS
+from .upload_files import request_update
+from .rollback import latest_deployment
+from .planner import DEFAULT_HEALTH, build_plan
+
+# Console lines counted as errors, by their Paper or Spigot log level
+ERROR_LINE = re.compile(r'\b(ERROR|SEVERE)\]')
+
+# Why a server that wasn't deployed holds back the later waves, by `request_update` result
+BLOCKING = {
+    'failed': 'its update failed',
+    'dismissed': 'its update was dismissed',
+    'timeout': 'nobody approved its update in time',
+    None: 'it no longer had updates pending, so it was not tested'
+}
+
+class HealthCheck:
+    """Count a server's console errors from its update until it has been checked"""
+
+    def __init__(self, bot, server_name: str):
+        self.bot = bot
+        self.server_name = server_name
+        self.errors = 0
+        # Players online before the update, from the snapshot the upload task polled
+        cached = bot.status.cached(server_name, max_age=math.inf)
+        self.players = cached[1] if cached else None
+
+    def on_console(self, line: str):
+        if ERROR_LINE.search(line):
+            self.errors += 1
+
+    async def run(self, panel, options: dict) -> Optional[str]:
+        """
+        Watch the server for the health check period
+
+        Returns:
+            Why the server is unhealthy, or None if it is healthy
+        """
+        pterodactyl_id = self.bot.config['servers'][self.server_name]['pterodactyl_id']
+        async with panel.watch(pterodactyl_id, self.bot.log) as watcher:
+            watcher.on_console(self.on_console)
+            await asyncio.sleep(options['period'] / 1000)
+            state = watcher.state
+
+        if state != 'running':
+            return f'it is {state}'
+
+        players = await self.bot.status.probe(self.server_name)
+        if players is None:
+            return 'it is not answering status pings'
+
+        expected = int((self.players or 0) * options['reconnect'])
+        if players < expected:
+            return f'only {players} of {self.players} players reconnected'
+
+        if self.errors > options['console_errors']:
+            return f'it logged {self.errors} console errors'
+
+        return None
+
+class Rollout:
+    """Update servers wave by wave, stopping when a wave isn't healthy"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @property
+    def health(self) -> dict:
+        return {**DEFAULT_HEALTH, **(self.bot.config.get('rollout_health') or {})}
+
+    async def run(self, panel, server_names: List[str]):
+        """Plan a rollout of the pending updates of `server_names` and carry it out"""
+        plan = build_plan(self.bot, server_names)
+        if not plan.waves:
+            return
+        self.bot.log.info('Rollout plan: ' + plan.describe()[0])
+
+        # Restarts running at once, the rest wait for a slot once approved
+        slot = asyncio.Semaphore(plan.concurrency) if plan.concurrency else None
+
+        for index, wave in enumerate(plan.waves):
+            wave = [server.server for server in wave]
+            checks = {server_name: HealthCheck(self.bot, server_name) for server_name in wave}
+            results = await asyncio.gather(*(
+                request_update(self.bot, panel, server_name, mention=index == 0 and i == 0,
+                               console=checks[server_name].on_console, slot=slot)
+                for i, server_name in enumerate(wave)
+            ))
+
+            remaining = [server.server for later in plan.waves[index + 1:] for server in later]
+            if not remaining:
+                return
+
+            # A wave only gates the next one if every server in it was updated and checked
+            problems = {server_name: BLOCKING[result]
+                        for server_name, result in zip(wave, results) if result != 'deployed'}
+            unhealthy = []
+            if not problems:
+                self.bot.log.info(f"Checking the health of {', '.join(wave)}")
+                reasons = await asyncio.gather(*(checks[server_name].run(panel, self.health)
+                                                 for server_name in wave))
+                problems = {server_name: reason for server_name, reason in zip(wave, reasons) if reason}
+                unhealthy = list(problems)
+
+            if problems:
+                await self.stop(problems, remaining, unhealthy)
+                return
+
+    async def stop(self, problems: dict, remaining: List[str], unhealthy: List[str]):
+        """Report a stopped rollout, with rollback buttons for the unhealthy servers"""
+        for server_name, reason in problems.items():
+            self.bot.log.error(f'{server_name} stopped the rollout: {reason}')
+        self.bot.log.warning(f"Rollout stopped, {', '.join(remaining)} were not updated")
+
+        view = discord.ui.View(timeout=None)
+        session_db = self.bot.db['Session']()
+        try:
+            for server_name in unhealthy:
+                deployment = latest_deployment(self.bot, session_db, server_name)
+                if deployment and len(view.children) < 25:
+                    view.add_item(create_rollback_button(deployment.id, f'Roll back {server_name}'))
+        finally:
+            session_db.close()
+
+        description = '\n'.join(f'**{server_name}**: {reason}' for server_name, reason in problems.items())
+        await self.bot.outbox.send(self.bot.channel, STATUS, embed=create_approval_embed(
+            title='Rollout stopped',
+            description=f"{description}\n\nA wave has to be updated and healthy before the next one starts. "
+                        f"Not updated: {', '.join(f'`{s}`' for s in remaining)}",
+            color=0xFF0000,
+            success=False
+        ), view=view if view.children else None)
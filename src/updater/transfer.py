@@ -0,0 +1,106 @@
+"""
+Move files onto Pterodactyl servers
+"""
+import asyncio
+import posixpath
+import zipfile
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+# Directory new files are uploaded to while the server is still running
+STAGING_DIR = '.spigot-updater'
+
+# Directory below STAGING_DIR the replaced files are kept in until the new ones are in place
+OLD_DIR = 'old'
+
+# Name of the archive batched uploads are packed into
+ARCHIVE_NAME = 'spigot-updater.zip'
+
+def pack(files: List[Tuple[str, str]], archive: str):
+    """Write `(local path, remote path)` pairs into a zip archive at their remote paths"""
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for local, remote in files:
+            zf.write(local, remote)
+
+async def upload(bot, panel, server: str, files: List[Tuple[str, str]], root: str = '/',
+                 stored: Optional[Dict[str, str]] = None):
+    """
+    Upload `(local path, remote path)` pairs below `root`
+
+    Files are pulled by the node from the artifact server when it's running,
+    from their copy in `stored` (local path -> artifact store file) if they
+    have one, so a download finishing mid-deploy can't change what is pulled.
+    Otherwise they are sent with one request per directory, or packed into one
+    archive and extracted on the server if there are at least `archive_uploads`
+    of them.
+    """
+    if bot.artifacts.enabled:
+        stored = stored or {}
+        await asyncio.gather(*(
+            panel.pull(server, bot.artifacts.url(stored.get(local, local)),
+                       posixpath.join(root, posixpath.dirname(remote)), posixpath.basename(remote))
+            for local, remote in files
+        ))
+        return
+
+    threshold = bot.config.get('archive_uploads', 0)
+    if threshold and len(files) >= threshold:
+        with bot.scheduler.temp_dir('upload-') as temp_dir:
+            archive = temp_dir / ARCHIVE_NAME
+            await asyncio.to_thread(pack, files, archive)
+            await panel.upload(server, root, [str(archive)])
+        await panel.decompress(server, root, ARCHIVE_NAME)
+        await panel.delete_files(server, root, [ARCHIVE_NAME])
+        return
+
+    directories = defaultdict(list)
+    for local, remote in files:
+        directories[posixpath.dirname(remote)].append(local)
+
+    for directory, paths in directories.items():
+        await panel.upload(server, posixpath.join(root, directory), paths)
+
+async def stage(bot, panel, server: str, files: List[Tuple[str, str]],
+                stored: Optional[Dict[str, str]] = None):
+    """Upload files into the staging directory so they can be swapped in later"""
+    try:
+        # Clear anything left behind by an interrupted deploy
+        await panel.delete_files(server, '/', [STAGING_DIR])
+    except aiohttp.ClientResponseError:
+        pass
+    await upload(bot, panel, server, files, root=f'/{STAGING_DIR}', stored=stored)
+
+async def promote(panel, server: str, files: List[Tuple[str, str]]):
+    """
+    Replace the live files with the staged ones and remove the staging directory
+
+    The live files are moved aside first and only deleted once the staged
+    ones are in place. If that fails they are moved back before the error is
+    raised, so the server isn't left without its jars.
+    """
+    remote = [r for _, r in files]
+
+    # Renaming onto an existing file fails, so the old files go first
+    existing = set()
+    for directory in {posixpath.dirname(r) for r in remote}:
+        listing = await panel.list_files(server, '/' + directory)
+        existing.update(posixpath.join(directory, f['name']) for f in listing)
+
+    replaced = [(r, posixpath.join(STAGING_DIR, OLD_DIR, r)) for r in remote if r in existing]
+    if replaced:
+        await panel.rename_files(server, '/', replaced)
+
+    try:
+        await panel.rename_files(server, '/', [(posixpath.join(STAGING_DIR, r), r) for r in remote])
+    except Exception:
+        # Files that were already swapped in stay, the others get their old copy back
+        for live, old in replaced:
+            try:
+                await panel.rename_files(server, '/', [(old, live)])
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+        raise
+
+    await panel.delete_files(server, '/', [STAGING_DIR])
@@ -4,177 +4,431 @@ Upload files to Pterodactyl servers
 import asyncio
 import os
 import json
-import sys
-from pathlib import Path as PathLib
-
-# Add src directory to path
-sys.path.insert(0, str(PathLib(__file__).parent.parent))
+import time
+from contextlib import nullcontext
+from typing import Callable, List, Optional
 
 from pterodactyl import Pterodactyl
-from utils.minecraft import get_player_count, wait
+from utils.minecraft import get_player_count
 from utils.fs import path
-from utils.discord_utils import create_server_update_embed, create_approval_embed
+from utils.discord_utils import create_server_update_embed, create_approval_embed, create_rollback_view
+from utils.outbox import PROMPT
+from utils.artifact_store import plugin_item, jar_item
+from . import transfer
 
-async def upload_files(bot):
-    """Upload approved updates to servers"""
+def get_panel(bot):
+    """Create a Pterodactyl client from the environment, or None if not configured"""
     ptero_host = os.getenv('PTERO_HOST')
     ptero_key = os.getenv('PTERO_CLIENT_KEY')
-    
+
     if not ptero_host or not ptero_key:
-        return bot.log.error('Pterodactyl credentials not configured')
-    
-    panel = Pterodactyl(ptero_host, ptero_key)
-    
-    pinged = False
-    
-    for server_name, server_config in bot.config['servers'].items():
-        pterodactyl_id = server_config.get('pterodactyl_id')
-        if not pterodactyl_id:
+        bot.log.error('Pterodactyl credentials not configured')
+        return None
+
+    return Pterodactyl(ptero_host, ptero_key)
+
+def rolled_back_versions(bot, session_db, server_name: str) -> tuple:
+    """
+    Get the versions a server was rolled back from
+
+    Returns:
+        A set of server jar builds and a dict of plugin name -> set of versions
+    """
+    model = bot.db['Deployments']
+    jars = set()
+    plugins = {}
+    for rollback in session_db.query(model).filter(model.server == server_name, model.rollback_of.isnot(None)):
+        if rollback.previous_jar and rollback.previous_jar != rollback.jar:
+            jars.add(rollback.previous_jar)
+        restored = json.loads(rollback.plugins or '{}')
+        for plugin_name, version in json.loads(rollback.previous_plugins or '{}').items():
+            if restored.get(plugin_name) != version:
+                plugins.setdefault(plugin_name, set()).add(version)
+    return jars, plugins
+
+def get_pending(bot, session_db, server_name: str, server_config: dict):
+    """
+    Work out what needs to be uploaded to a server
+
+    Returns:
+        dict with the server record, server jar record, plugins to update and
+        whether the jar needs updating, or None if the server is up to date
+    """
+    # Get server record
+    server = session_db.query(bot.db['Servers']).filter_by(name=server_name).first()
+    if not server:
+        server = bot.db['Servers'](name=server_name, plugins='{}')
+        session_db.add(server)
+        session_db.commit()
+
+    # Get server jar record
+    jar_type = server_config['jar']['type']
+    jar_version = server_config['jar']['version']
+    sjar = session_db.query(bot.db['ServerJars']).filter_by(
+        type=jar_type,
+        version=jar_version
+    ).first()
+
+    # Versions this server was rolled back from are skipped until newer ones are downloaded
+    rejected_jars, rejected_plugins = rolled_back_versions(bot, session_db, server_name)
+
+    # Check which plugins need updating
+    plugins_to_update = []
+    current_plugins = json.loads(server.plugins or '{}')
+
+    for plugin_name in server_config.get('plugins') or []:
+        plugin = session_db.query(bot.db['Plugins']).filter_by(name=plugin_name).first()
+        if plugin and plugin.downloaded and current_plugins.get(plugin_name) != plugin.downloaded and \
+                plugin.downloaded not in rejected_plugins.get(plugin_name, ()):
+            plugins_to_update.append(plugin_name)
+
+    # Check if server jar needs updating
+    jar_needs_updating = bool(sjar and sjar.downloaded and server.current != sjar.downloaded and
+                              sjar.downloaded not in rejected_jars)
+
+    if not plugins_to_update and not jar_needs_updating:
+        return None
+
+    return {
+        'server': server,
+        'sjar': sjar,
+        'plugins': plugins_to_update,
+        'jar': jar_needs_updating
+    }
+
+async def wait_until_reachable(bot, server_name: str, timeout: float) -> bool:
+    """Wait until a server answers status pings, if it has an address or Left4Status ID to check"""
+    server_config = bot.config['servers'][server_name]
+    if not server_config.get('address') and not (server_config.get('left4status') and bot.config.get('left4status')):
+        return True
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if await bot.status.probe(server_name) is not None:
+            return True
+        await asyncio.sleep(5)
+    return False
+
+def record_restart(bot, session_db, server_name: str, timings: dict, killed: bool, success: bool):
+    """Log how long a deploy kept a server down and store the timings"""
+    downtime = timings.get('downtime')
+    if success:
+        bot.log.success(f'{server_name} was down for {downtime:.1f}s')
+    else:
+        bot.log.error(f'{server_name} did not come back after its update')
+
+    session_db.add(bot.db['Restarts'](
+        server=server_name,
+        stop_seconds=timings.get('stop'),
+        upload_seconds=timings.get('upload'),
+        start_seconds=timings.get('start'),
+        downtime=downtime,
+        killed=int(killed),
+        success=int(success)
+    ))
+    session_db.commit()
+
+def jar_build(pending: dict) -> Optional[str]:
+    """Get the server jar build a deploy puts in place"""
+    return pending.get('jar_build') or pending['sjar'].downloaded
+
+def stored_file(bot, item: str, version: str) -> str:
+    """
+    Get the stored copy of an item version
+
+    Raises:
+        RuntimeError: If the version is no longer in the artifact store
+    """
+    file = bot.artifact_store.find(item, version)
+    if not file:
+        raise RuntimeError(f'No stored copy of {item} {version}')
+    return str(file)
+
+def collect_files(bot, session_db, server_name: str, pending: dict):
+    """
+    Work out which local files a deploy puts where
+
+    The downloaded versions are deployed, unless `pending` names others as
+    `jar_build` and `plugin_versions`, which are taken from the artifact store.
+
+    Returns:
+        `(local path, remote path)` pairs and the plugin versions they carry
+
+    Raises:
+        RuntimeError: If a version named in `pending` is no longer stored
+    """
+    files = []
+    if pending['jar']:
+        local = path(f"data/servers/{pending['sjar'].id}/server.jar")
+        if pending.get('jar_build'):
+            jar_config = bot.config['servers'][server_name]['jar']
+            local = stored_file(bot, jar_item(jar_config['type'], jar_config['version']), pending['jar_build'])
+        files.append((local, 'server.jar'))
+
+    versions = {}
+    chosen = pending.get('plugin_versions') or {}
+    for plugin_name in pending['plugins']:
+        plugin_config = bot.config['plugins'].get(plugin_name)
+        if plugin_config:
+            local = stored_file(bot, plugin_item(plugin_name), chosen[plugin_name]) if plugin_name in chosen \
+                else path(f"data/plugins/{plugin_config['jar']}")
+            files.append((local, f"plugins/{plugin_config['jar']}"))
+
+        if plugin_name in chosen:
+            versions[plugin_name] = chosen[plugin_name]
             continue
-        
-        session_db = bot.db['Session']()
+        plugin = session_db.query(bot.db['Plugins']).filter_by(name=plugin_name).first()
+        if plugin:
+            versions[plugin_name] = plugin.downloaded
+
+    return files, versions
+
+def stored_files(bot, server_name: str, pending: dict, plugin_versions: dict) -> dict:
+    """
+    Find the artifact store copies of the files a deploy puts on a server
+
+    Stored copies are kept per version and never change, unlike the live files
+    which the next download replaces.
+
+    Returns:
+        dict of local path -> stored file, for the files that are in the store
+    """
+    stored = {}
+    if pending['jar']:
+        jar_config = bot.config['servers'][server_name]['jar']
+        file = bot.artifact_store.find(jar_item(jar_config['type'], jar_config['version']), jar_build(pending))
+        if file:
+            stored[path(f"data/servers/{pending['sjar'].id}/server.jar")] = file
+    for plugin_name, version in plugin_versions.items():
+        plugin_config = bot.config['plugins'].get(plugin_name)
+        file = bot.artifact_store.find(plugin_item(plugin_name), version)
+        if plugin_config and file:
+            stored[path(f"data/plugins/{plugin_config['jar']}")] = file
+    return stored
+
+def mark_deployed(bot, server_name: str, pending: dict, plugin_versions: dict):
+    """Record the stored artifacts a deploy put on a server as deployed"""
+    if pending['jar']:
+        jar_config = bot.config['servers'][server_name]['jar']
+        bot.artifact_store.mark(jar_item(jar_config['type'], jar_config['version']), jar_build(pending), 'deployed')
+    for plugin_name, version in plugin_versions.items():
+        bot.artifact_store.mark(plugin_item(plugin_name), version, 'deployed')
+
+async def deploy(bot, panel, session_db, server_name: str, pending: dict,
+                 console: Optional[Callable[[str], None]] = None):
+    """
+    Stop a server, upload its pending files and start it again
+
+    The server's power state is followed over the panel websocket, so the
+    upload begins as soon as the server is offline and the deploy only
+    finishes once it is running and answering status pings. With
+    `staged_uploads` the files are uploaded before the server is stopped and
+    only moved into place while it is down.
+
+    The ID of the recorded deployment is added to `pending` as
+    `deployment_id`, including when the server fails to come back up.
+    `console` is called with the server's console lines while it is watched.
+
+    Raises:
+        RuntimeError: If the server doesn't stop even when killed, before any
+            live file is replaced, or doesn't come back up within `start_timeout`
+    """
+    pterodactyl_id = bot.config['servers'][server_name]['pterodactyl_id']
+    server = pending['server']
+    stop_timeout = bot.config.get('stop_timeout', 60000) / 1000
+    start_timeout = bot.config.get('start_timeout', 300000) / 1000
+    staged = bot.config.get('staged_uploads', False)
+
+    files, plugin_versions = collect_files(bot, session_db, server_name, pending)
+    stored = stored_files(bot, server_name, pending, plugin_versions)
+    timings = {}
+    killed = False
+
+    async with panel.watch(pterodactyl_id, bot.log) as watcher:
+        if console:
+            watcher.on_console(console)
+        if staged:
+            bot.log.info(f'Staging {len(files)} files for {server_name}')
+            await transfer.stage(bot, panel, pterodactyl_id, files, stored)
+
+        # Stop server, killing it if it doesn't stop in time
+        stopped_at = time.monotonic()
+        if watcher.state != 'offline':
+            await panel.stop(pterodactyl_id)
+            if not await watcher.wait_for('offline', stop_timeout):
+                bot.log.warning(f'{server_name} did not stop in time, killing it')
+                killed = True
+                await panel.kill(pterodactyl_id)
+                if not await watcher.wait_for('offline', stop_timeout):
+                    raise RuntimeError(f'{server_name} did not stop')
+        timings['stop'] = time.monotonic() - stopped_at
+
+        # Put the new files in place
+        uploaded_at = time.monotonic()
+        if staged:
+            await transfer.promote(panel, pterodactyl_id, files)
+        else:
+            bot.log.info(f'Uploading {len(files)} files for {server_name}')
+            await transfer.upload(bot, panel, pterodactyl_id, files, stored=stored)
+
+        # Remember what was there before so it can be rolled back
+        deployment = bot.db['Deployments'](
+            server=server_name,
+            previous_jar=server.current,
+            previous_plugins=server.plugins or '{}',
+            rollback_of=pending.get('rollback_of')
+        )
+        if pending['jar']:
+            server.current = jar_build(pending)
+        if plugin_versions:
+            server.plugins = json.dumps({**json.loads(server.plugins or '{}'), **plugin_versions})
+        deployment.jar = server.current
+        deployment.plugins = server.plugins or '{}'
+        session_db.add(deployment)
+        session_db.commit()
+        pending['deployment_id'] = deployment.id
+        mark_deployed(bot, server_name, pending, plugin_versions)
+        timings['upload'] = time.monotonic() - uploaded_at
+
+        # Start server and wait until players can join again
+        started_at = time.monotonic()
+        await panel.start(pterodactyl_id)
+        success = (await watcher.wait_for('running', start_timeout) and
+                   await wait_until_reachable(bot, server_name, start_timeout - (time.monotonic() - started_at)))
+        timings['start'] = time.monotonic() - started_at
+        timings['downtime'] = time.monotonic() - stopped_at
+
+    record_restart(bot, session_db, server_name, timings, killed, success)
+    if not success:
+        raise RuntimeError(f'{server_name} did not come back up within {start_timeout:.0f}s')
+
+async def request_update(bot, panel, server_name: str, mention: bool = False,
+                         console: Optional[Callable[[str], None]] = None,
+                         slot: Optional[asyncio.Semaphore] = None) -> Optional[str]:
+    """
+    Ask for approval to update a server and deploy it if approved
+
+    Once approved, the deploy waits for `slot` if one is given.
+
+    Returns:
+        None if the server had no updates pending, otherwise `deployed`,
+        `dismissed`, `timeout` or `failed`
+    """
+    server_config = bot.config['servers'][server_name]
+
+    session_db = bot.db['Session']()
+    message = None
+    try:
+        pending = get_pending(bot, session_db, server_name, server_config)
+        if not pending:
+            bot.log.info(f'{server_name} has no updates pending')
+            return None
+
+        # Don't let the maintenance task touch this server while we wait
+        bot.updater.deploying.add(server_name)
+
+        if mention:
+            await bot.outbox.send(bot.channel, PROMPT, content='@here')
+
+        # Check player count
+        max_players = server_config.get('max_players', 0)
+        current_players = await get_player_count(bot, server_name)
+
+        # Create approval message
+        embed = create_server_update_embed(
+            server_name=server_name,
+            current_players=current_players,
+            max_players=max_players,
+            plugins_to_update=pending['plugins'],
+            jar_update=pending['jar']
+        )
+
+        message = await bot.outbox.send(bot.channel, PROMPT, wait=True, embed=embed)
+        bot.state.add_prompt(message.id, server_name)
+        await bot.outbox.react(message, '⚠️' if current_players > max_players else '✅')
+        await bot.outbox.react(message, '❌')
+
+        # Wait for reaction (15 minutes timeout)
+        def check(reaction, user):
+            return (user != bot.user and
+                   reaction.message.id == message.id and
+                   str(reaction.emoji) in ['✅', '⚠️', '❌'])
+
         try:
-            # Get server record
-            server = session_db.query(bot.db['Servers']).filter_by(name=server_name).first()
-            if not server:
-                server = bot.db['Servers'](name=server_name, plugins='{}')
-                session_db.add(server)
-                session_db.commit()
-            
-            # Get server jar record
-            jar_type = server_config['jar']['type']
-            jar_version = server_config['jar']['version']
-            sjar = session_db.query(bot.db['ServerJars']).filter_by(
-                type=jar_type,
-                version=jar_version
-            ).first()
-            
-            # Check which plugins need updating
-            plugins_to_update = []
-            server_plugins = server_config.get('plugins', [])
-            current_plugins = json.loads(server.plugins or '{}')
-            
-            for plugin_name in server_plugins:
-                plugin = session_db.query(bot.db['Plugins']).filter_by(name=plugin_name).first()
-                if plugin and plugin.downloaded and current_plugins.get(plugin_name) != plugin.downloaded:
-                    plugins_to_update.append(plugin_name)
-            
-            # Check if server jar needs updating
-            jar_needs_updating = sjar and sjar.downloaded and server.current != sjar.downloaded
-            
-            if not plugins_to_update and not jar_needs_updating:
-                bot.log.info(f'{server_name} has no updates pending')
-                continue
-            
-            if not pinged:
-                await bot.channel.send('@here')
-                pinged = True
-            
-            # Check player count
-            max_players = server_config.get('max_players', 0)
-            current_players = await get_player_count(bot, server_name)
-            
-            # Create approval message
-            embed = create_server_update_embed(
-                server_name=server_name,
-                current_players=current_players,
-                max_players=max_players,
-                plugins_to_update=plugins_to_update,
-                jar_update=jar_needs_updating
-            )
-            
-            message = await bot.channel.send(embed=embed)
-            await message.add_reaction('⚠️' if current_players > max_players else '✅')
-            await message.add_reaction('❌')
-            
-            # Wait for reaction (15 minutes timeout)
-            def check(reaction, user):
-                return (user != bot.user and 
-                       reaction.message.id == message.id and
-                       str(reaction.emoji) in ['✅', '⚠️', '❌'])
-            
-            try:
-                reaction, user = await bot.wait_for('reaction_add', timeout=900, check=check)
-                
-                if str(reaction.emoji) == '❌':
-                    bot.log.info(f'{user.name} blocked {server_name} from updating')
-                    await message.edit(embed=create_approval_embed(
-                        title=f'{server_name} update dismissed',
-                        description='Update has been cancelled.',
-                        approved_by=user.mention,
-                        color=0x808080,  # Gray
-                        success=False
-                    ))
-                    await message.clear_reactions()
-                    continue
-                
-                # Approved - perform update
-                bot.log.info(f'{user.name} authorized {server_name} to update')
-                
-                # Stop server
-                await panel.stop(pterodactyl_id)
-                
-                # Upload server jar if needed
-                if jar_needs_updating:
-                    bot.log.info(f'Uploading server jar for {server_name}')
-                    jar_path = path(f'data/servers/{sjar.id}/server.jar')
-                    await panel.upload(pterodactyl_id, '/', [jar_path])
-                    server.current = sjar.downloaded
-                
-                # Upload plugins if needed
-                if plugins_to_update:
-                    bot.log.info(f'Uploading {len(plugins_to_update)} plugins for {server_name}')
-                    jar_paths = []
-                    for plugin_name in plugins_to_update:
-                        plugin_config = bot.config['plugins'].get(plugin_name)
-                        if plugin_config:
-                            jar_paths.append(path(f"data/plugins/{plugin_config['jar']}"))
-                        plugin = session_db.query(bot.db['Plugins']).filter_by(name=plugin_name).first()
-                        if plugin:
-                            current_plugins[plugin_name] = plugin.downloaded
-                    
-                    if jar_paths:
-                        await panel.upload(pterodactyl_id, '/plugins/', jar_paths)
-                    
-                    server.plugins = json.dumps(current_plugins)
-                
-                session_db.commit()
-                
-                # Restart server
-                await wait(5000)
-                power_state = await panel.get_power_state(pterodactyl_id)
-                if power_state != 'offline':
-                    await panel.kill(pterodactyl_id)
-                await panel.start(pterodactyl_id)
-                
-                # Update message
-                await message.edit(embed=create_approval_embed(
-                    title=f'{server_name} has been updated successfully',
-                    description='Server has been restarted with the latest updates.',
+            reaction, user = await bot.wait_for('reaction_add', timeout=900, check=check)
+
+            if str(reaction.emoji) == '❌':
+                bot.log.info(f'{user.name} blocked {server_name} from updating')
+                await bot.outbox.edit(message, embed=create_approval_embed(
+                    title=f'{server_name} update dismissed',
+                    description='Update has been cancelled.',
                     approved_by=user.mention,
-                    color=0x00FF00,
-                    success=True
-                ))
-                await message.clear_reactions()
-                
-            except asyncio.TimeoutError:
-                bot.log.warning(f'Update approval timed out for {server_name}')
-                await message.edit(embed=create_approval_embed(
-                    title=f'{server_name} update timed out',
-                    description='No response received within 15 minutes.',
                     color=0x808080,  # Gray
                     success=False
                 ))
-                await message.clear_reactions()
-            except Exception as e:
-                bot.log.error(f'Error updating {server_name}: {e}')
-                await message.edit(embed=create_approval_embed(
-                    title=f'{server_name} update failed',
-                    description=f'Error: {str(e)}',
-                    color=0xFF0000,
-                    success=False
-                ))
-                await message.clear_reactions()
-        
-        finally:
-            session_db.close()
+                await bot.outbox.clear_reactions(message)
+                return 'dismissed'
+
+            # Approved - perform update
+            bot.log.info(f'{user.name} authorized {server_name} to update')
+
+            async with slot or nullcontext():
+                await deploy(bot, panel, session_db, server_name, pending, console)
+
+            # Update message
+            await bot.outbox.edit(message, embed=create_approval_embed(
+                title=f'{server_name} has been updated successfully',
+                description='Server has been restarted with the latest updates.',
+                approved_by=user.mention,
+                color=0x00FF00,
+                success=True
+            ), view=create_rollback_view(pending['deployment_id']))
+            await bot.outbox.clear_reactions(message)
+            return 'deployed'
+
+        except asyncio.TimeoutError:
+            bot.log.warning(f'Update approval timed out for {server_name}')
+            await bot.outbox.edit(message, embed=create_approval_embed(
+                title=f'{server_name} update timed out',
+                description='No response received within 15 minutes.',
+                color=0x808080,  # Gray
+                success=False
+            ))
+            await bot.outbox.clear_reactions(message)
+            return 'timeout'
+        except Exception as e:
+            bot.log.error(f'Error updating {server_name}: {e}')
+            await bot.outbox.edit(message, embed=create_approval_embed(
+                title=f'{server_name} update failed',
+                description=f'Error: {str(e)}',
+                color=0xFF0000,
+                success=False
+            ), view=create_rollback_view(pending.get('deployment_id')))
+            await bot.outbox.clear_reactions(message)
+            return 'failed'
+
+    finally:
+        if message:
+            bot.state.remove_prompt(message.id)
+        bot.updater.deploying.discard(server_name)
+        session_db.close()
+
+def rollout_servers(bot) -> List[str]:
+    """Get the servers the upload task rolls updates out to"""
+    # Servers with an update window are handled by the maintenance task
+    return [
+        name for name, cfg in bot.config['servers'].items()
+        if cfg.get('pterodactyl_id') and not bot.updater.maintenance.window(name)
+        and name not in bot.updater.deploying
+    ]
+
+async def upload_files(bot):
+    """Upload approved updates to servers, wave by wave"""
+    panel = get_panel(bot)
+    if not panel:
+        return
+
+    # Poll every server at once, the rollout reads from the snapshot
+    await bot.status.poll([name for name, cfg in bot.config['servers'].items() if cfg.get('pterodactyl_id')])
+
+    await bot.updater.rollout.run(panel, rollout_servers(bot))
@@ -0,0 +1,113 @@
+"""
+Streaming, selective extraction of plugin archives
+"""
+import hashlib
+import os
+import re
+import zipfile
+from pathlib import Path
+from typing import Dict
+
+# Limits that protect against zip bombs
+MAX_MEMBER_SIZE = 256 * 1024 * 1024
+MAX_TOTAL_SIZE = 512 * 1024 * 1024
+MAX_RATIO = 200
+# How many levels of archives inside archives to search
+MAX_DEPTH = 2
+
+CHUNK_SIZE = 1024 * 1024
+
+class ArchiveError(Exception):
+    """Raised when an archive is invalid, exceeds a limit, or is missing a target"""
+
+def _matches(pattern: re.Pattern, name: str) -> bool:
+    """Match a member by its full path or its file name"""
+    return bool(pattern.fullmatch(name) or pattern.fullmatch(name.rsplit('/', 1)[-1]))
+
+def _check_limits(info: zipfile.ZipInfo):
+    if info.file_size > MAX_MEMBER_SIZE:
+        raise ArchiveError(f'{info.filename} is larger than {MAX_MEMBER_SIZE} bytes')
+    if info.compress_size and info.file_size / info.compress_size > MAX_RATIO:
+        raise ArchiveError(f'{info.filename} has a suspicious compression ratio')
+
+def _stream(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, dest: Path, budget: list) -> str:
+    """Stream a member into `dest`, returning its SHA-256"""
+    part = dest.with_name(dest.name + '.part')
+    sha256 = hashlib.sha256()
+    written = 0
+
+    try:
+        with zip_ref.open(info) as src, open(part, 'wb') as f:
+            while chunk := src.read(CHUNK_SIZE):
+                written += len(chunk)
+                budget[0] -= len(chunk)
+                # Don't trust the sizes in the headers
+                if written > MAX_MEMBER_SIZE or budget[0] < 0:
+                    raise ArchiveError(f'{info.filename} exceeds the extraction size limit')
+                sha256.update(chunk)
+                f.write(chunk)
+        os.replace(part, dest)
+    finally:
+        if part.exists():
+            part.unlink()
+
+    return sha256.hexdigest()
+
+def _search(zip_ref: zipfile.ZipFile, targets: Dict[Path, re.Pattern], found: Dict[Path, str],
+            budget: list, depth: int):
+    nested = []
+
+    for info in zip_ref.infolist():
+        if info.is_dir():
+            continue
+
+        for dest, pattern in targets.items():
+            if dest not in found and _matches(pattern, info.filename):
+                _check_limits(info)
+                found[dest] = _stream(zip_ref, info, dest, budget)
+
+        if info.filename.lower().endswith('.zip'):
+            nested.append(info)
+
+    if len(found) == len(targets) or depth >= MAX_DEPTH:
+        return
+
+    # Look inside nested archives for anything still missing
+    for info in nested:
+        _check_limits(info)
+        with zip_ref.open(info) as src, zipfile.ZipFile(src) as inner:
+            _search(inner, targets, found, budget, depth + 1)
+        if len(found) == len(targets):
+            return
+
+def extract(archive: Path, targets: Dict[Path, re.Pattern]) -> Dict[Path, str]:
+    """
+    Extract the members matching each pattern straight to their destinations
+
+    Blocking, so call it with `asyncio.to_thread`. Each destination is written
+    to a `.part` file and renamed into place once complete.
+
+    Args:
+        archive: Path to the zip archive
+        targets: Destination path -> pattern of the member to extract there
+
+    Returns:
+        Destination path -> SHA-256 of the extracted file
+
+    Raises:
+        ArchiveError: If the archive is invalid, exceeds a size limit, or a target is not found
+    """
+    found = {}
+    budget = [MAX_TOTAL_SIZE]
+
+    try:
+        with zipfile.ZipFile(archive) as zip_ref:
+            _search(zip_ref, targets, found, budget, 0)
+    except zipfile.BadZipFile as e:
+        raise ArchiveError(f'{archive.name} is not a valid zip file: {e}')
+
+    missing = [dest.name for dest in targets if dest not in found]
+    if missing:
+        raise ArchiveError(f'No member of {archive.name} matched {", ".join(missing)}')
+
+    return found
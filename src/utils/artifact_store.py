@@ -0,0 +1,232 @@
+"""
+Local store of downloaded artifacts
+
+Every downloaded jar is kept under `data/artifacts/<item>/<version>/`, hard
+linked to the live copy in `data/plugins` or `data/servers` where possible, so
+a version that is already local can be put in place without downloading it.
+"""
+import os
+import re
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from utils.fs import path
+
+STORE_DIR = 'data/artifacts'
+
+def plugin_item(plugin_name: str) -> str:
+    return f'plugin:{plugin_name}'
+
+def jar_item(jar_type: str, version: str) -> str:
+    return f'server_jar:{jar_type.lower()}:{version}'
+
+def _safe(name: str) -> str:
+    return re.sub(r'[^\w.\-]+', '_', str(name))
+
+def link(src: Path, dest: Path):
+    """Atomically put `src` at `dest`, as a hard link if the filesystem allows it"""
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    temp = dest.with_name(dest.name + '.link')
+    if temp.exists():
+        temp.unlink()
+    try:
+        os.link(src, temp)
+    except OSError:
+        shutil.copy2(src, temp)
+    os.replace(temp, dest)
+
+class ArtifactStore:
+    """Keep downloaded artifacts by item and version"""
+
+    def __init__(self, db, data: Path = None):
+        self.db = db
+        # Directory artifact paths are stored relative to, data/ unless given
+        self.data = Path(data or path('data'))
+        self.root = self.data / Path(STORE_DIR).relative_to('data')
+
+    def location(self, item: str, version: str, filename: str) -> Path:
+        """Where an artifact is kept"""
+        return self.root / _safe(item) / _safe(version) / filename
+
+    def find(self, item: str, version: str) -> Optional[Path]:
+        """Get the stored file for an item version, if it is still on disk"""
+        session_db = self.db['Session']()
+        try:
+            artifact = session_db.query(self.db['Artifacts']).filter_by(item=item, version=str(version)).first()
+            if not artifact:
+                return None
+            file = self.data / artifact.path
+            return file if file.exists() else None
+        finally:
+            session_db.close()
+
+    def add(self, item: str, version: str, file: Path, state: str, source: str = None,
+            sha256: str = None) -> Path:
+        """
+        Keep a downloaded file
+
+        Args:
+            item: Item key from `plugin_item` or `jar_item`
+            version: Version or build
+            file: Downloaded file, linked into the store if it isn't there already
+            state: `prefetched`, `approved`, `deployed` or `superseded`
+            source: Provider source key
+            sha256: Checksum of the file
+
+        Returns:
+            The stored file
+        """
+        file = Path(file)
+        stored = self.location(item, version, file.name)
+        if file != stored:
+            link(file, stored)
+
+        session_db = self.db['Session']()
+        try:
+            model = self.db['Artifacts']
+            artifact = session_db.query(model).filter_by(item=item, version=str(version)).first()
+            if not artifact:
+                artifact = model(item=item, version=str(version))
+                session_db.add(artifact)
+            artifact.source = source
+            artifact.path = stored.relative_to(self.data).as_posix()
+            artifact.size = stored.stat().st_size
+            artifact.sha256 = sha256
+            artifact.state = state
+            artifact.last_used = datetime.utcnow()
+            session_db.commit()
+        finally:
+            session_db.close()
+
+        return stored
+
+    def mark(self, item: str, version: str, state: str):
+        """Change the state of an artifact and count it as used"""
+        session_db = self.db['Session']()
+        try:
+            artifact = session_db.query(self.db['Artifacts']).filter_by(item=item, version=str(version)).first()
+            if artifact:
+                artifact.state = state
+                artifact.last_used = datetime.utcnow()
+                session_db.commit()
+        finally:
+            session_db.close()
+
+    def promote(self, item: str, version: str, dest: Path) -> bool:
+        """
+        Put a stored artifact in place of a live file
+
+        Returns:
+            Whether the artifact was in the store
+        """
+        file = self.find(item, version)
+        if not file:
+            return False
+        link(file, dest)
+        self.mark(item, version, 'approved')
+        return True
+
+    def remove(self, artifact):
+        """Delete an artifact's file and its empty directories"""
+        file = self.data / artifact.path
+        if file.exists():
+            file.unlink()
+        for directory in (file.parent, file.parent.parent):
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+
+    def evict(self, state: str, quota: int) -> int:
+        """
+        Delete the least recently used artifacts in a state until they fit in `quota` bytes
+
+        Returns:
+            The number of artifacts deleted
+        """
+        session_db = self.db['Session']()
+        try:
+            model = self.db['Artifacts']
+            artifacts = session_db.query(model).filter_by(state=state).order_by(model.last_used).all()
+            total = sum(a.size or 0 for a in artifacts)
+            evicted = 0
+            for artifact in artifacts:
+                if total <= quota:
+                    break
+                self.remove(artifact)
+                total -= artifact.size or 0
+                session_db.delete(artifact)
+                evicted += 1
+            session_db.commit()
+            return evicted
+        finally:
+            session_db.close()
+
+    def retain(self, protected: Set[Tuple[str, str]], keep: int, quota: int) -> int:
+        """
+        Garbage collect the store
+
+        Artifacts in `protected` (`(item, version)` pairs that are deployed or
+        approved) are never deleted. Other artifacts are marked as superseded,
+        unless they were prefetched, and deleted when they are older than the
+        `keep` newest versions of their item. After that the least recently
+        used ones are deleted until the store fits in `quota` bytes.
+
+        Returns:
+            The number of artifacts deleted
+        """
+        session_db = self.db['Session']()
+        try:
+            model = self.db['Artifacts']
+            artifacts = session_db.query(model).order_by(model.created_at.desc(), model.id.desc()).all()
+
+            kept = []
+            evicted = 0
+            # item -> versions seen so far, newest first
+            seen = {}
+            for artifact in artifacts:
+                # Files deleted by hand are forgotten
+                if not (self.data / artifact.path).exists():
+                    session_db.delete(artifact)
+                    continue
+
+                seen[artifact.item] = seen.get(artifact.item, 0) + 1
+                if (artifact.item, artifact.version) not in protected:
+                    if artifact.state in ('approved', 'deployed'):
+                        artifact.state = 'superseded'
+                    if seen[artifact.item] > keep:
+                        self.remove(artifact)
+                        session_db.delete(artifact)
+                        evicted += 1
+                        continue
+                kept.append(artifact)
+
+            total = sum(a.size or 0 for a in kept)
+            unprotected = [a for a in kept if (a.item, a.version) not in protected]
+            for artifact in sorted(unprotected, key=lambda a: a.last_used or a.created_at):
+                if total <= quota:
+                    break
+                self.remove(artifact)
+                session_db.delete(artifact)
+                total -= artifact.size or 0
+                evicted += 1
+
+            session_db.commit()
+            return evicted
+        finally:
+            session_db.close()
+
+    def usage(self) -> Dict[str, int]:
+        """Get the bytes used by the store for each source"""
+        session_db = self.db['Session']()
+        try:
+            usage = {}
+            for artifact in session_db.query(self.db['Artifacts']):
+                source = artifact.source or 'unknown'
+                usage[source] = usage.get(source, 0) + (artifact.size or 0)
+            return usage
+        finally:
+            session_db.close()
@@ -0,0 +1,87 @@
+"""
+Embedded HTTP server that lets Wings nodes pull artifacts directly
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from pathlib import Path
+from urllib.parse import quote, urlencode
+
+from aiohttp import web
+
+from utils.fs import path
+
+# Directories below data/ that may be served, the live ones for files that aren't stored
+SERVED_DIRS = ('artifacts', 'servers', 'plugins')
+
+class ArtifactServer:
+    """
+    Serve downloaded jars over signed, expiring URLs
+
+    Configured with the `artifact_server` option. URLs are signed with
+    `ARTIFACT_SECRET` from the environment, or a random secret for this process.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.root = Path(path('data')).resolve()
+        self.secret = (os.getenv('ARTIFACT_SECRET') or secrets.token_hex(32)).encode()
+        self.runner = None
+
+    @property
+    def options(self) -> dict:
+        return self.bot.config.get('artifact_server') or {}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the server is running and artifacts should be pulled from it"""
+        return self.runner is not None and bool(self.options.get('url'))
+
+    async def start(self):
+        if not self.options.get('url'):
+            return
+
+        app = web.Application()
+        app.router.add_get('/artifacts/{path:.+}', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+
+        host = self.options.get('host', '0.0.0.0')
+        port = self.options.get('port', 8765)
+        await web.TCPSite(self.runner, host, port).start()
+        self.bot.log.success(f'Artifact server listening on {host}:{port}')
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def sign(self, relative: str, expires: int) -> str:
+        return hmac.new(self.secret, f'{relative}\n{expires}'.encode(), hashlib.sha256).hexdigest()
+
+    def url(self, local_path: str) -> str:
+        """Get a signed URL for a file in the artifact store"""
+        relative = Path(local_path).resolve().relative_to(self.root).as_posix()
+        expires = int(time.time() + self.options.get('expires', 900000) / 1000)
+        query = urlencode({'expires': expires, 'signature': self.sign(relative, expires)})
+        return f"{self.options['url'].rstrip('/')}/artifacts/{quote(relative)}?{query}"
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        relative = request.match_info['path']
+        try:
+            expires = int(request.query.get('expires', ''))
+        except ValueError:
+            raise web.HTTPForbidden()
+
+        signature = request.query.get('signature', '')
+        if expires < time.time() or not hmac.compare_digest(signature, self.sign(relative, expires)):
+            raise web.HTTPForbidden()
+
+        file = (self.root / relative).resolve()
+        if not file.is_relative_to(self.root) or not file.is_file() or \
+                file.relative_to(self.root).parts[0] not in SERVED_DIRS:
+            raise web.HTTPNotFound()
+
+        return web.FileResponse(file)
@@ -0,0 +1,213 @@
+"""
+Hot-reloadable configuration with precomputed indexes
+"""
+import re
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from utils.config_loader import ConfigLoader
+
+CONFIG_FILES = ('config', 'servers', 'plugins')
+
+class ConfigError(ValueError):
+    """Raised when a configuration fails validation"""
+
+def compile_pattern(value: str) -> re.Pattern:
+    """
+    Compile a `zip_path`/`asset` value
+
+    Values are matched in full, so an exact name like `'Plugin.jar'` and a
+    regex like `'Plugin-\\S*\\.jar'` both work. Invalid regexes fall back to an
+    exact match.
+    """
+    try:
+        return re.compile(value)
+    except re.error:
+        return re.compile(re.escape(value))
+
+class ConfigIndexes:
+    """Lookup tables derived from a loaded config"""
+
+    def __init__(self, config: Dict[str, Any]):
+        # source -> plugin names
+        self.source_plugins = {}
+        # plugin name -> server names
+        self.plugin_servers = {}
+        # spigot resource ID -> plugin names
+        self.resource_plugins = {}
+        # (jar type, jar version) -> server names
+        self.jar_servers = {}
+        # plugin name -> compiled zip_path regex
+        self.zip_paths = {}
+        # plugin name -> compiled asset regex (or the raw template if it has placeholders)
+        self.assets = {}
+
+        for plugin_name, plugin_config in config['plugins'].items():
+            source = str(plugin_config.get('source', '')).lower()
+            self.source_plugins.setdefault(source, []).append(plugin_name)
+            self.plugin_servers[plugin_name] = []
+
+            if plugin_config.get('resource') is not None:
+                self.resource_plugins.setdefault(str(plugin_config['resource']), []).append(plugin_name)
+
+            if plugin_config.get('zip_path'):
+                self.zip_paths[plugin_name] = compile_pattern(str(plugin_config['zip_path']))
+
+            asset = plugin_config.get('asset')
+            if asset:
+                asset = str(asset)
+                self.assets[plugin_name] = asset if '{{' in asset else compile_pattern(asset)
+
+        for server_name, server_config in config['servers'].items():
+            jar = server_config['jar']
+            key = (str(jar['type']).lower(), str(jar['version']))
+            self.jar_servers.setdefault(key, []).append(server_name)
+
+            for plugin_name in server_config.get('plugins') or []:
+                self.plugin_servers.setdefault(plugin_name, []).append(server_name)
+
+    def asset_pattern(self, plugin_name: str, **placeholders) -> Optional[re.Pattern]:
+        """Get the asset regex for a plugin, filling in `{{tag}}`-style placeholders"""
+        asset = self.assets.get(plugin_name)
+        if isinstance(asset, str):
+            for key, value in placeholders.items():
+                asset = asset.replace(f'{{{{{key}}}}}', re.escape(str(value)))
+            return compile_pattern(asset)
+        return asset
+
+    def servers_for_jar(self, jar_type: str) -> Dict[str, list]:
+        """Get servers using a jar type, grouped by version"""
+        jar_type = jar_type.lower()
+        return {version: servers for (t, version), servers in self.jar_servers.items() if t == jar_type}
+
+    def affected(self, plugin_name: str) -> str:
+        """Format the servers using a plugin for an embed field"""
+        return ', '.join([f'`{s}`' for s in self.plugin_servers.get(plugin_name, [])])
+
+class ConfigSnapshot:
+    """An immutable, validated config and its indexes"""
+
+    def __init__(self, config: Dict[str, Any], mtimes: tuple):
+        self.config = config
+        self.indexes = ConfigIndexes(config)
+        self.mtimes = mtimes
+
+# `'HH-HH'` hour ranges of update windows and prefetching
+HOURS = re.compile(r'(\d{1,2})-(\d{1,2})')
+
+def valid_hours(hours) -> bool:
+    """Check an `'HH-HH'` range, a missing one means any time"""
+    if not hours:
+        return True
+    match = HOURS.fullmatch(str(hours))
+    return bool(match) and all(int(h) <= 24 for h in match.groups())
+
+def validate(config: Dict[str, Any]) -> List[str]:
+    """
+    Validate a loaded config
+
+    Plugins a server lists that aren't in plugins.yaml are dropped from the
+    server, so they are skipped as before.
+
+    Returns:
+        Warnings about the dropped plugins
+
+    Raises:
+        ConfigError: If a server or plugin is missing required properties
+    """
+    if not isinstance(config.get('servers'), dict):
+        raise ConfigError('servers.yaml must contain a mapping of servers')
+    if not isinstance(config.get('plugins'), dict):
+        raise ConfigError('plugins.yaml must contain a mapping of plugins')
+
+    warnings = []
+    for server_name, server_config in config['servers'].items():
+        jar = (server_config or {}).get('jar')
+        if not isinstance(jar, dict) or not jar.get('type') or not jar.get('version'):
+            raise ConfigError(f'Server {server_name} must set jar.type and jar.version')
+        unknown = [p for p in server_config.get('plugins') or [] if p not in config['plugins']]
+        if unknown:
+            warnings.append(f"Server {server_name} uses unknown plugins {', '.join(unknown)}, skipping them")
+            server_config['plugins'] = [p for p in server_config['plugins'] if p not in unknown]
+        rollout = server_config.get('rollout')
+        if rollout is not None and rollout != 'canary' and \
+                not (isinstance(rollout, int) and not isinstance(rollout, bool)) and \
+                not (isinstance(rollout, str) and rollout.isdigit()):
+            raise ConfigError(f'Server {server_name} must set rollout to canary or a wave number, not {rollout!r}')
+        if not valid_hours((server_config.get('update_window') or {}).get('hours')):
+            raise ConfigError(f"Server {server_name} must set update_window.hours as 'HH-HH'")
+
+    for key in ('update_window', 'prefetch'):
+        if not valid_hours((config.get(key) or {}).get('hours')):
+            raise ConfigError(f"{key}.hours must be set as 'HH-HH'")
+
+    for plugin_name, plugin_config in config['plugins'].items():
+        if not (plugin_config or {}).get('source') or not plugin_config.get('jar'):
+            raise ConfigError(f'Plugin {plugin_name} must set source and jar')
+        for key in ('zip_path', 'asset'):
+            if plugin_config.get(key) and '{{' not in str(plugin_config[key]):
+                try:
+                    re.compile(str(plugin_config[key]))
+                except re.error as e:
+                    raise ConfigError(f'Plugin {plugin_name} has an invalid {key}: {e}')
+
+    return warnings
+
+class ConfigService:
+    """Load the config and swap in a new snapshot whenever the files change"""
+
+    def __init__(self, log, config_dir: Path = None):
+        self.log = log
+        self.loader = ConfigLoader(config_dir)
+        self.snapshot = None
+        self.rejected = None
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.snapshot.config
+
+    @property
+    def indexes(self) -> ConfigIndexes:
+        return self.snapshot.indexes
+
+    def mtimes(self) -> tuple:
+        """Get the modification times of the config files"""
+        mtimes = []
+        for name in CONFIG_FILES:
+            for ext in ('yaml', 'yml', 'py'):
+                file = self.loader.config_dir / f'{name}.{ext}'
+                if file.exists():
+                    mtimes.append((file.name, file.stat().st_mtime_ns))
+        return tuple(mtimes)
+
+    def load(self) -> ConfigSnapshot:
+        """
+        Load, validate and index the config
+
+        Raises:
+            FileNotFoundError: If a config file is missing
+            ConfigError: If the config is invalid
+        """
+        mtimes = self.mtimes()
+        config = self.loader.load_all()
+        for warning in validate(config):
+            self.log.warning(warning)
+        self.snapshot = ConfigSnapshot(config, mtimes)
+        return self.snapshot
+
+    def reload_if_changed(self) -> bool:
+        """Reload the config if any file changed, keeping the old one if the new one is invalid"""
+        mtimes = self.mtimes()
+        if self.snapshot and mtimes in (self.snapshot.mtimes, self.rejected):
+            return False
+
+        try:
+            self.load()
+        except Exception as e:
+            # Don't retry until the files change again
+            self.rejected = mtimes
+            self.log.error(f'Failed to reload config, keeping the previous one: {e}')
+            return False
+
+        self.log.info('Reloaded config')
+        return True
@@ -0,0 +1,323 @@
+"""
+Digest notifications
+
+Updates found during a check run are collected and posted as one paginated
+message. Each page has a select menu to approve individual updates, and the
+announcements are stored so the menus keep working after a restart.
+"""
+import json
+from typing import List, Optional
+
+import discord
+
+from utils.discord_utils import create_embed, capitalise, ICONS
+from utils.outbox import ANNOUNCE
+
+# Updates shown per page, small enough to keep the embed under Discord's limits
+PAGE_SIZE = 15
+
+def describe(data: dict) -> tuple:
+    """Get the `(item, version, title)` an announcement is about"""
+    if 'server_jar' in data:
+        jar = data['server_jar']
+        return f"server_jar:{jar['type']}:{jar['version']}", jar['build'], f"{capitalise(jar['type'])} {jar['version']}"
+    plugin = data['plugin']
+    return f"plugin:{plugin['name']}", plugin['version'], plugin['name']
+
+def summarise(embed: discord.Embed) -> str:
+    """Condense the fields of an update embed into one line"""
+    parts = []
+    for field in embed.fields:
+        if 'Affected' in field.name:
+            parts.append(f'servers: {field.value}')
+        else:
+            parts.append(field.value)
+    summary = ' · '.join(parts)
+    return summary if len(summary) <= 200 else summary[:197] + '...'
+
+def apply_approval(bot, session_db, data: dict) -> str:
+    """
+    Mark the update an announcement is about as approved
+
+    Returns:
+        The name of the approved item
+    """
+    if 'server_jar' in data:
+        jar_data = data['server_jar']
+        jar = session_db.query(bot.db['ServerJars']).filter_by(
+            type=jar_data['type'],
+            version=jar_data['version']
+        ).first()
+        if jar:
+            jar.approved_version = jar_data['actual_version']
+            jar.approved_build = jar_data['build']
+            jar.approved_file = jar_data['file']
+            jar.approved_checksum = jar_data['checksum']
+        return f"{capitalise(jar_data['type'])} {jar_data['version']}"
+
+    plugin_data = data['plugin']
+    plugin = session_db.query(bot.db['Plugins']).filter_by(name=plugin_data['name']).first()
+    if plugin:
+        plugin.approved = plugin_data['version']
+    return plugin_data['name']
+
+def approve_announcements(bot, session_db, announcements: list, user) -> List[str]:
+    """
+    Approve pending announcements in one transaction
+
+    Returns:
+        The names of the approved items
+    """
+    names = []
+    for announcement in announcements:
+        names.append(apply_approval(bot, session_db, json.loads(announcement.data)))
+        announcement.status = 'approved'
+        announcement.approved_by = user.mention
+    session_db.commit()
+
+    if names:
+        bot.log.info(f"{user.name} approved updates for {', '.join(names)}")
+    return names
+
+def matches(bot, data: dict, source: Optional[str] = None, server: Optional[str] = None) -> bool:
+    """Whether an announcement is from `source` and affects `server`"""
+    if 'server_jar' in data:
+        jar = data['server_jar']
+        if source and source.lower() != bot.config.get('server_jars_api', 'papermc').lower():
+            return False
+        return not server or server in bot.indexes.jar_servers.get((jar['type'].lower(), str(jar['version'])), [])
+
+    plugin_name = data['plugin']['name']
+    plugin_config = bot.config['plugins'].get(plugin_name) or {}
+    if source and source.lower() != str(plugin_config.get('source', '')).lower():
+        return False
+    return not server or plugin_name in (bot.config['servers'].get(server, {}).get('plugins') or [])
+
+class DigestView(discord.ui.View):
+    """Page through a digest and approve the updates in it"""
+
+    def __init__(self, bot, message_id: Optional[int] = None, ids: Optional[List[int]] = None):
+        super().__init__(timeout=None)
+        self.bot = bot
+        # Announcements are found by message, or by ID before the message is sent
+        self.message_id = message_id
+        self.ids = ids
+        self.page = 0
+
+    def announcements(self, session_db) -> list:
+        model = self.bot.db['Announcements']
+        query = session_db.query(model)
+        if self.message_id is None:
+            query = query.filter(model.id.in_(self.ids or []))
+        else:
+            query = query.filter_by(message_id=self.message_id)
+        return query.order_by(model.id).all()
+
+    def render(self, session_db) -> discord.Embed:
+        """Build the embed for the current page and update the components to match"""
+        announcements = self.announcements(session_db)
+        pages = max(1, -(-len(announcements) // PAGE_SIZE))
+        self.page = min(self.page, pages - 1)
+        shown = announcements[self.page * PAGE_SIZE:(self.page + 1) * PAGE_SIZE]
+
+        lines = []
+        for announcement in shown:
+            if announcement.status == 'approved':
+                lines.append(f'✅ ~~{announcement.title}~~ · approved by {announcement.approved_by}')
+            elif announcement.status == 'superseded':
+                lines.append(f'~~{announcement.title}~~ `{announcement.version}` · superseded by a newer version')
+            else:
+                lines.append(f'**{announcement.title}** · {announcement.summary}')
+
+        pending = [a for a in announcements if a.status == 'pending']
+        embed = create_embed(
+            title=f'{ICONS["update"]} {len(announcements)} updates available',
+            description='\n'.join(lines),
+            color=0xFFA500 if pending else 0x00FF00,
+            footer_text=f'Spigot Updater Bot • Page {self.page + 1}/{pages} • Select updates to approve'
+        )
+
+        self.clear_items()
+        options = [
+            discord.SelectOption(label=a.title[:100], description=str(a.version)[:100], value=str(a.id))
+            for a in shown if a.status == 'pending'
+        ]
+        if options:
+            select = discord.ui.Select(
+                custom_id='digest:select',
+                placeholder='Approve updates',
+                min_values=1,
+                max_values=len(options),
+                options=options
+            )
+            select.callback = self.on_select
+            self.add_item(select)
+
+        for custom_id, label, disabled, callback in (
+            ('digest:previous', '◀', self.page == 0, self.on_previous),
+            ('digest:next', '▶', self.page >= pages - 1, self.on_next),
+            ('digest:all', 'Approve all', not pending, self.on_all)
+        ):
+            button = discord.ui.Button(
+                custom_id=custom_id,
+                label=label,
+                disabled=disabled,
+                style=discord.ButtonStyle.success if custom_id == 'digest:all' else discord.ButtonStyle.secondary
+            )
+            button.callback = callback
+            self.add_item(button)
+
+        return embed
+
+    async def refresh(self, interaction: discord.Interaction, session_db):
+        await interaction.response.edit_message(embed=self.render(session_db), view=self)
+
+    async def approve(self, interaction: discord.Interaction, ids: Optional[List[int]] = None):
+        """Approve some (or all) pending updates in this digest"""
+        session_db = self.bot.db['Session']()
+        try:
+            approving = [a for a in self.announcements(session_db)
+                         if a.status == 'pending' and (ids is None or a.id in ids)]
+            approve_announcements(self.bot, session_db, approving, interaction.user)
+            await self.refresh(interaction, session_db)
+        finally:
+            session_db.close()
+
+    async def on_select(self, interaction: discord.Interaction):
+        await self.approve(interaction, [int(value) for value in interaction.data.get('values', [])])
+
+    async def on_all(self, interaction: discord.Interaction):
+        await self.approve(interaction)
+
+    async def on_previous(self, interaction: discord.Interaction):
+        self.page -= 1
+        await self.show(interaction)
+
+    async def on_next(self, interaction: discord.Interaction):
+        self.page += 1
+        await self.show(interaction)
+
+    async def show(self, interaction: discord.Interaction):
+        session_db = self.bot.db['Session']()
+        try:
+            await self.refresh(interaction, session_db)
+        finally:
+            session_db.close()
+
+class Digest:
+    """Collect the updates found in a run and post them together"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.pending = []
+
+    def add(self, embed: discord.Embed, data: dict):
+        self.pending.append((embed, data))
+
+    async def flush(self):
+        """
+        Post the updates collected since the last flush
+
+        Announcements are kept in a ledger keyed by item and version. Updates
+        that were already announced are left alone, only being re-rendered if
+        their details changed, and a newer version supersedes the pending
+        announcement of an older one. Only new updates are posted, as one
+        digest message.
+        """
+        if not self.pending or not self.bot.channel:
+            return
+        collected, self.pending = self.pending, []
+
+        model = self.bot.db['Announcements']
+        session_db = self.bot.db['Session']()
+        try:
+            announcements = []
+            # Earlier digests that need re-rendering
+            changed = set()
+
+            for embed, data in collected:
+                item, version, title = describe(data)
+                version = str(version)
+                summary = summarise(embed)
+
+                current = session_db.query(model).filter(
+                    model.item == item,
+                    model.status.in_(('pending', 'approved'))
+                ).all()
+
+                existing = next((a for a in current if a.version == version), None)
+                if existing and existing.message_id is not None:
+                    if existing.status == 'pending' and existing.summary != summary:
+                        existing.summary = summary
+                        existing.data = json.dumps(data)
+                        changed.add(existing.message_id)
+                    continue
+
+                for announcement in current:
+                    if announcement.status == 'pending' and announcement is not existing:
+                        announcement.status = 'superseded'
+                        changed.add(announcement.message_id)
+
+                # Announcements whose digest failed to send are posted again
+                if not existing:
+                    existing = model(item=item, version=version, title=title)
+                    session_db.add(existing)
+                existing.summary = summary
+                existing.data = json.dumps(data)
+                announcements.append(existing)
+            session_db.commit()
+
+            if announcements:
+                view = DigestView(self.bot, ids=[a.id for a in announcements])
+                message = await self.bot.outbox.send(
+                    self.bot.channel, ANNOUNCE, wait=True, embed=view.render(session_db), view=view
+                )
+
+                view.message_id = message.id
+                for announcement in announcements:
+                    announcement.message_id = message.id
+                session_db.commit()
+
+            await self.rerender(session_db, changed)
+        finally:
+            session_db.close()
+
+    async def rerender(self, session_db, message_ids):
+        """Queue edits bringing earlier digests up to date"""
+        for message_id in set(message_ids) - {None}:
+            view = DigestView(self.bot, message_id)
+            message = self.bot.channel.get_partial_message(message_id)
+            await self.bot.outbox.edit(message, embed=view.render(session_db), view=view)
+
+    async def approve_matching(self, user, source: Optional[str] = None, server: Optional[str] = None) -> List[str]:
+        """
+        Approve every pending update from `source` and for `server`
+
+        Returns:
+            The names of the approved items
+        """
+        model = self.bot.db['Announcements']
+        session_db = self.bot.db['Session']()
+        try:
+            approving = [a for a in session_db.query(model).filter_by(status='pending').order_by(model.id)
+                         if matches(self.bot, json.loads(a.data), source, server)]
+            names = approve_announcements(self.bot, session_db, approving, user)
+            await self.rerender(session_db, [a.message_id for a in approving])
+            return names
+        finally:
+            session_db.close()
+
+    def restore(self):
+        """Reattach the menus of digests that still have updates waiting for approval"""
+        session_db = self.bot.db['Session']()
+        try:
+            rows = session_db.query(self.bot.db['Announcements'].message_id).filter(
+                self.bot.db['Announcements'].status == 'pending',
+                self.bot.db['Announcements'].message_id.isnot(None)
+            ).distinct().all()
+            for (message_id,) in rows:
+                view = DigestView(self.bot, message_id)
+                view.render(session_db)
+                self.bot.add_view(view, message_id=message_id)
+        finally:
+            session_db.close()
@@ -18,6 +18,9 @@ ICONS = {
     'server': '🖥️'
 }
 
+# Total characters Discord allows in the titles, descriptions, fields and footer of an embed
+EMBED_LIMIT = 6000
+
 def create_embed(
     title: Optional[str] = None,
     description: Optional[str] = None,
@@ -162,6 +165,52 @@ def create_approval_embed(
     
     return embed
 
+def create_rollback_button(deployment_id: int, label: str = 'Roll back') -> discord.ui.Button:
+    """Create the button that rolls back a deployment"""
+    return discord.ui.Button(
+        label=label[:80],
+        emoji='↩️',
+        style=discord.ButtonStyle.danger,
+        custom_id=f'rollback:{deployment_id}'
+    )
+
+def create_rollback_view(deployment_id: Optional[int]) -> Optional[discord.ui.View]:
+    """Create a view with the rollback button, or None without a deployment"""
+    if deployment_id is None:
+        return None
+    view = discord.ui.View(timeout=None)
+    view.add_item(create_rollback_button(deployment_id))
+    return view
+
+def create_plan_embed(plan) -> discord.Embed:
+    """Create an embed describing a rollout plan, one field per wave"""
+    embed = create_embed(
+        title=f'{ICONS["server"]} Rollout plan',
+        description=plan.describe()[0],
+        color=0x3498DB,
+        footer_text='Spigot Updater Bot • Dry run'
+    )
+
+    for index, wave in enumerate(plan.waves):
+        servers = []
+        for server in wave:
+            changes = ', '.join(f"{c['name']} `{c['old'] or 'none'}` → `{c['new']}`" for c in server.changes)
+            servers.append(f'**{server.server}** · {server.bytes / 1024 / 1024:.1f} MiB · '
+                           f'~{server.downtime:.0f}s down\n{changes}')
+        name = f'Wave {index + 1} · ~{plan.wave_duration(index):.0f}s'
+        value = '\n'.join(servers)
+        value = value if len(value) <= 1024 else value[:1021] + '...'
+
+        # Leave room for the field saying how many waves were left out
+        left = len(plan.waves) - index
+        if (index == 24 and left > 1) or len(embed) + len(name) + len(value) > EMBED_LIMIT - 100:
+            embed.add_field(name='More waves', value=f"…and {left} more wave{'s' if left > 1 else ''}",
+                            inline=False)
+            break
+        embed.add_field(name=name, value=value, inline=False)
+
+    return embed
+
 def create_server_update_embed(
     server_name: str,
     current_players: int,
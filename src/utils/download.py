@@ -0,0 +1,179 @@
+"""
+Resumable, atomic HTTP downloads
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import aiofiles
+import aiohttp
+
+CHUNK_SIZE = 256 * 1024
+
+class DownloadError(Exception):
+    """Raised when a download fails for good"""
+
+class DownloadResult:
+    """Statistics for a completed download"""
+
+    def __init__(self, url: str, path: Path, size: int, sha256: str, seconds: float,
+                 retries: int, resumed: int):
+        self.url = url
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.seconds = seconds
+        self.retries = retries
+        # Bytes reused from an earlier, interrupted attempt
+        self.resumed = resumed
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second transferred by this run"""
+        return (self.size - self.resumed) / self.seconds if self.seconds else 0.0
+
+def _hash(file: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(file, 'rb') as f:
+        while chunk := f.read(1024 * 1024):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def _load_meta(meta: Path, url: str) -> dict:
+    try:
+        data = json.loads(meta.read_text())
+    except (OSError, ValueError):
+        return {}
+    return data if data.get('url') == url else {}
+
+def _discard(*files: Path):
+    for file in files:
+        if file.exists():
+            file.unlink()
+
+async def _attempt(session: aiohttp.ClientSession, url: str, part: Path, meta: Path,
+                   headers: dict) -> int:
+    """Download or resume into `part`, returning the number of bytes reused"""
+    state = _load_meta(meta, url)
+    offset = part.stat().st_size if state and part.exists() else 0
+    if not offset:
+        _discard(part)
+
+    # Sizes and ranges refer to the raw bytes, so don't let aiohttp decompress
+    request_headers = {'Accept-Encoding': 'identity', **headers}
+    if offset:
+        request_headers['Range'] = f'bytes={offset}-'
+        if state.get('etag'):
+            request_headers['If-Range'] = state['etag']
+
+    async with session.get(url, headers=request_headers) as response:
+        if response.status == 416 and offset:
+            if offset == state.get('length'):
+                # Already complete
+                return offset
+            _discard(part, meta)
+            raise DownloadError('Server rejected the resume range')
+
+        if response.status == 206:
+            start = response.headers.get('Content-Range', '').split(' ')[-1].split('-')[0]
+            if start != str(offset):
+                raise DownloadError(f'Server resumed from {start} instead of {offset}')
+        elif response.status == 200:
+            # Range ignored or the file changed upstream, start again
+            offset = 0
+        else:
+            response.raise_for_status()
+            raise DownloadError(f'Unexpected HTTP {response.status}')
+
+        length = response.content_length
+        meta.write_text(json.dumps({
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'length': offset + length if length is not None else None
+        }))
+
+        async with aiofiles.open(part, 'ab' if offset else 'wb') as f:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                await f.write(chunk)
+
+    received = part.stat().st_size
+    if length is not None and received != offset + length:
+        raise aiohttp.ClientPayloadError(f'Received {received} of {offset + length} bytes')
+
+    return offset
+
+async def fetch(session: aiohttp.ClientSession, url: str, dest: Path, checksum: Optional[str] = None,
+                size: Optional[int] = None, retries: int = 3, headers: dict = None) -> DownloadResult:
+    """
+    Download `url` to `dest`, resuming interrupted downloads
+
+    Data is written to `dest.part` and only renamed to `dest` once the size and
+    SHA-256 checksum (if given) match. A `.part` left by an earlier run is
+    resumed with a `Range` request, guarded by the `ETag` it was started with.
+
+    Raises:
+        DownloadError: If the download fails after all retries or does not verify
+    """
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = dest.with_name(dest.name + '.part')
+    meta = dest.with_name(dest.name + '.part.json')
+
+    started = time.monotonic()
+    attempt = 0
+    resumed = None
+
+    while True:
+        try:
+            reused = await _attempt(session, url, part, meta, headers or {})
+            if resumed is None:
+                resumed = reused
+
+            received = part.stat().st_size
+            if size is not None and received != size:
+                _discard(part, meta)
+                raise DownloadError(f'Expected {size} bytes, got {received}')
+
+            sha256 = await asyncio.to_thread(_hash, part)
+            if checksum and sha256 != checksum.lower():
+                _discard(part, meta)
+                raise DownloadError(f'Checksum mismatch, expected {checksum}, got {sha256}')
+            break
+        except (aiohttp.ClientError, asyncio.TimeoutError, DownloadError) as e:
+            client_error = isinstance(e, aiohttp.ClientResponseError) and e.status < 500
+            if client_error or attempt >= retries:
+                raise DownloadError(f'Failed to download {url}: {e}') from e
+            attempt += 1
+            await asyncio.sleep(2 ** attempt)
+
+    os.replace(part, dest)
+    _discard(meta)
+
+    return DownloadResult(url, dest, received, sha256, time.monotonic() - started, attempt, resumed or 0)
+
+def record(bot, name: str, version: str, result: DownloadResult):
+    """Log and store the statistics for a download"""
+    bot.log.info(
+        f'Downloaded {result.size} bytes for {name} {version} in {result.seconds:.1f}s '
+        f'({result.throughput / 1024:.0f} KiB/s, {result.retries} retries, {result.resumed} bytes resumed)'
+    )
+
+    session_db = bot.db['Session']()
+    try:
+        session_db.add(bot.db['Downloads'](
+            name=name,
+            version=version,
+            url=result.url,
+            size=result.size,
+            sha256=result.sha256,
+            seconds=result.seconds,
+            retries=result.retries,
+            resumed=result.resumed
+        ))
+        session_db.commit()
+    finally:
+        session_db.close()
@@ -14,6 +14,7 @@ def ensure_directories(log):
     root = Path(__file__).parent.parent.parent
     directories = [
         root / 'data',
+        root / 'data' / 'temp',
         root / 'data' / 'servers',
         root / 'data' / 'plugins',
         root / 'logs',
@@ -22,8 +22,8 @@ class ColoredFormatter(logging.Formatter):
         record.levelname = f'{log_color}{record.levelname}{self.RESET}'
         return super().format(record)
 
-def setup_logger(name: str, debug: bool = None, log_to_file: bool = None) -> logging.Logger:
-    """Setup and configure logger"""
+def setup_logger(name: str, debug: bool = None, log_to_file: bool = None, stream=None) -> logging.Logger:
+    """Setup and configure logger, writing to `stream` (stdout by default)"""
     # Load config if available
     try:
         from utils.config_loader import ConfigLoader
@@ -43,7 +43,7 @@ def setup_logger(name: str, debug: bool = None, log_to_file: bool = None) -> log
     logger.setLevel(logging.DEBUG if debug else logging.INFO)
     
     # Console handler with colors
-    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler = logging.StreamHandler(stream or sys.stdout)
     console_handler.setFormatter(ColoredFormatter(
         '%(asctime)s [%(levelname)s] %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
@@ -0,0 +1,55 @@
+"""
+Notifiers for running the updater without Discord
+
+A notifier receives the update announcements of the check stage and the
+results of CLI commands. Each result has a machine readable `data` dict and a
+`text` rendering for people.
+"""
+import json
+import sys
+
+from utils.digest import describe, summarise
+
+class QueueNotifier:
+    """Queue announcements for the bot to post, and log results"""
+
+    def __init__(self, jobs, log):
+        self.jobs = jobs
+        self.log = log
+
+    def announce(self, embed, data: dict):
+        self.jobs.enqueue('announce', {'embed': embed.to_dict(), 'data': data})
+
+    def report(self, event: str, data: dict, text: str):
+        self.log.info(text)
+
+class TextNotifier:
+    """Print announcements and results for people"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def announce(self, embed, data: dict):
+        _, version, title = describe(data)
+        print(f'Update available: {title} {version} · {summarise(embed)}', file=self.stream)
+
+    def report(self, event: str, data: dict, text: str):
+        print(text, file=self.stream)
+
+class JsonNotifier:
+    """Print announcements and results as one JSON object per line"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def announce(self, embed, data: dict):
+        item, version, title = describe(data)
+        self.report('update', {'item': item, 'version': str(version), 'title': title, 'data': data}, '')
+
+    def report(self, event: str, data: dict, text: str):
+        print(json.dumps({'event': event, **data}, default=str), file=self.stream, flush=True)
+
+NOTIFIERS = {
+    'text': TextNotifier,
+    'json': JsonNotifier
+}
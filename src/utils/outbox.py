@@ -0,0 +1,138 @@
+"""
+Outbound Discord queue
+
+Stages hand their messages to the outbox instead of awaiting Discord. One
+consumer sends them in priority order, paced by a token bucket per route so
+the bot stays clear of rate limits, and edits to a message that is still
+queued are merged into one.
+"""
+import asyncio
+import itertools
+import time
+
+import discord
+
+# Priority lanes, lower goes first
+PROMPT = 0
+ANNOUNCE = 1
+STATUS = 2
+
+# Operation -> (requests, per seconds) allowed on each channel
+BUCKETS = {
+    'send': (5, 5.0),
+    'edit': (5, 5.0),
+    'react': (1, 0.25),
+    'clear': (1, 0.25)
+}
+
+class Operation:
+    """One queued Discord request"""
+
+    def __init__(self, kind: str, target, kwargs: dict):
+        self.kind = kind
+        self.target = target
+        self.kwargs = kwargs
+        self.future = asyncio.get_running_loop().create_future()
+
+    @property
+    def route(self) -> tuple:
+        channel = self.target if self.kind == 'send' else self.target.channel
+        return self.kind, channel.id
+
+    async def call(self):
+        if self.kind == 'send':
+            return await self.target.send(**self.kwargs)
+        if self.kind == 'edit':
+            return await self.target.edit(**self.kwargs)
+        if self.kind == 'react':
+            return await self.target.add_reaction(self.kwargs['emoji'])
+        return await self.target.clear_reactions()
+
+class Outbox:
+    """Send Discord messages from a bounded priority queue"""
+
+    def __init__(self, log, maxsize: int = 500):
+        self.log = log
+        self.queue = asyncio.PriorityQueue(maxsize)
+        self.order = itertools.count()
+        # (kind, message ID) -> queued edit or clear that later ones merge into
+        self.queued = {}
+        # route -> (tokens, last refill)
+        self.buckets = {}
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def put(self, kind: str, target, lane: int, wait: bool, **kwargs):
+        key = (kind, target.id) if kind in ('edit', 'clear') else None
+        operation = self.queued.get(key)
+        if operation:
+            operation.kwargs.update(kwargs)
+        else:
+            operation = Operation(kind, target, kwargs)
+            operation.future.add_done_callback(self.report)
+            if key:
+                self.queued[key] = operation
+            await self.queue.put((lane, next(self.order), key, operation))
+        return await operation.future if wait else operation.future
+
+    async def send(self, channel, lane: int = ANNOUNCE, wait: bool = False, **kwargs):
+        """
+        Queue a message
+
+        Args:
+            channel: Channel to send to
+            lane: `PROMPT`, `ANNOUNCE` or `STATUS`
+            wait: Wait until it is sent and return the message
+            **kwargs: Passed to `channel.send`
+        """
+        return await self.put('send', channel, lane, wait, **kwargs)
+
+    async def edit(self, message, lane: int = STATUS, wait: bool = False, **kwargs):
+        """Queue an edit, merged with any edit to the same message that hasn't been sent yet"""
+        return await self.put('edit', message, lane, wait, **kwargs)
+
+    async def react(self, message, emoji: str, lane: int = PROMPT, wait: bool = False):
+        return await self.put('react', message, lane, wait, emoji=emoji)
+
+    async def clear_reactions(self, message, lane: int = STATUS, wait: bool = False):
+        return await self.put('clear', message, lane, wait)
+
+    async def take(self, route: tuple):
+        """Wait for a token from the route's bucket"""
+        capacity, period = BUCKETS[route[0]]
+        now = time.monotonic()
+        tokens, refilled = self.buckets.get(route, (capacity, now))
+        tokens = min(capacity, tokens + (now - refilled) * capacity / period)
+        if tokens < 1:
+            await asyncio.sleep((1 - tokens) * period / capacity)
+            tokens, now = 1, time.monotonic()
+        self.buckets[route] = (tokens - 1, now)
+
+    async def run(self):
+        while True:
+            lane, _, key, operation = await self.queue.get()
+            # Later edits queue up behind this one instead of changing it mid-request
+            self.queued.pop(key, None)
+            try:
+                await self.take(operation.route)
+                result = await operation.call()
+            except Exception as e:
+                # The caller may have stopped waiting, which cancels the future
+                if not operation.future.done():
+                    operation.future.set_exception(e)
+                else:
+                    self.log.warning(f'Discord request failed: {e}')
+            else:
+                if not operation.future.done():
+                    operation.future.set_result(result)
+
+    def report(self, future: asyncio.Future):
+        """Log failed requests, whether or not anything is waiting on them"""
+        if not future.cancelled() and future.exception():
+            error = future.exception()
+            if isinstance(error, discord.HTTPException):
+                self.log.warning(f'Discord request failed: {error}')
+            else:
+                self.log.error(f'Discord request failed: {error}')
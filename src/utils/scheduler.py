@@ -0,0 +1,47 @@
+"""
+Bounded-concurrency download scheduling
+"""
+import asyncio
+import shutil
+import tempfile
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from urllib.parse import urlparse
+
+from utils.fs import path
+
+class DownloadScheduler:
+    """Limit concurrent downloads globally, per host and per source"""
+
+    def __init__(self, limit: int = 4, host_limit: int = 2):
+        self.limit = asyncio.Semaphore(limit)
+        self.host_limit = host_limit
+        self.hosts = {}
+        self.sources = {}
+
+    def register(self, source: str, concurrency: int):
+        """Set the concurrency limit for a source"""
+        if source not in self.sources:
+            self.sources[source] = asyncio.Semaphore(max(1, concurrency))
+
+    @asynccontextmanager
+    async def slot(self, url: str, source: str = None):
+        """Wait for a free download slot for a URL"""
+        host = urlparse(url).hostname or url
+        if host not in self.hosts:
+            self.hosts[host] = asyncio.Semaphore(self.host_limit)
+
+        source_limit = self.sources.get(source) or asyncio.Semaphore(1)
+        async with source_limit, self.hosts[host], self.limit:
+            yield
+
+    @contextmanager
+    def temp_dir(self, prefix: str = 'download-'):
+        """Create an isolated temp directory for one download, removed afterwards"""
+        root = Path(path('data/temp'))
+        root.mkdir(parents=True, exist_ok=True)
+        directory = Path(tempfile.mkdtemp(prefix=prefix, dir=root))
+        try:
+            yield directory
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,167 @@
+"""
+Async, cached player count polling
+"""
+import asyncio
+import time
+from typing import Dict, Iterable, Optional
+
+import aiohttp
+from mcstatus import JavaServer
+
+# Seconds to keep resolved SRV records
+SRV_TTL = 3600
+
+def parse_left4status(data) -> Dict[str, int]:
+    """
+    Get player counts by server ID from a Left4Status response
+
+    Accepts a mapping of IDs to server objects (optionally under `servers`)
+    or a list of server objects with an `id`. The count is read from
+    `players.online`, `players` or `online`.
+    """
+    if isinstance(data, dict) and isinstance(data.get('servers'), (dict, list)):
+        data = data['servers']
+    if isinstance(data, list):
+        data = {str(s.get('id', s.get('name'))): s for s in data if isinstance(s, dict)}
+    if not isinstance(data, dict):
+        return {}
+
+    counts = {}
+    for server_id, server in data.items():
+        if not isinstance(server, dict):
+            continue
+        players = server.get('players', server.get('online'))
+        if isinstance(players, dict):
+            players = players.get('online')
+        if isinstance(players, int) and not isinstance(players, bool):
+            counts[str(server_id)] = players
+    return counts
+
+class StatusPoller:
+    """Poll server status concurrently and keep a short-lived snapshot"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        # address -> (expires, JavaServer)
+        self.resolved = {}
+        # server name -> (polled at, player count or None)
+        self.snapshot = {}
+        # (fetched at, server ID -> player count) from left4status
+        self.aggregate = None
+
+    @property
+    def timeout(self) -> float:
+        return self.bot.config.get('status_timeout', 5000) / 1000
+
+    @property
+    def ttl(self) -> float:
+        return self.bot.config.get('status_cache_ttl', 60000) / 1000
+
+    async def resolve(self, address: str) -> JavaServer:
+        """Resolve an address (including its SRV record), cached for `SRV_TTL`"""
+        cached = self.resolved.get(address)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        server = await JavaServer.async_lookup(address, timeout=self.timeout)
+        self.resolved[address] = (time.monotonic() + SRV_TTL, server)
+        return server
+
+    async def ping(self, server_name: str, quiet: bool = False) -> Optional[int]:
+        """Get the player count of one server, or None if it can't be reached"""
+        server_config = self.bot.config['servers'].get(server_name) or {}
+        address = server_config.get('address')
+        if not address:
+            self.bot.log.warning(f'No address configured for {server_name}')
+            return None
+
+        try:
+            server = await self.resolve(address)
+            status = await asyncio.wait_for(server.async_status(), self.timeout)
+            return status.players.online
+        except Exception as e:
+            # The address may have moved, resolve it again next time
+            self.resolved.pop(address, None)
+            if not quiet:
+                self.bot.log.error(f'Failed to get player count for {server_name}: {e}')
+            return None
+
+    async def fetch_aggregate(self, fresh: bool = False, quiet: bool = False) -> Dict[str, int]:
+        """Fetch every player count from the left4status endpoint, cached for the snapshot TTL unless `fresh`"""
+        if not fresh and self.aggregate and time.monotonic() - self.aggregate[0] < self.ttl:
+            return self.aggregate[1]
+
+        url = self.bot.config.get('left4status')
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(url) as response:
+                    response.raise_for_status()
+                    counts = parse_left4status(await response.json(content_type=None))
+        except Exception as e:
+            if not quiet:
+                self.bot.log.error(f'Failed to get player counts from left4status: {e}')
+            counts = {}
+
+        self.aggregate = (time.monotonic(), counts)
+        return counts
+
+    async def probe(self, server_name: str) -> Optional[int]:
+        """
+        Get a fresh player count for one server, without logging failures
+
+        Servers with an `address` are pinged. Others are looked up in a new
+        left4status response, bypassing the cached one, so a server that was
+        just restarted isn't reported as up from data taken before it stopped.
+        """
+        server_config = self.bot.config['servers'].get(server_name) or {}
+        if server_config.get('address') or not (server_config.get('left4status') and self.bot.config.get('left4status')):
+            return await self.ping(server_name, quiet=True)
+        counts = await self.fetch_aggregate(fresh=True, quiet=True)
+        return counts.get(str(server_config['left4status']))
+
+    async def poll(self, server_names: Iterable[str] = None) -> Dict[str, Optional[int]]:
+        """Poll servers concurrently and update the snapshot"""
+        names = list(server_names if server_names is not None else self.bot.config['servers'])
+        counts = [None] * len(names)
+
+        # One request answers every server mapped to left4status
+        direct = list(range(len(names)))
+        if self.bot.config.get('left4status'):
+            mapped = {i: (self.bot.config['servers'].get(name) or {}).get('left4status')
+                      for i, name in enumerate(names)}
+            if any(mapped.values()):
+                aggregate = await self.fetch_aggregate()
+                for i, server_id in mapped.items():
+                    if server_id and str(server_id) in aggregate:
+                        counts[i] = aggregate[str(server_id)]
+                direct = [i for i in direct if not (mapped[i] and str(mapped[i]) in aggregate)]
+
+        # Fall back to pinging the rest directly
+        pinged = await asyncio.gather(*(self.ping(names[i]) for i in direct))
+        for i, count in zip(direct, pinged):
+            counts[i] = count
+
+        now = time.monotonic()
+        for name, count in zip(names, counts):
+            self.snapshot[name] = (now, count)
+
+        return dict(zip(names, counts))
+
+    def cached(self, server_name: str, max_age: float = None) -> Optional[tuple]:
+        """Get `(age, count)` from the snapshot if it is fresh enough"""
+        entry = self.snapshot.get(server_name)
+        if not entry:
+            return None
+
+        age = time.monotonic() - entry[0]
+        if age > (self.ttl if max_age is None else max_age):
+            return None
+        return age, entry[1]
+
+    async def player_count(self, server_name: str, max_age: float = None) -> Optional[int]:
+        """Get a player count from the snapshot, polling if it is stale"""
+        entry = self.cached(server_name, max_age)
+        if entry:
+            return entry[1]
+        return (await self.poll([server_name]))[server_name]
@@ -0,0 +1,85 @@
+"""
+Headless worker entry point
+
+Runs queued check and download jobs outside the Discord bot process. Start the
+bot with `external_workers: true` and run `python -m src.worker` on any host
+that shares the `data/` and `config/` directories.
+"""
+import asyncio
+import os
+import socket
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from headless import HeadlessContext
+from updater import Updater
+from utils.logger import setup_logger
+from utils.fs import ensure_directories
+
+# Seconds to wait between polls of an empty queue
+POLL_INTERVAL = 10
+# Seconds between heartbeats of a running job
+HEARTBEAT_INTERVAL = 60
+# Running jobs without a heartbeat for this long are assumed to belong to a dead worker
+STALE_AFTER = timedelta(minutes=10)
+
+async def heartbeat(context, job_id: int):
+    """Keep touching a job while it runs"""
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        try:
+            context.jobs.heartbeat(job_id)
+        except Exception as e:
+            context.log.warning(f'Could not record a heartbeat for job #{job_id}: {e}')
+
+async def work(context, worker_id: str):
+    """Claim and run jobs until interrupted"""
+    updater = Updater(context)
+    context.log.info(f'Worker {worker_id} waiting for jobs')
+
+    while True:
+        context.configs.reload_if_changed()
+        requeued = context.jobs.requeue_stale(STALE_AFTER)
+        if requeued:
+            context.log.warning(f'Requeued {requeued} stale jobs')
+
+        job = context.jobs.claim(['check', 'download'], worker_id)
+        if not job:
+            await asyncio.sleep(POLL_INTERVAL)
+            continue
+
+        job_id, kind, payload = job
+        context.log.info(f'Running {kind} job #{job_id}')
+        beat = asyncio.create_task(heartbeat(context, job_id))
+        try:
+            await getattr(updater, kind)()
+        except Exception as e:
+            context.log.error(f'{kind} job #{job_id} failed: {e}')
+            context.jobs.finish(job_id, str(e))
+        else:
+            context.jobs.finish(job_id)
+            context.state.finished(kind)
+        finally:
+            beat.cancel()
+
+def main():
+    """Worker entry point"""
+    log = setup_logger('Server updater worker')
+    ensure_directories(log)
+
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    try:
+        context = HeadlessContext(log)
+        asyncio.run(work(context, worker_id))
+    except KeyboardInterrupt:
+        log.info('Shutting down...')
+    except Exception as error:
+        log.error(f'Fatal error: {error}')
+        raise
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""
+Test setup, modules are imported from src like the entry points do
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from database import init_database
+
+class Log:
+    """Logger stub that keeps the messages of each level"""
+
+    def __init__(self):
+        self.messages = {}
+
+    def __getattr__(self, level):
+        return self.messages.setdefault(level, []).append
+
+@pytest.fixture
+def log():
+    return Log()
+
+@pytest.fixture
+def db(tmp_path, log):
+    """A fresh database for each test"""
+    return init_database(log, tmp_path / 'database.sqlite')
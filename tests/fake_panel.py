@@ -0,0 +1,74 @@
+"""
+A local stand-in for the Pterodactyl client API and Wings websocket
+"""
+import json
+
+from aiohttp import web, WSMsgType
+
+class FakePanel:
+    """Serve the power, resources and websocket endpoints for one server"""
+
+    def __init__(self, state: str = 'running', websocket: bool = True, hung: bool = False):
+        self.state = state
+        self.websocket = websocket
+        # Whether the server ignores stop and kill signals
+        self.hung = hung
+        self.sockets = []
+        self.signals = []
+        self.runner = None
+        self.url = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/api/client/servers/{id}/resources', self.resources)
+        app.router.add_post('/api/client/servers/{id}/power', self.power)
+        app.router.add_get('/api/client/servers/{id}/websocket', self.credentials)
+        app.router.add_get('/ws', self.socket)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}/'
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    async def resources(self, request):
+        return web.json_response({'attributes': {'current_state': self.state}})
+
+    async def power(self, request):
+        signal = (await request.json())['signal']
+        self.signals.append(signal)
+        if self.hung and signal in ('stop', 'kill'):
+            return web.Response(status=204)
+        await self.set_state({'stop': 'stopping', 'kill': 'offline', 'start': 'starting'}[signal])
+        return web.Response(status=204)
+
+    async def credentials(self, request):
+        if not self.websocket:
+            raise web.HTTPInternalServerError()
+        return web.json_response({'data': {'socket': self.url.replace('http', 'ws') + 'ws', 'token': 'token'}})
+
+    async def socket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            data = json.loads(message.data)
+            if data['event'] == 'auth':
+                self.sockets.append(ws)
+                await ws.send_json({'event': 'auth success'})
+            elif data['event'] == 'send stats':
+                await ws.send_json({'event': 'stats', 'args': [json.dumps({'state': self.state})]})
+        return ws
+
+    async def set_state(self, state: str):
+        self.state = state
+        for ws in self.sockets:
+            await ws.send_json({'event': 'status', 'args': [state]})
+
+    async def console(self, line: str):
+        for ws in self.sockets:
+            await ws.send_json({'event': 'console output', 'args': [line]})
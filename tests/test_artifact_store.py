@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.artifact_store import ArtifactStore, plugin_item
+
+@pytest.fixture
+def store(db, tmp_path):
+    return ArtifactStore(db, tmp_path / 'data')
+
+def add(store, tmp_path, plugin_name: str, version: str, size: int = 10, state: str = 'superseded',
+        used: int = 0):
+    """Store a plugin version of `size` bytes, last used `used` hours ago"""
+    file = tmp_path / 'downloads' / f'{plugin_name}.jar'
+    file.parent.mkdir(parents=True, exist_ok=True)
+    # Stored copies may be hard links of the download
+    file.unlink(missing_ok=True)
+    file.write_bytes(b'x' * size)
+    store.add(plugin_item(plugin_name), version, file, state)
+
+    session_db = store.db['Session']()
+    try:
+        artifact = session_db.query(store.db['Artifacts']).filter_by(item=plugin_item(plugin_name), version=version).one()
+        artifact.last_used = datetime.utcnow() - timedelta(hours=used)
+        session_db.commit()
+    finally:
+        session_db.close()
+
+def stored(store) -> dict:
+    session_db = store.db['Session']()
+    try:
+        return {(a.item, a.version): a.state for a in session_db.query(store.db['Artifacts'])}
+    finally:
+        session_db.close()
+
+def test_retain_keeps_the_newest_versions_of_each_item(store, tmp_path):
+    for version in ('1', '2', '3', '4'):
+        add(store, tmp_path, 'Foo', version)
+    add(store, tmp_path, 'Bar', '1')
+
+    assert store.retain(set(), keep=2, quota=10 ** 6) == 2
+    assert set(stored(store)) == {(plugin_item('Foo'), '4'), (plugin_item('Foo'), '3'), (plugin_item('Bar'), '1')}
+    assert not store.location(plugin_item('Foo'), '1', 'Foo.jar').exists()
+    # Emptied version directories go too
+    assert not store.location(plugin_item('Foo'), '1', 'Foo.jar').parent.exists()
+
+def test_retain_never_deletes_protected_artifacts(store, tmp_path):
+    for version in ('1', '2', '3'):
+        add(store, tmp_path, 'Foo', version, size=100, state='deployed')
+    protected = {(plugin_item('Foo'), '1')}
+
+    assert store.retain(protected, keep=1, quota=0) == 2
+    assert stored(store) == {(plugin_item('Foo'), '1'): 'deployed'}
+
+def test_retain_marks_unprotected_approved_artifacts_superseded(store, tmp_path):
+    add(store, tmp_path, 'Foo', '1', state='approved')
+    add(store, tmp_path, 'Foo', '2', state='approved')
+
+    store.retain({(plugin_item('Foo'), '2')}, keep=3, quota=10 ** 6)
+    assert stored(store) == {(plugin_item('Foo'), '1'): 'superseded', (plugin_item('Foo'), '2'): 'approved'}
+
+def test_retain_evicts_least_recently_used_over_quota(store, tmp_path):
+    add(store, tmp_path, 'Foo', '1', size=100, used=1)
+    add(store, tmp_path, 'Bar', '1', size=100, used=3)
+    add(store, tmp_path, 'Baz', '1', size=100, used=2)
+
+    assert store.retain(set(), keep=3, quota=150) == 2
+    assert set(stored(store)) == {(plugin_item('Foo'), '1')}
+
+def test_retain_forgets_files_deleted_by_hand(store, tmp_path):
+    add(store, tmp_path, 'Foo', '1')
+    store.location(plugin_item('Foo'), '1', 'Foo.jar').unlink()
+
+    assert store.retain(set(), keep=3, quota=10 ** 6) == 0
+    assert stored(store) == {}
+    assert store.find(plugin_item('Foo'), '1') is None
+
+def test_evict_only_touches_one_state(store, tmp_path):
+    add(store, tmp_path, 'Foo', '1', size=100, state='prefetched', used=2)
+    add(store, tmp_path, 'Bar', '1', size=100, state='prefetched', used=1)
+    add(store, tmp_path, 'Baz', '1', size=100, state='approved', used=3)
+
+    assert store.evict('prefetched', 100) == 1
+    assert set(stored(store)) == {(plugin_item('Bar'), '1'), (plugin_item('Baz'), '1')}
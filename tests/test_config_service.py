@@ -0,0 +1,41 @@
+import pytest
+
+from utils.config_service import ConfigError, ConfigIndexes, validate
+
+def make_config(**server):
+    return {
+        'servers': {'Hub': {'jar': {'type': 'paper', 'version': '1.21.4'}, **server}},
+        'plugins': {'Foo': {'source': 'github', 'jar': 'Foo.jar'}}
+    }
+
+def test_unknown_plugins_are_dropped_with_a_warning():
+    config = make_config(plugins=['Foo', 'Gone'])
+    warnings = validate(config)
+
+    assert len(warnings) == 1 and 'Gone' in warnings[0]
+    assert config['servers']['Hub']['plugins'] == ['Foo']
+    assert 'Gone' not in ConfigIndexes(config).plugin_servers
+
+@pytest.mark.parametrize('rollout', ['canary', 2, '3', None])
+def test_valid_rollouts(rollout):
+    assert validate(make_config(rollout=rollout)) == []
+
+@pytest.mark.parametrize('rollout', ['blue', True, 1.5])
+def test_invalid_rollouts(rollout):
+    with pytest.raises(ConfigError, match='rollout'):
+        validate(make_config(rollout=rollout))
+
+@pytest.mark.parametrize('hours', ['02-06', '22-04', '0-24', None])
+def test_valid_hours(hours):
+    config = make_config(update_window={'hours': hours})
+    config['prefetch'] = {'hours': hours}
+    assert validate(config) == []
+
+@pytest.mark.parametrize('hours', ['2am-6am', '02:00-06:00', '02-30', 6])
+def test_invalid_hours(hours):
+    with pytest.raises(ConfigError, match='update_window.hours'):
+        validate(make_config(update_window={'hours': hours}))
+    config = make_config()
+    config['prefetch'] = {'hours': hours}
+    with pytest.raises(ConfigError, match='prefetch.hours'):
+        validate(config)
@@ -0,0 +1,28 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from pterodactyl import Pterodactyl
+from updater.upload_files import deploy
+from fake_panel import FakePanel
+
+def test_deploy_stops_when_the_server_survives_a_kill(log):
+    async def run():
+        panel = FakePanel(hung=True)
+        await panel.start()
+        try:
+            bot = SimpleNamespace(log=log, config={
+                'stop_timeout': 200,
+                'servers': {'Hub': {'pterodactyl_id': 'abc'}}
+            })
+            pending = {'server': SimpleNamespace(current=None, plugins='{}'), 'jar': False, 'plugins': []}
+            with pytest.raises(RuntimeError, match='Hub did not stop'):
+                await deploy(bot, Pterodactyl(panel.url, 'key'), None, 'Hub', pending)
+            # Nothing was put in place and the server wasn't started again
+            assert panel.signals == ['stop', 'kill']
+            assert 'deployment_id' not in pending
+        finally:
+            await panel.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import json
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from utils.download import DownloadError, fetch
+
+CONTENT = bytes(range(256)) * 1024
+
+class FileServer:
+    """Serve CONTENT with ETag, Range and If-Range support"""
+
+    def __init__(self):
+        self.etag = '"v1"'
+        self.requests = []
+        self.runner = None
+        self.url = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/file.jar', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.url = f'http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/file.jar'
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    async def handle(self, request):
+        self.requests.append(dict(request.headers))
+        headers = {'ETag': self.etag}
+        ranged = request.headers.get('Range')
+        if ranged and request.headers.get('If-Range', self.etag) == self.etag:
+            start = int(ranged.split('=')[1].rstrip('-'))
+            if start >= len(CONTENT):
+                return web.Response(status=416, headers=headers)
+            headers['Content-Range'] = f'bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}'
+            return web.Response(status=206, body=CONTENT[start:], headers=headers)
+        return web.Response(body=CONTENT, headers=headers)
+
+def serve(test):
+    """Run `test(server, session)` against a fresh file server"""
+    async def run():
+        server = FileServer()
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                return await test(server, session)
+        finally:
+            await server.stop()
+    return asyncio.run(run())
+
+def interrupted(dest, url: str, etag: str, received: int):
+    """Leave behind the part file of a download that stopped after `received` bytes"""
+    dest.with_name(dest.name + '.part').write_bytes(CONTENT[:received])
+    dest.with_name(dest.name + '.part.json').write_text(json.dumps({'url': url, 'etag': etag, 'length': len(CONTENT)}))
+
+def test_fetch_verifies_and_moves_into_place(tmp_path):
+    dest = tmp_path / 'file.jar'
+    checksum = hashlib.sha256(CONTENT).hexdigest()
+
+    result = serve(lambda server, session: fetch(session, server.url, dest, checksum=checksum, size=len(CONTENT)))
+
+    assert dest.read_bytes() == CONTENT
+    assert (result.size, result.sha256, result.resumed) == (len(CONTENT), checksum, 0)
+    assert [p.name for p in tmp_path.iterdir()] == ['file.jar']
+
+def test_fetch_resumes_with_if_range(tmp_path):
+    dest = tmp_path / 'file.jar'
+
+    async def test(server, session):
+        interrupted(dest, server.url, server.etag, 1000)
+        result = await fetch(session, server.url, dest)
+        assert server.requests[0]['Range'] == 'bytes=1000-'
+        assert server.requests[0]['If-Range'] == '"v1"'
+        return result
+
+    assert serve(test).resumed == 1000
+    assert dest.read_bytes() == CONTENT
+
+def test_fetch_starts_again_when_the_file_changed(tmp_path):
+    dest = tmp_path / 'file.jar'
+
+    async def test(server, session):
+        interrupted(dest, server.url, '"v0"', 1000)
+        return await fetch(session, server.url, dest)
+
+    assert serve(test).resumed == 0
+    assert dest.read_bytes() == CONTENT
+
+def test_fetch_finishes_a_complete_part_file(tmp_path):
+    dest = tmp_path / 'file.jar'
+
+    async def test(server, session):
+        interrupted(dest, server.url, server.etag, len(CONTENT))
+        return await fetch(session, server.url, dest)
+
+    assert serve(test).resumed == len(CONTENT)
+    assert dest.read_bytes() == CONTENT
+
+def test_fetch_discards_downloads_that_dont_verify(tmp_path):
+    dest = tmp_path / 'file.jar'
+
+    with pytest.raises(DownloadError, match='Checksum mismatch'):
+        serve(lambda server, session: fetch(session, server.url, dest, checksum='0' * 64, retries=0))
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from database.jobs import JobQueue
+
+def make_stale(db, job_id: int):
+    session_db = db['Session']()
+    try:
+        session_db.get(db['Jobs'], job_id).updated_at = datetime.utcnow() - timedelta(hours=1)
+        session_db.commit()
+    finally:
+        session_db.close()
+
+def test_stale_jobs_are_requeued_then_failed(db):
+    jobs = JobQueue(db)
+    job_id = jobs.enqueue('check', unique=True)
+    assert jobs.enqueue('check', unique=True) is None
+
+    for attempt in range(3):
+        assert jobs.claim(['check'], 'worker') == (job_id, 'check', {})
+        make_stale(db, job_id)
+        assert jobs.requeue_stale(timedelta(minutes=10), max_attempts=3) == (1 if attempt < 2 else 0)
+
+    session_db = db['Session']()
+    try:
+        job = session_db.get(db['Jobs'], job_id)
+        assert (job.status, job.attempts) == ('failed', 3)
+        assert job.error
+    finally:
+        session_db.close()
+
+    assert jobs.enqueue('check', unique=True) not in (None, job_id)
+
+def test_heartbeat_keeps_running_jobs(db):
+    jobs = JobQueue(db)
+    job_id = jobs.enqueue('download')
+    jobs.claim(['download'], 'worker')
+    make_stale(db, job_id)
+
+    jobs.heartbeat(job_id)
+    assert jobs.requeue_stale(timedelta(minutes=10)) == 0
+    assert jobs.claim(['download'], 'other') is None
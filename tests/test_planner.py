@@ -0,0 +1,70 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from updater.planner import DEFAULT_TIMINGS, build_plan, group_waves, schedule
+
+def server(**options):
+    return {'jar': {'type': 'paper', 'version': '1.21.4'}, 'plugins': ['Foo'], **options}
+
+CONFIG = {
+    'rollout_concurrency': 1,
+    'rollout_health': {'period': 60000},
+    'servers': {
+        'Late': server(),
+        'Slow': server(rollout=1),
+        'Fast': server(rollout='1'),
+        'Canary': server(rollout='canary'),
+        'Current': server(rollout=2)
+    },
+    'plugins': {'Foo': {'source': 'github', 'jar': 'Foo.jar'}}
+}
+
+@pytest.mark.parametrize('durations, concurrency, expected', [
+    ([], 2, 0),
+    ([10, 20, 30], 0, 30),
+    ([10, 20, 30], 1, 60),
+    ([10, 20, 30], 2, 40),
+    ([30, 10, 10, 10], 2, 30)
+])
+def test_schedule(durations, concurrency, expected):
+    assert schedule(durations, concurrency) == expected
+
+def test_group_waves_puts_canaries_first_and_servers_without_a_wave_last():
+    bot = SimpleNamespace(config=CONFIG)
+    assert group_waves(bot, list(CONFIG['servers'])) == [['Canary'], ['Slow', 'Fast'], ['Current'], ['Late']]
+
+def test_build_plan(db, log):
+    bot = SimpleNamespace(db=db, config=CONFIG, log=log)
+    session_db = db['Session']()
+    try:
+        session_db.add(db['Plugins'](name='Foo', approved='2.0', downloaded='2.0'))
+        for name in CONFIG['servers']:
+            version = '2.0' if name == 'Current' else '1.0'
+            session_db.add(db['Servers'](name=name, plugins=json.dumps({'Foo': version})))
+        for name, seconds in (('Slow', 50), ('Fast', 5)):
+            session_db.add(db['Restarts'](server=name, stop_seconds=seconds, upload_seconds=seconds,
+                                          start_seconds=seconds, success=1))
+        # Failed restarts don't count
+        session_db.add(db['Restarts'](server='Fast', stop_seconds=500, upload_seconds=500,
+                                      start_seconds=500, success=0))
+        session_db.commit()
+    finally:
+        session_db.close()
+
+    plan = build_plan(bot, list(CONFIG['servers']))
+
+    # Current has nothing pending, and the faster server goes first in its wave
+    assert [[s.server for s in wave] for wave in plan.waves] == [['Canary'], ['Fast', 'Slow'], ['Late']]
+    assert [s.changes[0]['old'] for s in plan.servers] == ['1.0'] * 4
+    assert plan.waves[1][0].downtime == 15
+    assert plan.waves[1][1].downtime == 150
+
+    # Servers without history are expected to take the fleet's median
+    assert plan.waves[0][0].estimate == {key: 27.5 for key in DEFAULT_TIMINGS}
+
+    # One restart at a time, with a health check between each of the three waves
+    assert plan.wave_duration(1) == 165
+    assert plan.duration == 82.5 + 165 + 82.5 + 2 * 60
+    assert 'Current has no updates pending' in log.messages['info']
@@ -0,0 +1,35 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).parent.parent / 'src'
+
+# Runs in a fresh interpreter so modules imported by other tests don't count
+SCRIPT = '''
+import json
+import sys
+from types import SimpleNamespace
+
+from updater import providers
+from utils.config_service import ConfigIndexes
+from utils.scheduler import DownloadScheduler
+
+config = {
+    'servers': {'Hub': {'jar': {'type': 'paper', 'version': '1.21.4'}, 'plugins': ['Foo']}},
+    'plugins': {'Foo': {'source': 'github', 'repo': 'example/foo', 'jar': 'Foo.jar'}}
+}
+bot = SimpleNamespace(config=config, indexes=ConfigIndexes(config), scheduler=DownloadScheduler(), log=None)
+
+print(json.dumps({
+    'sources': [provider.source for provider in providers.active(bot)],
+    'modules': sorted(name for name in sys.modules if name.split('.')[0] in ('playwright', 'spigot'))
+}))
+'''
+
+def test_active_providers_without_spigot_skip_playwright():
+    result = subprocess.run([sys.executable, '-c', SCRIPT], cwd=SRC, capture_output=True, text=True, check=True)
+    output = json.loads(result.stdout)
+
+    assert output['sources'] == ['papermc', 'github']
+    assert output['modules'] == []
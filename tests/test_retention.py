@@ -0,0 +1,38 @@
+import json
+from types import SimpleNamespace
+
+from updater.retention import protected
+from utils.artifact_store import jar_item, plugin_item
+
+CONFIG = {
+    'servers': {'Hub': {'jar': {'type': 'paper', 'version': '1.21.4'}, 'plugins': ['Foo']}},
+    'plugins': {'Foo': {'source': 'github', 'jar': 'Foo.jar'}}
+}
+
+def test_protected_covers_approved_deployed_and_rollback_versions(db):
+    bot = SimpleNamespace(db=db, config=CONFIG)
+    session_db = db['Session']()
+    try:
+        session_db.add_all([
+            db['Plugins'](name='Foo', approved='3.0', downloaded='2.0'),
+            db['ServerJars'](type='paper', version='1.21.4', approved_build='102', downloaded='102'),
+            db['Servers'](name='Hub', current='101', plugins=json.dumps({'Foo': '2.0'})),
+            db['Deployments'](server='Hub', previous_jar='100', previous_plugins=json.dumps({'Foo': '1.0'}),
+                              jar='101', plugins=json.dumps({'Foo': '2.0'}))
+        ])
+        session_db.commit()
+
+        jar = jar_item('paper', '1.21.4')
+        foo = plugin_item('Foo')
+        assert protected(bot, session_db) == {
+            (foo, '3.0'), (foo, '2.0'), (foo, '1.0'),
+            (jar, '102'), (jar, '101'), (jar, '100')
+        }
+
+        # Once rolled back, what the update replaced is no longer needed for a rollback
+        session_db.query(db['Deployments']).one().rolled_back = 1
+        session_db.commit()
+        assert (foo, '1.0') not in protected(bot, session_db)
+        assert (jar, '100') not in protected(bot, session_db)
+    finally:
+        session_db.close()
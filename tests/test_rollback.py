@@ -0,0 +1,55 @@
+import json
+from types import SimpleNamespace
+
+from updater.rollback import latest_deployment, rolled_back_files
+from updater.upload_files import get_pending
+
+CONFIG = {
+    'servers': {
+        'Hub': {'jar': {'type': 'paper', 'version': '1.21.4'}, 'plugins': ['Foo']},
+        'Lobby': {'jar': {'type': 'paper', 'version': '1.21.4'}, 'plugins': ['Foo']}
+    },
+    'plugins': {'Foo': {'source': 'github', 'jar': 'Foo.jar'}}
+}
+
+def add(session_db, model, **columns):
+    row = model(**columns)
+    session_db.add(row)
+    session_db.commit()
+    return row
+
+def test_rollback_holds_only_its_server_back(db):
+    bot = SimpleNamespace(db=db, config=CONFIG)
+    session_db = db['Session']()
+    try:
+        add(session_db, db['ServerJars'], type='paper', version='1.21.4', approved_build='101', downloaded='101')
+        add(session_db, db['Plugins'], name='Foo', approved='2.0', downloaded='2.0')
+        for name in ('Hub', 'Lobby'):
+            add(session_db, db['Servers'], name=name, current='101', plugins=json.dumps({'Foo': '2.0'}))
+
+        # Hub was updated from Foo 1.0 and build 100, then rolled back
+        update = add(session_db, db['Deployments'], server='Hub', previous_jar='100',
+                     previous_plugins=json.dumps({'Foo': '1.0'}), jar='101',
+                     plugins=json.dumps({'Foo': '2.0'}), rolled_back=1)
+        assert rolled_back_files(bot, update) == ('100', {'Foo': '1.0'})
+        add(session_db, db['Deployments'], server='Hub', previous_jar='101',
+            previous_plugins=json.dumps({'Foo': '2.0'}), jar='100',
+            plugins=json.dumps({'Foo': '1.0'}), rollback_of=update.id)
+        hub = session_db.query(db['Servers']).filter_by(name='Hub').first()
+        hub.current, hub.plugins = '100', json.dumps({'Foo': '1.0'})
+        session_db.commit()
+
+        # The rollback isn't something to roll back to
+        assert latest_deployment(bot, session_db, 'Hub').id == update.id
+
+        # Nothing shared changed, and Hub isn't offered the bad versions again
+        assert get_pending(bot, session_db, 'Hub', CONFIG['servers']['Hub']) is None
+        assert get_pending(bot, session_db, 'Lobby', CONFIG['servers']['Lobby']) is None
+
+        # Newer versions are deployed again
+        session_db.query(db['Plugins']).filter_by(name='Foo').first().downloaded = '2.1'
+        session_db.commit()
+        pending = get_pending(bot, session_db, 'Hub', CONFIG['servers']['Hub'])
+        assert pending['plugins'] == ['Foo'] and not pending['jar']
+    finally:
+        session_db.close()
@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+from aiohttp import web
+
+from utils.status import StatusPoller
+
+class Bot:
+    def __init__(self, url: str, log):
+        self.log = log
+        self.config = {'left4status': url, 'servers': {'Hub': {'left4status': 'hub'}}}
+
+def test_probe_bypasses_cached_left4status_counts(log):
+    async def run():
+        online = {'hub': None}
+
+        async def status(request):
+            servers = [] if online['hub'] is None else [{'id': 'hub', 'players': online['hub']}]
+            return web.json_response({'servers': servers})
+
+        app = web.Application()
+        app.router.add_get('/', status)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        try:
+            poller = StatusPoller(Bot(f'http://127.0.0.1:{port}/', log))
+            # Counts from before the restart are still cached
+            poller.aggregate = (time.monotonic(), {'hub': 5})
+            assert await poller.probe('Hub') is None
+
+            online['hub'] = 2
+            assert await poller.probe('Hub') == 2
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
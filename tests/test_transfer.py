@@ -0,0 +1,49 @@
+import asyncio
+import posixpath
+
+import aiohttp
+import pytest
+
+from updater import transfer
+
+class FilesPanel:
+    """Files API of one server, kept in a dict of path -> content"""
+
+    def __init__(self, files: dict, fail_after: int = None):
+        self.files = dict(files)
+        # Renames that succeed before one fails
+        self.fail_after = fail_after
+
+    async def list_files(self, server, directory):
+        directory = directory.strip('/')
+        return [{'name': posixpath.basename(p)} for p in self.files if posixpath.dirname(p) == directory]
+
+    async def rename_files(self, server, root, files):
+        for src, dest in files:
+            if self.fail_after == 0:
+                self.fail_after = None
+                raise aiohttp.ClientError('rename failed')
+            if self.fail_after:
+                self.fail_after -= 1
+            assert dest not in self.files
+            self.files[dest] = self.files.pop(src)
+
+    async def delete_files(self, server, root, paths):
+        for path in paths:
+            self.files = {p: c for p, c in self.files.items() if p != path and not p.startswith(path + '/')}
+
+FILES = [('Foo.jar', 'plugins/Foo.jar'), ('server.jar', 'server.jar')]
+STAGED = {'.spigot-updater/plugins/Foo.jar': 'new foo', '.spigot-updater/server.jar': 'new jar'}
+
+def test_promote_swaps_files_in():
+    panel = FilesPanel({'plugins/Foo.jar': 'old foo', 'server.jar': 'old jar', **STAGED})
+    asyncio.run(transfer.promote(panel, 'abc', FILES))
+    assert panel.files == {'plugins/Foo.jar': 'new foo', 'server.jar': 'new jar'}
+
+def test_promote_restores_old_files_when_the_swap_fails():
+    # Moving the two old files aside works, moving the new ones in doesn't
+    panel = FilesPanel({'plugins/Foo.jar': 'old foo', 'server.jar': 'old jar', **STAGED}, fail_after=2)
+    with pytest.raises(aiohttp.ClientError):
+        asyncio.run(transfer.promote(panel, 'abc', FILES))
+    assert panel.files['plugins/Foo.jar'] == 'old foo'
+    assert panel.files['server.jar'] == 'old jar'
@@ -0,0 +1,57 @@
+import asyncio
+
+from pterodactyl import Pterodactyl
+from fake_panel import FakePanel
+
+async def settle():
+    """Give the websocket time to authenticate"""
+    await asyncio.sleep(0.1)
+
+def test_power_state_and_console_over_websocket(log):
+    async def run():
+        panel = FakePanel()
+        await panel.start()
+        try:
+            client = Pterodactyl(panel.url, 'key')
+            async with client.watch('abc', log) as watcher:
+                await settle()
+                assert watcher.live
+                assert watcher.state == 'running'
+
+                lines = []
+                watcher.on_console(lines.append)
+
+                await client.stop('abc')
+                asyncio.get_running_loop().call_later(0.1, lambda: asyncio.ensure_future(panel.set_state('offline')))
+                assert await watcher.wait_for('offline', 2)
+
+                await panel.console('[12:00:00 ERROR]: boom')
+                await asyncio.sleep(0.1)
+                assert lines == ['[12:00:00 ERROR]: boom']
+                assert list(watcher.console) == lines
+            assert panel.signals == ['stop']
+            assert 'warning' not in log.messages
+        finally:
+            await panel.stop()
+
+    asyncio.run(run())
+
+def test_falls_back_to_polling_without_websocket(log):
+    async def run():
+        panel = FakePanel(state='offline', websocket=False)
+        await panel.start()
+        try:
+            client = Pterodactyl(panel.url, 'key')
+            async with client.watch('abc', log) as watcher:
+                watcher.poll_interval = 0.05
+                assert not watcher.live
+                assert log.messages['warning']
+
+                await client.start('abc')
+                asyncio.get_running_loop().call_later(0.1, lambda: setattr(panel, 'state', 'running'))
+                assert await watcher.wait_for('running', 2)
+                assert not await watcher.wait_for('offline', 0.2)
+        finally:
+            await panel.stop()
+
+    asyncio.run(run())